@@ -1,8 +1,11 @@
 import os
 import logging
+import sqlite3
 
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
 
@@ -20,21 +23,140 @@ app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "default_secret_key_for_development")
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)  # needed for url_for to generate with https
 
-# Configure the SQLite database
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///vehicle_management.db")
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
-}
+# "production" leaves the schema alone at startup; run `flask --app main init-db` to
+# create or upgrade it. "development" recreates an empty database on every start.
+APP_MODE = os.environ.get("APP_MODE", "development")
+
+# Connection pool per worker process (PostgreSQL)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", "30"))
+# Compiled SQL statements cached per engine
+DB_QUERY_CACHE_SIZE = int(os.environ.get("DB_QUERY_CACHE_SIZE", "1000"))
+# Milliseconds a SQLite writer waits for the lock before failing
+SQLITE_BUSY_TIMEOUT = int(os.environ.get("SQLITE_BUSY_TIMEOUT", "10000"))
+
+
+def database_url():
+    url = os.environ.get("DATABASE_URL", "sqlite:///vehicle_management.db")
+    # Render and Heroku hand out postgres:// URLs, which SQLAlchemy 2 does not accept
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def engine_options(url):
+    """
+    SQLAlchemy engine options tuned for several workers sharing one database
+    
+    Args:
+        url: Database URL
+        
+    Returns:
+        dict: Options for SQLALCHEMY_ENGINE_OPTIONS
+    """
+    options = {
+        "pool_recycle": 300,
+        "pool_pre_ping": True,
+        "query_cache_size": DB_QUERY_CACHE_SIZE,
+    }
+    if url.startswith("sqlite"):
+        # Waiting on the lock is configured per connection in _configure_sqlite
+        options["connect_args"] = {"timeout": SQLITE_BUSY_TIMEOUT / 1000}
+    else:
+        options.update({
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+        })
+    return options
+
+
+@event.listens_for(Engine, "connect")
+def _configure_sqlite(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    # WAL lets readers in other workers proceed while one worker writes
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+    cursor.close()
+
+
+# Configure the database
+app.config["SQLALCHEMY_DATABASE_URI"] = database_url()
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config["SQLALCHEMY_DATABASE_URI"])
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+# Reject oversized request bodies (camera frames, proof images) before reading them
+app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("MAX_CONTENT_LENGTH", 16 * 1024 * 1024))
+
 # initialize the app with the extension
 db.init_app(app)
 
 with app.app_context():
     # Import the models here so their tables will be created
     import models  # noqa: F401
+    import search  # noqa: F401  (creates the search index with the fine table)
+
+
+def reset_database():
+    """Recreate all tables, empty"""
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+
+def reset_development_database():
+    """
+    Recreate the database if running in development mode
+    
+    Called once by the server entry points (main.py, gunicorn.conf.py)
+    before they serve requests; never by create_app, which also runs for
+    every `flask --app main` command.
+    
+    Returns:
+        bool: Whether the database was reset
+    """
+    if APP_MODE == "production":
+        return False
+    reset_database()
+    return True
+
+
+def create_app(reset=False):
+    """
+    Application factory: the app with its routes, commands and hooks registered
+    
+    Importing this module touches neither the database nor the OCR stack,
+    so a gunicorn master can build the app once and fork workers from it
+    (preload_app, see gunicorn.conf.py).
     
-    # Recreate all tables
-    db.drop_all()
-    db.create_all()
+    Args:
+        reset: Recreate the database. Servers reset it once through
+               reset_development_database instead, so neither workers nor
+               CLI commands (which also call this) wipe it.
+    
+    Returns:
+        Flask: The application
+    """
+    import routes  # noqa: F401
+    import commands  # noqa: F401
+    import sql_budget  # noqa: F401
+    import request_metrics  # noqa: F401
+    
+    if reset:
+        reset_database()
+    return app
+
+
+def _dispose_engines_after_fork():
+    # Pooled connections opened in the parent (create_app in a preloading
+    # master) must not be shared; close=False leaves the parent's intact
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_dispose_engines_after_fork)
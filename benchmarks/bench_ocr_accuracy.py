@@ -0,0 +1,262 @@
+"""
+Accuracy and latency regression suite for the OCR pipeline.
+
+Renders a reproducible corpus of synthetic Indian plates (every state code,
+several fonts, blur, skew, uneven lighting and inverted plates), pastes each
+into a noisy scene and runs it through ocr_utils.analyze_image. Reports
+p50/p95/p99 latency for the whole pipeline and each stage it times,
+throughput per core, exact-match rate and character error rate, and can
+save the results as a baseline or compare against one.
+
+    python benchmarks/bench_ocr_accuracy.py --size 300 --save-baseline baseline.json
+    python benchmarks/bench_ocr_accuracy.py --size 300 --baseline baseline.json
+
+The comparison exits with status 1 when accuracy drops or latency grows
+beyond the tolerances, so it can gate changes to ocr_utils.
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter, ImageFont, ImageOps  # noqa: E402
+
+import ocr_utils  # noqa: E402
+from state_detection import STATE_PREFIXES  # noqa: E402
+
+FONT_GLOBS = ['/usr/share/fonts/**/*.ttf', '/Library/Fonts/*.ttf', 'C:/Windows/Fonts/*.ttf']
+PERCENTILES = (50, 95, 99)
+# Plate backgrounds: private (white), commercial (yellow), electric (green)
+PLATE_COLOURS = [((255, 255, 255), (0, 0, 0)), ((250, 210, 40), (0, 0, 0)), ((20, 120, 60), (255, 255, 255))]
+
+
+def find_fonts(patterns):
+    fonts = sorted({path for pattern in patterns for path in glob.glob(pattern, recursive=True)})
+    # Condensed, symbol and italic faces do not resemble plate lettering
+    return [path for path in fonts if not any(word in path.lower() for word in ('italic', 'oblique', 'symbol'))]
+
+
+def random_plate(rng):
+    """A standard-format plate (label) and how it is printed"""
+    code = rng.choice(sorted(STATE_PREFIXES))
+    rto = f"{rng.randint(1, 99):02d}"
+    series = ''.join(rng.choices(string.ascii_uppercase, k=rng.randint(1, 2)))
+    number = f"{rng.randint(1, 9999):04d}"
+    return code + rto + series + number, f"{code} {rto} {series} {number}"
+
+
+def render_plate(text, font_path, colours):
+    background, ink = colours
+    font = ImageFont.truetype(font_path, 96) if font_path else ImageFont.load_default(size=96)
+    left, top, right, bottom = font.getbbox(text)
+    pad = 24
+    plate = Image.new('RGB', (right - left + 2 * pad, bottom - top + 2 * pad), background)
+    draw = ImageDraw.Draw(plate)
+    draw.text((pad - left, pad - top), text, fill=ink, font=font)
+    draw.rectangle([3, 3, plate.width - 4, plate.height - 4], outline=ink, width=4)
+    return plate
+
+
+def make_sample(rng, fonts):
+    """
+    Render one labelled scene
+
+    Returns:
+        tuple: (label, JPEG bytes, dict of the distortions applied)
+    """
+    label, printed = random_plate(rng)
+    font = rng.choice(fonts) if fonts else None
+    plate = render_plate(printed, font, rng.choice(PLATE_COLOURS))
+    params = {
+        'font': os.path.basename(font) if font else 'default',
+        'skew': round(rng.uniform(-8, 8), 1),
+        'blur': round(rng.choice([0, 0, 0.5, 1.0, 1.5, 2.0]), 1),
+        'lighting': round(rng.uniform(0.45, 1.4), 2),
+        'inverted': rng.random() < 0.1
+    }
+
+    if params['inverted']:
+        plate = ImageOps.invert(plate)
+    plate = plate.rotate(params['skew'], expand=True, fillcolor=(90, 90, 90),
+                         resample=Image.Resampling.BICUBIC)
+
+    # Noisy scene with the plate at a random position and scale
+    scene = Image.effect_noise((1280, 960), rng.uniform(20, 60)).convert('RGB')
+    scale = rng.uniform(0.3, 0.6) * scene.width / plate.width
+    plate = plate.resize((int(plate.width * scale), int(plate.height * scale)), Image.Resampling.LANCZOS)
+    scene.paste(plate, (rng.randint(0, scene.width - plate.width), rng.randint(0, scene.height - plate.height)))
+
+    if params['blur']:
+        scene = scene.filter(ImageFilter.GaussianBlur(params['blur']))
+    # Uneven lighting: a horizontal gradient on top of the global level
+    gradient = Image.linear_gradient('L').rotate(rng.choice([90, 270])).resize(scene.size)
+    shade = Image.new('RGB', scene.size, (0, 0, 0))
+    scene = Image.composite(scene, shade, gradient.point(lambda v: 128 + v // 2))
+    scene = ImageEnhance.Brightness(scene).enhance(params['lighting'])
+
+    buffer = io.BytesIO()
+    scene.save(buffer, format='JPEG', quality=rng.randint(70, 92))
+    return label, buffer.getvalue(), params
+
+
+def make_corpus(size, seed, fonts):
+    rng = random.Random(seed)
+    return [make_sample(rng, fonts) for _ in range(size)]
+
+
+def edit_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {f"p{p}": round(samples[min(len(samples) - 1, int(len(samples) * p / 100))], 2) for p in PERCENTILES}
+
+
+def run_serial(corpus):
+    """OCR every sample in this process, collecting stage timings and accuracy"""
+    stages = {}
+    exact = in_candidates = errors = characters = 0
+    misses = []
+    start = time.perf_counter()
+    for label, data, params in corpus:
+        result = ocr_utils.analyze_image(data, use_cache=False)
+        for stage, ms in result['timings'].items():
+            stages.setdefault(stage, []).append(ms)
+
+        predicted = result['plate_number'] or ''
+        exact += predicted == label
+        in_candidates += any(c['plate_number'] == label for c in result['candidates'])
+        errors += edit_distance(predicted, label)
+        characters += len(label)
+        if predicted != label and len(misses) < 10:
+            misses.append({'label': label, 'read': predicted or None, **params})
+    elapsed = time.perf_counter() - start
+
+    return {
+        'images': len(corpus),
+        'exact_match': round(exact / len(corpus), 4),
+        'candidate_match': round(in_candidates / len(corpus), 4),
+        'cer': round(errors / characters, 4),
+        'throughput_per_core': round(len(corpus) / elapsed, 2),
+        'latency_ms': {stage: percentiles(samples) for stage, samples in sorted(stages.items())},
+        'misses': misses
+    }
+
+
+def run_parallel(corpus, workers):
+    """Throughput of ocr_utils.process_batch across worker processes"""
+    start = time.perf_counter()
+    count = sum(1 for _ in ocr_utils.process_batch(((label, data) for label, data, _ in corpus), workers))
+    elapsed = time.perf_counter() - start
+    return {'workers': workers, 'images_per_second': round(count / elapsed, 2),
+            'per_core': round(count / elapsed / workers, 2)}
+
+
+def print_results(results):
+    print(f"images={results['images']} exact={results['exact_match']:.1%} "
+          f"in candidates={results['candidate_match']:.1%} CER={results['cer']:.1%} "
+          f"throughput/core={results['throughput_per_core']}/s")
+    if 'parallel' in results:
+        parallel = results['parallel']
+        print(f"process_batch: {parallel['workers']} workers {parallel['images_per_second']}/s "
+              f"({parallel['per_core']}/s per core)")
+    print(f"{'stage':<14}" + ''.join(f"{f'p{p}':>10}" for p in PERCENTILES))
+    for stage, values in results['latency_ms'].items():
+        print(f"{stage:<14}" + ''.join(f"{values[f'p{p}']:>8.1f}ms" for p in PERCENTILES))
+    for miss in results['misses']:
+        print(f"  miss: {miss}")
+
+
+def compare(results, baseline, latency_tolerance, accuracy_tolerance):
+    """
+    Print the change from a baseline run
+
+    Returns:
+        list: Descriptions of regressions beyond the tolerances
+    """
+    regressions = []
+    if (results['config']['size'], results['config']['seed']) != (baseline['config']['size'], baseline['config']['seed']):
+        print("warning: baseline used a different corpus (size/seed); the comparison is not like for like")
+
+    for metric in ('exact_match', 'candidate_match', 'cer'):
+        before, after = baseline[metric], results[metric]
+        # A lower error rate is better, higher match rates are better
+        worse = after - before if metric == 'cer' else before - after
+        print(f"{metric:<16} {before:8.2%} -> {after:8.2%}")
+        if worse > accuracy_tolerance:
+            regressions.append(f"{metric} {before:.2%} -> {after:.2%}")
+
+    for stage, values in results['latency_ms'].items():
+        old = baseline['latency_ms'].get(stage)
+        if not old:
+            continue
+        for name in ('p50', 'p95'):
+            before, after = old[name], values[name]
+            change = (after - before) / before if before else 0
+            print(f"{stage + ' ' + name:<16} {before:8.1f}ms -> {after:8.1f}ms ({change:+.0%})")
+            # Sub-millisecond stages are all noise
+            if change > latency_tolerance and after - before > 1:
+                regressions.append(f"{stage} {name} {before}ms -> {after}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', type=int, default=200, help='images in the corpus')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--fonts', nargs='*', default=FONT_GLOBS, help='font file globs')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='also measure process_batch throughput with this many processes')
+    parser.add_argument('--save-baseline', metavar='PATH')
+    parser.add_argument('--baseline', metavar='PATH', help='compare against a saved baseline')
+    parser.add_argument('--latency-tolerance', type=float, default=0.15,
+                        help='allowed relative p50/p95 slowdown per stage')
+    parser.add_argument('--accuracy-tolerance', type=float, default=0.01,
+                        help='allowed absolute drop in match rates / rise in CER')
+    args = parser.parse_args()
+
+    fonts = find_fonts(args.fonts)
+    start = time.perf_counter()
+    corpus = make_corpus(args.size, args.seed, fonts)
+    print(f"generated {len(corpus)} images with {len(fonts) or 'the default'} fonts "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    results = run_serial(corpus)
+    if args.workers:
+        results['parallel'] = run_parallel(corpus, args.workers)
+    results['config'] = {'size': args.size, 'seed': args.seed, 'fonts': [os.path.basename(f) for f in fonts],
+                         'parallel_psm': ocr_utils.OCR_PARALLEL_PSM, 'localize': ocr_utils.OCR_LOCALIZE}
+    print_results(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.latency_tolerance, args.accuracy_tolerance)
+        if regressions:
+            print("REGRESSIONS:\n  " + '\n  '.join(regressions))
+            sys.exit(1)
+        print("no regressions against the baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Compare the warm Tesseract engine pool with one tesseract subprocess per call.
+
+Runs the PSM cascade used by ocr_utils.try_multiple_ocr_methods over a
+synthetic plate image through both paths and prints per-call latency.
+
+    python benchmarks/bench_ocr_engine.py --iterations 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageFont  # noqa: E402
+
+import ocr_engine  # noqa: E402
+
+PSM_MODES = [7, 8, 6, 3]
+
+
+def make_plate_image(text='TS 09 AB 1234'):
+    img = Image.new('L', (640, 160), color=255)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=96)
+    draw.text((20, 20), text, fill=0, font=font)
+    return img
+
+
+def time_calls(recognize, image, iterations):
+    samples = []
+    for _ in range(iterations):
+        for psm in PSM_MODES:
+            start = time.perf_counter()
+            recognize(image, psm)
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1] if len(samples) > 1 else samples[0]
+    print(f"{name:<12} calls={len(samples):<5} mean={statistics.mean(samples):8.1f}ms "
+          f"median={statistics.median(samples):8.1f}ms p95={p95:8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--pool-size', type=int, default=ocr_engine.OCR_POOL_SIZE)
+    args = parser.parse_args()
+
+    image = make_plate_image()
+    pool = ocr_engine.TesseractEnginePool(size=args.pool_size)
+    if not pool.in_process:
+        print("tesserocr is not installed; the pool will fall back to subprocesses")
+
+    # Warm every engine so start-up is not counted against the pool
+    for future in [pool.submit(image, 7) for _ in range(args.pool_size)]:
+        future.result()
+
+    report('subprocess', time_calls(ocr_engine.run_tesseract_subprocess, image, args.iterations))
+    report('pool', time_calls(pool.recognize, image, args.iterations))
+    pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Micro-benchmark of the compiled plate grammar against the old regex cascade.
+
+Generates a corpus of OCR-like strings (standard, BH-series and temporary
+plates with spacing and noise, plus partial and garbage reads) and times
+extract + clean + state detection through both implementations.
+
+    python benchmarks/bench_plate_grammar.py --size 200000
+"""
+import argparse
+import os
+import random
+import re
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr_utils import clean_plate_text, extract_plate_from_text  # noqa: E402
+from plate_grammar import STATE_NAMES, find_plates, parse_plate  # noqa: E402
+from state_detection import detect_state_from_plate  # noqa: E402
+
+SEPARATORS = ['', ' ', '-', '  ', '.']
+
+
+def random_plate(rng):
+    kind = rng.random()
+    letters = string.ascii_uppercase
+    if kind < 0.8:
+        parts = [rng.choice(list(STATE_NAMES)), f"{rng.randint(1, 99):02d}",
+                 ''.join(rng.choices(letters, k=rng.randint(1, 3))), f"{rng.randint(1, 9999):04d}"]
+    elif kind < 0.9:
+        parts = [f"{rng.randint(21, 25)}", 'BH', f"{rng.randint(0, 9999):04d}",
+                 ''.join(rng.choices(letters, k=rng.randint(1, 2)))]
+    else:
+        parts = ['T', f"{rng.randint(1, 12):02d}{rng.randint(23, 25)}", rng.choice(list(STATE_NAMES)),
+                 f"{rng.randint(0, 9999):04d}", ''.join(rng.choices(letters, k=rng.randint(1, 2)))]
+    return rng.choice(SEPARATORS).join(parts)
+
+
+def make_corpus(size, seed=0):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        roll = rng.random()
+        if roll < 0.7:
+            text = random_plate(rng)
+            if rng.random() < 0.3:
+                # Surrounding OCR noise: "IND", stray punctuation, line breaks
+                text = rng.choice(['IND ', '| ', '', '~']) + text + rng.choice(['', '\n', ' .'])
+        elif roll < 0.9:
+            # Partial read: a few characters dropped
+            plate = random_plate(rng).replace(' ', '')
+            cut = rng.randint(3, max(3, len(plate) - 1))
+            text = plate[:cut]
+        else:
+            text = ''.join(rng.choices(string.ascii_uppercase + string.digits + ' -|', k=rng.randint(3, 14)))
+        corpus.append(text)
+    return corpus
+
+
+# The implementation the grammar replaced, kept here for comparison
+LEGACY_STATE_PREFIXES = {
+    'TS': 'Telangana', 'AP': 'Andhra Pradesh', 'KA': 'Karnataka', 'TN': 'Tamil Nadu',
+    'MH': 'Maharashtra', 'DL': 'Delhi', 'HR': 'Haryana', 'UP': 'Uttar Pradesh',
+    'RJ': 'Rajasthan', 'GJ': 'Gujarat', 'MP': 'Madhya Pradesh', 'KL': 'Kerala',
+    'PB': 'Punjab', 'WB': 'West Bengal', 'OR': 'Odisha', 'BR': 'Bihar',
+    'JH': 'Jharkhand', 'AS': 'Assam', 'HP': 'Himachal Pradesh', 'UK': 'Uttarakhand',
+    'GA': 'Goa', 'CH': 'Chandigarh'
+}
+
+
+def legacy_extract(text):
+    if not text:
+        return None
+    patterns = [
+        r'[A-Z]{2}\s*[0-9]{1,2}\s*[A-Z]{1,3}\s*[0-9]{1,4}',
+        r'[A-Z]{2}\s*[0-9]{1,2}\s*[0-9]{1,4}',
+        r'[A-Z]{2}\s*[0-9]{4,}'
+    ]
+    for pattern in patterns:
+        matches = re.findall(pattern, text.upper())
+        if matches:
+            cleaned = re.sub(r'[^A-Z0-9]', '', matches[0])
+            if cleaned:
+                return cleaned
+    matches = re.findall(r'[A-Z]{2,}[0-9]+', text.upper())
+    if matches:
+        return matches[0]
+    alphanum = re.sub(r'[^A-Z0-9]', '', text.upper())
+    return alphanum if len(alphanum) >= 4 else None
+
+
+def legacy_clean(text):
+    if not text:
+        return None
+    text = re.sub(r'[\n\r\t]', ' ', text)
+    text = re.sub(r'\s+', '', text)
+    text = re.sub(r'[^A-Z0-9]', '', text.upper())
+    if re.match(r'^[A-Z]{2}\d{1,2}[A-Z]{1,3}\d{1,4}$', text):
+        return text
+    if len(text) >= 4 and re.search(r'[A-Z]', text) and re.search(r'[0-9]', text):
+        if text[:2] in ['AP', 'TS', 'TN', 'KA', 'MH', 'DL', 'KL', 'UP', 'HR', 'GJ']:
+            return text
+        return f"TS{text}"
+    return None
+
+
+def legacy_state(plate):
+    match = re.match(r'^([A-Z]{2})', plate.strip().upper()) if plate else None
+    return LEGACY_STATE_PREFIXES.get(match.group(1), 'Unknown') if match else 'Unknown'
+
+
+def legacy_pipeline(text):
+    plate = legacy_clean(legacy_extract(text))
+    return plate, legacy_state(plate) if plate else 'Unknown'
+
+
+def grammar_pipeline(text):
+    plate = clean_plate_text(extract_plate_from_text(text))
+    return plate, detect_state_from_plate(plate) if plate else 'Unknown'
+
+
+def bench(name, fn, corpus, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in corpus:
+            fn(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:<22} {best * 1000:8.1f}ms  {best / len(corpus) * 1e6:6.2f}us/plate")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.size)
+    valid = sum(1 for text in corpus if find_plates(text))
+    known_state = sum(1 for text in corpus if grammar_pipeline(text)[1] != 'Unknown')
+    legacy_known = sum(1 for text in corpus if legacy_pipeline(text)[1] != 'Unknown')
+    print(f"corpus={len(corpus)} complete plates found={valid} "
+          f"state resolved: grammar={known_state} legacy={legacy_known}")
+
+    bench('parse_plate', parse_plate, corpus, args.repeat)
+    bench('find_plates', find_plates, corpus, args.repeat)
+    bench('legacy cascade', legacy_pipeline, corpus, args.repeat)
+    bench('grammar cascade', grammar_pipeline, corpus, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+Worker startup cost: time to first request and memory per worker.
+
+Starts gunicorn with gunicorn.conf.py on a scratch SQLite database, times
+how long it takes to answer its first request, optionally sends OCR
+requests so the workers load the OCR stack, then reports RSS and PSS
+(resident memory with shared pages divided between the processes sharing
+them) for the master and every worker. Runs with and without preload_app
+so the two can be compared, and times `import main` and create_app() in a
+fresh interpreter.
+
+    python benchmarks/bench_startup.py --workers 4 --ocr-requests 8
+
+Linux only: memory is read from /proc.
+"""
+import argparse
+import http.cookiejar
+import io
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Modules that should stay out of `import main`
+HEAVY_MODULES = ('PIL.Image', 'numpy', 'cv2', 'tesserocr', 'pytesseract')
+
+IMPORT_PROBE = f"""
+import sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.create_app()
+created = time.perf_counter()
+heavy = [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+print(round((imported - start) * 1000, 1), round((created - imported) * 1000, 1), ','.join(heavy) or '-')
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def scratch_env(database, **extra):
+    # Development mode recreates the schema, so never point it at a real database
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database}", APP_MODE='development')
+    env.update({key: str(value) for key, value in extra.items()})
+    return env
+
+
+def time_import(database):
+    """Milliseconds to import main and to run create_app, in a new interpreter"""
+    output = subprocess.run([sys.executable, '-c', IMPORT_PROBE], cwd=ROOT, env=scratch_env(database),
+                            capture_output=True, text=True, check=True).stdout.split()
+    return float(output[0]), float(output[1]), output[2]
+
+
+def children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def memory_kb(pid):
+    """RSS and PSS of a process in kB"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(':')
+            if name in ('Rss', 'Pss'):
+                values[name] = int(rest.split()[0])
+    return values['Rss'], values['Pss']
+
+
+def plate_jpeg():
+    from PIL import Image, ImageDraw, ImageFont
+    img = Image.new('RGB', (1280, 720), (90, 90, 90))
+    plate = Image.new('RGB', (640, 160), 'white')
+    ImageDraw.Draw(plate).text((20, 20), 'TS 09 AB 1234', fill='black', font=ImageFont.load_default(size=96))
+    img.paste(plate, (320, 400))
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def employee_opener(base_url):
+    from routes import EMPLOYEE_USERNAME, EMPLOYEE_PASSWORD
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    form = urllib.parse.urlencode({'login_type': 'employee', 'username': EMPLOYEE_USERNAME,
+                                   'password': EMPLOYEE_PASSWORD}).encode()
+    opener.open(base_url + '/login', form).read()
+    return opener
+
+
+def run_server(workers, preload, ocr_requests, timeout):
+    """
+    Start gunicorn, time its first response and measure its processes
+
+    Returns:
+        dict: 'first_request_s', 'workers_ready_s', 'ocr_s' and 'memory'
+              (list of (role, pid, rss_kb, pss_kb))
+    """
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as scratch:
+        env = scratch_env(os.path.join(scratch, 'bench.db'), PORT=port, WEB_CONCURRENCY=workers,
+                          GUNICORN_PRELOAD=int(preload))
+        start = time.perf_counter()
+        server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                                  cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            result = {}
+            while 'first_request_s' not in result:
+                if time.perf_counter() - start > timeout or server.poll() is not None:
+                    raise RuntimeError("gunicorn did not answer; run it by hand to see why")
+                try:
+                    urllib.request.urlopen(base_url + '/login', timeout=timeout).read()
+                    result['first_request_s'] = time.perf_counter() - start
+                except OSError:  # not listening yet
+                    time.sleep(0.02)
+            while len(children(server.pid)) < workers:
+                time.sleep(0.02)
+            result['workers_ready_s'] = time.perf_counter() - start
+
+            if ocr_requests:
+                opener = employee_opener(base_url)
+                image = plate_jpeg()
+                ocr_start = time.perf_counter()
+                for _ in range(ocr_requests):
+                    request = urllib.request.Request(base_url + '/process_image/upload', data=image,
+                                                     headers={'Content-Type': 'image/jpeg'})
+                    opener.open(request).read()
+                result['ocr_s'] = time.perf_counter() - ocr_start
+
+            result['memory'] = [('master', server.pid, *memory_kb(server.pid))]
+            result['memory'] += [('worker', pid, *memory_kb(pid)) for pid in children(server.pid)]
+            return result
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout)
+
+
+def print_server(name, result):
+    ocr = f"  {result['ocr_s']:.2f}s for OCR requests" if 'ocr_s' in result else ''
+    print(f"{name}: first request {result['first_request_s']:.2f}s, "
+          f"all workers {result['workers_ready_s']:.2f}s{ocr}")
+    for role, pid, rss, pss in result['memory']:
+        print(f"  {role:<7} {pid:>7}  RSS {rss / 1024:7.1f} MB  PSS {pss / 1024:7.1f} MB")
+    total = sum(pss for _, _, _, pss in result['memory'])
+    print(f"  total PSS {total / 1024:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--ocr-requests', type=int, default=0,
+                        help='OCR requests sent before measuring memory (0 measures idle workers)')
+    parser.add_argument('--repeat', type=int, default=3, help='import timings to take the best of')
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        timings = [time_import(os.path.join(scratch, f'import{i}.db')) for i in range(args.repeat)]
+    import_ms, create_ms, heavy = min(timings)
+    print(f"import main {import_ms:.0f}ms, create_app {create_ms:.0f}ms; heavy modules imported: {heavy}")
+
+    for preload in (True, False):
+        name = 'preload' if preload else 'no preload'
+        print_server(name, run_server(args.workers, preload, args.ocr_requests, args.timeout))
+
+
+if __name__ == '__main__':
+    main()
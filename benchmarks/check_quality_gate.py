@@ -0,0 +1,74 @@
+"""
+Sanity check for the OCR quality gate (frame_quality.frame_problem).
+
+Renders clean plates (binarised black on white, light on dark, a full
+scene and a grey-level plate crop) that must pass the gate, and hopeless
+frames (lens cap, blown out, heavy blur, flat grey) that must be rejected
+with the right reason. Prints the measurements of every case and exits
+with status 1 if any case gets the wrong verdict, so it can gate changes
+to the thresholds.
+
+    python benchmarks/check_quality_gate.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageOps  # noqa: E402
+
+from frame_quality import frame_problem, frame_quality  # noqa: E402
+
+
+def render_plate(text='TS 09 AB 1234', background=255, ink=0, size=96):
+    font = ImageFont.load_default(size=size)
+    left, top, right, bottom = font.getbbox(text)
+    pad = 24
+    plate = Image.new('L', (right - left + 2 * pad, bottom - top + 2 * pad), background)
+    draw = ImageDraw.Draw(plate)
+    draw.text((pad - left, pad - top), text, fill=ink, font=font)
+    draw.rectangle([3, 3, plate.width - 4, plate.height - 4], outline=ink, width=4)
+    return plate
+
+
+def render_scene(plate):
+    scene = Image.new('L', (1280, 720), 90)
+    scene.paste(plate, ((scene.width - plate.width) // 2, 400))
+    return scene
+
+
+def cases():
+    """(name, image, expected frame_problem result)"""
+    binary = render_plate()
+    # What binarisation hands over: only pure black and white, small enough
+    # not to be downscaled (so no grey edges) before it is scored
+    crop = render_plate(size=40).point(lambda level: 255 if level > 127 else 0)
+    yield 'binary plate', binary, None
+    yield 'inverted binary plate', ImageOps.invert(binary), None
+    yield 'binarised crop', crop, None
+    yield 'inverted binarised crop', ImageOps.invert(crop), None
+    yield 'grey plate crop', render_plate(background=200, ink=40), None
+    yield 'scene', render_scene(binary), None
+    yield 'lens cap', Image.new('L', (1280, 720), 3), 'underexposed'
+    yield 'blown out', Image.new('L', (1280, 720), 252), 'overexposed'
+    yield 'flat grey', Image.new('L', (1280, 720), 128), 'low_contrast'
+    yield 'motion blur', render_scene(binary).filter(ImageFilter.GaussianBlur(12)), 'blurred'
+
+
+def main():
+    failures = 0
+    for name, image, expected in cases():
+        quality = frame_quality(image)
+        problem = frame_problem(quality)
+        ok = problem == expected
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<24} expected {str(expected):<13} got {str(problem):<13} "
+              f"sharpness {quality['sharpness']:>8} contrast {quality['contrast']:>6} "
+              f"shadows {quality['shadows']:>5} highlights {quality['highlights']:>5}")
+    if failures:
+        print(f"{failures} case(s) got the wrong verdict")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+SQL statement budget check for the listing pages.
+
+Builds the app against a scratch SQLite database (the configured database
+is never touched), fills it with a small set of users, vehicles and fines,
+renders each page in sql_budget.PAGE_SQL_BUDGETS as an employee and as a
+vehicle owner, and compares the X-SQL-Statements header with the page's
+budget. Exits with status 1 when a page is over budget or fails to render,
+so it can gate changes to the queries behind those pages.
+
+    python benchmarks/check_sql_budget.py
+    flask --app main check-sql-budget
+
+A page over budget almost always means a relationship is lazy-loading per
+row, so the fixture has enough fines, vehicles and reasons to expose that.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIXTURE_FINES = 40
+FIXTURE_REASONS = ['Speeding', 'No Helmet', 'Red Light Jumping', 'Wrong Parking']
+FIXTURE_VEHICLES = [('TS09AB1234', 'Telangana'), ('AP01CD5678', 'Andhra Pradesh'), ('TS07EF9012', 'Telangana')]
+
+
+def seed(db):
+    """
+    Add an employee, one owner with several vehicles and their fines
+
+    Returns:
+        tuple: (employee id, owner id)
+    """
+    import fine_stats
+    from models import Fine, User, Vehicle
+
+    employee = User(username='budget-employee', is_employee=True)
+    owner = User(username=FIXTURE_VEHICLES[0][0])
+    db.session.add_all([employee, owner])
+    db.session.flush()
+    vehicles = [Vehicle(plate_number=plate, plate_key=plate, state=state, user_id=owner.id)
+                for plate, state in FIXTURE_VEHICLES]
+    db.session.add_all(vehicles)
+    db.session.flush()
+    start = datetime(2026, 1, 1)
+    for i in range(FIXTURE_FINES):
+        db.session.add(Fine(reason=FIXTURE_REASONS[i % len(FIXTURE_REASONS)], amount=100 + i % 7 * 50,
+                            date=start + timedelta(days=i % 30, hours=i), location=f'Junction {i % 5}',
+                            paid=i % 3 == 0, vehicle_id=vehicles[i % len(vehicles)].id,
+                            user_id=owner.id, created_by=employee.id))
+    db.session.commit()
+    fine_stats.rebuild()
+    return employee.id, owner.id
+
+
+def check_pages(app, db, employee_id, owner_id):
+    """
+    Render every budgeted page and compare its statement count with the budget
+
+    Returns:
+        list: (path, role, status code, statements, budget) per page
+    """
+    from flask import url_for
+    from sql_budget import PAGE_SQL_BUDGETS
+
+    checks = [(employee_id, True, 'employee_dashboard', {}), (employee_id, True, 'view_fines', {}),
+              (employee_id, True, 'search_fines', {}), (employee_id, True, 'search_fines', {'q': 'speeding'}),
+              (owner_id, False, 'user_dashboard', {}), (owner_id, False, 'view_fines', {}),
+              (owner_id, False, 'search_fines', {}), (owner_id, False, 'search_fines', {'q': 'TS09'})]
+    app.testing = True
+    client = app.test_client()
+    results = []
+    for user_id, is_employee, endpoint, args in checks:
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+            session['is_employee'] = is_employee
+        with app.test_request_context():
+            path = url_for(endpoint, **args)
+        # Start each request from an empty session so nothing is served from the identity map
+        db.session.remove()
+        response = client.get(path)
+        count = int(response.headers.get('X-SQL-Statements', 0))
+        results.append((path, 'employee' if is_employee else 'user', response.status_code,
+                        count, PAGE_SQL_BUDGETS[endpoint]))
+    return results
+
+
+def main():
+    with tempfile.TemporaryDirectory() as scratch:
+        # Read by app at import, so they must be set first
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(scratch, 'sql_budget.db')}"
+        os.environ['APP_MODE'] = 'production'
+
+        from app import create_app, db
+        from schema import upgrade_schema
+
+        app = create_app()
+        with app.app_context():
+            upgrade_schema()
+            employee_id, owner_id = seed(db)
+            results = check_pages(app, db, employee_id, owner_id)
+            db.session.remove()
+            db.engine.dispose()
+
+    failures = 0
+    for path, role, status_code, count, budget in results:
+        ok = status_code == 200 and count <= budget
+        failures += not ok
+        status = 'ok' if ok else (f'HTTP {status_code}' if status_code != 200 else 'OVER BUDGET')
+        print(f"{path} ({role}): {count} statements, budget {budget} - {status}")
+    if failures:
+        print(f"{failures} page(s) over their SQL statement budget or failing")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+import base64
+import binascii
+import hashlib
+import io
+import logging
+import os
+import re
+import tempfile
+
+from lazy_imports import lazy_import
+
+Image = lazy_import('PIL.Image')
+
+# Proof images live on disk, addressed by the SHA-256 of their bytes
+BLOB_STORE_DIR = os.environ.get(
+    "BLOB_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'blobs')
+)
+# Longest edge of the pre-generated thumbnails
+THUMBNAIL_SIZE = 320
+# Image formats accepted as proof, and the extension each is stored under
+IMAGE_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif', 'BMP': 'bmp'}
+
+# <sha256>.<ext>; anything else is rejected before touching the filesystem
+BLOB_KEY_PATTERN = re.compile(r'^[0-9a-f]{64}\.(?:jpg|png|webp|gif|bmp)$')
+
+
+class InvalidBlobError(ValueError):
+    """Raised when data handed to the blob store is not a supported image"""
+
+
+def decode_data_url(data_url):
+    """
+    Decode a base64 data URL (as produced by canvas.toDataURL or FileReader)
+
+    Args:
+        data_url: 'data:image/...;base64,...' string, or bare base64
+
+    Returns:
+        bytes: The decoded payload
+
+    Raises:
+        InvalidBlobError: If the data is not valid base64
+    """
+    if 'base64,' in data_url:
+        data_url = data_url.split('base64,', 1)[1]
+    try:
+        return base64.b64decode(data_url, validate=True)
+    except (binascii.Error, ValueError) as e:
+        raise InvalidBlobError(f"Invalid base64 image data: {str(e)}")
+
+
+def is_valid_key(key):
+    return bool(key and BLOB_KEY_PATTERN.match(key))
+
+
+def blob_path(key):
+    """Path of the stored image for a key"""
+    return os.path.join(BLOB_STORE_DIR, key[:2], key)
+
+
+def thumbnail_path(key):
+    """Path of the pre-generated JPEG thumbnail for a key"""
+    return os.path.join(BLOB_STORE_DIR, key[:2], key.rsplit('.', 1)[0] + '.thumb.jpg')
+
+
+def _write_atomic(path, data):
+    # Write next to the target and rename, so readers never see a partial file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def save_image(data):
+    """
+    Store an encoded image and its thumbnail, returning its content address
+
+    Saving the same bytes twice is a no-op that returns the same key.
+
+    Args:
+        data: Encoded image bytes
+
+    Returns:
+        str: Blob key ('<sha256>.<ext>')
+
+    Raises:
+        InvalidBlobError: If the data is not a supported image
+    """
+    try:
+        img = Image.open(io.BytesIO(data))
+        extension = IMAGE_EXTENSIONS.get(img.format)
+    except Exception as e:
+        raise InvalidBlobError(f"Not an image: {str(e)}")
+    if not extension:
+        raise InvalidBlobError(f"Unsupported image format: {img.format}")
+
+    key = f"{hashlib.sha256(data).hexdigest()}.{extension}"
+    path = blob_path(key)
+    if not os.path.exists(path):
+        _write_atomic(path, data)
+
+    if not os.path.exists(thumbnail_path(key)):
+        try:
+            _write_thumbnail(key, img)
+        except Exception as e:
+            # The full image is still stored; ensure_thumbnail retries on first view
+            logging.error(f"Could not create thumbnail for {key}: {str(e)}")
+
+    return key
+
+
+def _write_thumbnail(key, img):
+    thumb = img.convert('RGB')
+    thumb.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    thumb.save(buffer, format='JPEG', quality=80, optimize=True)
+    _write_atomic(thumbnail_path(key), buffer.getvalue())
+
+
+def ensure_thumbnail(key):
+    """
+    Return the thumbnail path for a stored image, generating it if missing
+
+    Returns:
+        str: Thumbnail path, or None if the image itself is not stored
+    """
+    path = thumbnail_path(key)
+    if os.path.exists(path):
+        return path
+    if not os.path.exists(blob_path(key)):
+        return None
+    with Image.open(blob_path(key)) as img:
+        _write_thumbnail(key, img)
+    return path
+
+
+def save_data_url(data_url):
+    """
+    Store a base64 data URL image
+
+    Returns:
+        str: Blob key, or None if data_url is empty
+
+    Raises:
+        InvalidBlobError: If the data is not a supported image
+    """
+    if not data_url:
+        return None
+    return save_image(decode_data_url(data_url))
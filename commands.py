@@ -0,0 +1,124 @@
+import logging
+import os
+import subprocess
+import sys
+
+import click
+from sqlalchemy.orm import undefer
+
+from app import app, db
+from blob_store import save_data_url, InvalidBlobError
+import fine_import
+import fine_stats
+from models import Fine, FineAggregate, User
+from plate_index import backfill_plate_keys
+from schema import upgrade_schema
+import search
+
+
+@app.cli.command('init-db')
+@click.option('--drop', is_flag=True, help='Drop all tables first (destroys all data).')
+def init_db(drop):
+    """Create the database schema, or upgrade an existing one in place."""
+    if drop:
+        click.confirm('Drop every table and all data?', abort=True)
+        db.drop_all()
+
+    changes = upgrade_schema()
+    for change in changes:
+        click.echo(change)
+
+    # Vehicles registered before plates were normalised
+    updated, duplicates = backfill_plate_keys()
+    if updated or duplicates:
+        click.echo(f"Set plate keys on {updated} vehicles ({duplicates} duplicates left unset)")
+
+    # Databases created before the aggregates table existed need it filled once
+    if Fine.query.first() and not FineAggregate.query.first():
+        click.echo(f"Rebuilt {fine_stats.rebuild()} fine aggregate rows")
+
+    click.echo(f"Database is up to date ({len(changes)} changes)")
+
+
+@app.cli.command('migrate-proof-images')
+@click.option('--batch-size', default=100, show_default=True,
+              help='Fines moved per transaction.')
+def migrate_proof_images(batch_size):
+    """Move inline base64 proof images out of the fine table into the blob store."""
+    moved = failed = 0
+    last_id = 0
+    while True:
+        # Walk by primary key so each batch only loads the rows it rewrites;
+        # the deferred image is loaded with the batch, not one query per fine
+        fines = (Fine.query
+                 .options(undefer(Fine.proof_image))
+                 .filter(Fine.id > last_id, Fine.proof_image.isnot(None))
+                 .order_by(Fine.id)
+                 .limit(batch_size)
+                 .all())
+        if not fines:
+            break
+
+        for fine in fines:
+            last_id = fine.id
+            try:
+                fine.proof_image_key = save_data_url(fine.proof_image)
+                fine.proof_image = None
+                moved += 1
+            except InvalidBlobError as e:
+                logging.error(f"Fine {fine.id}: could not migrate proof image: {str(e)}")
+                failed += 1
+        db.session.commit()
+        db.session.expunge_all()
+
+    click.echo(f"Moved {moved} proof images to the blob store, {failed} failed")
+
+
+@app.cli.command('check-sql-budget')
+def check_sql_budget():
+    """Render the listing pages on a scratch database and fail if any is over its SQL budget."""
+    # A fresh interpreter, so the app is configured for the scratch database
+    # and the one this command was started with is never seeded or reset
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'check_sql_budget.py')
+    if subprocess.run([sys.executable, script]).returncode:
+        raise click.ClickException("Pages over their SQL statement budget (see above)")
+
+
+@app.cli.command('rebuild-fine-stats')
+def rebuild_fine_stats():
+    """Recompute the fine aggregates table from the fine table."""
+    rows = fine_stats.rebuild()
+    click.echo(f"Rebuilt {rows} fine aggregate rows")
+
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index():
+    """Re-index every fine for search (normally kept in step by triggers)."""
+    with db.engine.begin() as connection:
+        search.install_search_index(connection)
+    click.echo(f"Indexed {search.rebuild_search_index()} fines for search")
+
+
+@app.cli.command('import-fines')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'import_format', type=click.Choice(fine_import.IMPORT_FORMATS),
+              help='Input format (default: from the file extension).')
+@click.option('--chunk-size', default=fine_import.FINE_IMPORT_CHUNK_SIZE, show_default=True,
+              help='Fines inserted per transaction.')
+@click.option('--created-by', default='manager', show_default=True,
+              help='Username of the employee the fines are recorded against.')
+def import_fines(path, import_format, chunk_size, created_by):
+    """Bulk import fines from a CSV or JSON-lines file."""
+    employee = User.query.filter_by(username=created_by, is_employee=True).first()
+    if not employee:
+        raise click.ClickException(f"No employee named {created_by}")
+
+    with open(path, 'rb') as f:
+        records = fine_import.read_rows(f, import_format or fine_import.detect_format(path))
+        summary = fine_import.import_fines(records, employee.id, chunk_size=chunk_size)
+
+    for error in summary['errors']:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+    click.echo(f"Imported {summary['imported']} fines, skipped {summary['skipped']}; "
+               f"created {summary['users_created']} users and {summary['vehicles_created']} vehicles "
+               f"in {summary['elapsed_s']}s ({summary['rows_per_second']} rows/s)")
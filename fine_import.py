@@ -0,0 +1,222 @@
+import csv
+import io
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from fine_stats import new_deltas, add_fine, apply_deltas
+from models import User, Vehicle, Fine
+from plate_index import normalize_plate
+from state_detection import detect_state_from_plate
+
+# Rows inserted per transaction
+FINE_IMPORT_CHUNK_SIZE = int(os.environ.get("FINE_IMPORT_CHUNK_SIZE", "1000"))
+# Invalid rows reported back in detail; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+IMPORT_FORMATS = ('csv', 'jsonl')
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 'paid')
+DATE_FORMATS = ('%d-%m-%Y', '%d-%m-%Y %H:%M', '%Y-%m-%d')
+
+
+class ImportFormatError(ValueError):
+    """Raised when an import file cannot be read at all"""
+
+
+def detect_format(filename, default='csv'):
+    """Import format implied by a file name"""
+    if filename and filename.lower().endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    return default
+
+
+def read_rows(stream, format='csv'):
+    """
+    Yield (line number, record dict) from a CSV or JSON-lines byte stream
+
+    CSV files need a header row naming the columns: plate_number, reason,
+    amount, location and optionally date and paid.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if format == 'csv':
+        reader = csv.DictReader(text)
+        if not reader.fieldnames or 'plate_number' not in reader.fieldnames:
+            raise ImportFormatError("CSV header must include plate_number, reason, amount and location")
+        for record in reader:
+            yield reader.line_num, record
+    elif format == 'jsonl':
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                record = {'_error': f"Invalid JSON: {str(e)}"}
+            yield line_number, record if isinstance(record, dict) else {'_error': 'Expected a JSON object'}
+    else:
+        raise ImportFormatError(f"Unsupported format: {format}")
+
+
+def _parse_date(value):
+    if not value:
+        return datetime.utcnow()
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date: {value}")
+
+
+def parse_record(record):
+    """
+    Validate one import record
+
+    Returns:
+        dict: Normalised fine values plus 'plate_number'
+
+    Raises:
+        ValueError: If the record is invalid
+    """
+    if '_error' in record:
+        raise ValueError(record['_error'])
+    plate_number = normalize_plate(str(record.get('plate_number') or ''))
+    reason = str(record.get('reason') or '').strip()
+    location = str(record.get('location') or '').strip()
+    if not plate_number or not reason or not location:
+        raise ValueError("plate_number, reason and location are required")
+    if len(plate_number) > 20 or len(reason) > 200 or len(location) > 100:
+        raise ValueError("Field too long")
+    try:
+        amount = float(record.get('amount'))
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid amount: {record.get('amount')!r}")
+    if amount <= 0:
+        raise ValueError("Amount must be positive")
+    paid = record.get('paid')
+    paid = paid if isinstance(paid, bool) else str(paid or '').strip().lower() in TRUE_VALUES
+    return {
+        'plate_number': plate_number,
+        'reason': reason,
+        'amount': amount,
+        'location': location,
+        'date': _parse_date(str(record.get('date') or '').strip()),
+        'paid': paid
+    }
+
+
+def _resolve_vehicles(plates):
+    """
+    Map normalised plates to vehicles, creating missing users and vehicles
+
+    Each step is one set-based SELECT or one multi-row INSERT, however many
+    plates the chunk contains.
+
+    Returns:
+        tuple: (dict plate -> (vehicle id, user id, state), users created, vehicles created)
+    """
+    vehicles = {plate: (vehicle_id, user_id, state) for plate, vehicle_id, user_id, state in
+                db.session.query(Vehicle.plate_key, Vehicle.id, Vehicle.user_id, Vehicle.state)
+                .filter(Vehicle.plate_key.in_(plates))}
+    missing = [plate for plate in plates if plate not in vehicles]
+    if not missing:
+        return vehicles, 0, 0
+
+    # As in new_fine, a vehicle without an owner gets a user named after its plate
+    users = dict(db.session.query(User.username, User.id).filter(User.username.in_(missing)))
+    new_users = [plate for plate in missing if plate not in users]
+    if new_users:
+        db.session.execute(insert(User), [{'username': plate, 'is_employee': False} for plate in new_users])
+        users.update(db.session.query(User.username, User.id).filter(User.username.in_(new_users)))
+
+    db.session.execute(insert(Vehicle), [
+        {'plate_number': plate, 'plate_key': plate, 'state': detect_state_from_plate(plate), 'user_id': users[plate]}
+        for plate in missing
+    ])
+    vehicles.update({plate: (vehicle_id, user_id, state) for plate, vehicle_id, user_id, state in
+                     db.session.query(Vehicle.plate_key, Vehicle.id, Vehicle.user_id, Vehicle.state)
+                     .filter(Vehicle.plate_key.in_(missing))})
+    return vehicles, len(new_users), len(missing)
+
+
+def _import_chunk(rows, created_by):
+    plates = sorted({row['plate_number'] for row in rows})
+    vehicles, users_created, vehicles_created = _resolve_vehicles(plates)
+
+    fines = []
+    deltas = new_deltas()
+    for row in rows:
+        vehicle_id, user_id, state = vehicles[row['plate_number']]
+        values = dict(row, vehicle_id=vehicle_id, user_id=user_id, created_by=created_by)
+        del values['plate_number']
+        fines.append(values)
+        add_fine(deltas, Fine(**values), state)
+
+    db.session.execute(insert(Fine), fines)
+    apply_deltas(deltas)
+    db.session.commit()
+    return users_created, vehicles_created
+
+
+def import_fines(records, created_by, chunk_size=FINE_IMPORT_CHUNK_SIZE):
+    """
+    Insert fines in bulk, one transaction per chunk
+
+    Invalid records are skipped and reported; they do not abort the import.
+
+    Args:
+        records: Iterable of (line number, record dict), e.g. from read_rows
+        created_by: Id of the employee the fines are recorded against
+        chunk_size: Fines per transaction
+
+    Returns:
+        dict: Counts of imported and skipped rows, created users/vehicles,
+              the first MAX_REPORTED_ERRORS errors and throughput
+    """
+    started = time.perf_counter()
+    summary = {'imported': 0, 'skipped': 0, 'users_created': 0, 'vehicles_created': 0, 'errors': []}
+
+    def flush(chunk):
+        for attempt in range(2):
+            try:
+                users_created, vehicles_created = _import_chunk(chunk, created_by)
+                break
+            except IntegrityError:
+                # Another writer created one of the same users/vehicles; look them up again
+                db.session.rollback()
+                if attempt:
+                    raise
+        summary['imported'] += len(chunk)
+        summary['users_created'] += users_created
+        summary['vehicles_created'] += vehicles_created
+
+    chunk = []
+    for line_number, record in records:
+        try:
+            chunk.append(parse_record(record))
+        except ValueError as e:
+            summary['skipped'] += 1
+            if len(summary['errors']) < MAX_REPORTED_ERRORS:
+                summary['errors'].append({'line': line_number, 'error': str(e)})
+            continue
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+
+    elapsed = time.perf_counter() - started
+    summary['elapsed_s'] = round(elapsed, 3)
+    summary['rows_per_second'] = round(summary['imported'] / elapsed, 1) if elapsed else None
+    logging.info(f"Imported {summary['imported']} fines ({summary['skipped']} skipped) "
+                 f"in {elapsed:.2f}s")
+    return summary
@@ -0,0 +1,191 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from models import Fine, FineAggregate, Vehicle
+
+# Primary key of the grand-total row
+TOTAL = ('total', '')
+# Longest key stored; matches FineAggregate.key
+MAX_KEY_LENGTH = 200
+
+
+def _keys(fine, state):
+    """(dimension, key) rows a fine contributes to"""
+    return [
+        TOTAL,
+        ('reason', fine.reason[:MAX_KEY_LENGTH]),
+        ('state', (state or 'Unknown')[:MAX_KEY_LENGTH]),
+        ('location', fine.location.strip()[:MAX_KEY_LENGTH]),
+        ('day', fine.date.strftime('%Y-%m-%d'))
+    ]
+
+
+def new_deltas():
+    """Accumulator of [count, amount, paid_count, paid_amount] per (dimension, key)"""
+    return defaultdict(lambda: [0, 0.0, 0, 0.0])
+
+
+def add_fine(deltas, fine, state):
+    """Accumulate the contribution of a newly created fine"""
+    paid = bool(fine.paid)
+    for key in _keys(fine, state):
+        delta = deltas[key]
+        delta[0] += 1
+        delta[1] += fine.amount
+        delta[2] += paid
+        delta[3] += fine.amount if paid else 0.0
+
+
+def add_payment_change(deltas, fine, state):
+    """Accumulate a fine's paid flag having just been flipped to fine.paid"""
+    sign = 1 if fine.paid else -1
+    for key in _keys(fine, state):
+        delta = deltas[key]
+        delta[2] += sign
+        delta[3] += sign * fine.amount
+
+
+def apply_deltas(deltas):
+    """
+    Add accumulated deltas to the aggregates table in the current transaction
+
+    Each row is changed with a single UPDATE ... SET count = count + n, so
+    concurrent writers never lose increments. Rows that do not exist yet
+    are inserted; if another writer inserts the same row first, the
+    increment is applied to theirs.
+
+    Args:
+        deltas: Accumulator from new_deltas()
+    """
+    for (dimension, key), (count, amount, paid_count, paid_amount) in deltas.items():
+        if not (count or paid_count):
+            continue
+        increment = (
+            update(FineAggregate)
+            .where(FineAggregate.dimension == dimension, FineAggregate.key == key)
+            .values(count=FineAggregate.count + count,
+                    amount=FineAggregate.amount + amount,
+                    paid_count=FineAggregate.paid_count + paid_count,
+                    paid_amount=FineAggregate.paid_amount + paid_amount)
+            .execution_options(synchronize_session=False)
+        )
+        if db.session.execute(increment).rowcount:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(FineAggregate).values(
+                    dimension=dimension, key=key, count=count, amount=amount,
+                    paid_count=paid_count, paid_amount=paid_amount))
+        except IntegrityError:
+            db.session.execute(increment)
+
+
+def record_new_fine(fine, state):
+    """Count a fine that has been flushed but not yet committed"""
+    deltas = new_deltas()
+    add_fine(deltas, fine, state)
+    apply_deltas(deltas)
+
+
+def record_payment_change(fine, state):
+    """Count a change of fine.paid that has not yet been committed"""
+    deltas = new_deltas()
+    add_payment_change(deltas, fine, state)
+    apply_deltas(deltas)
+
+
+def rebuild():
+    """
+    Recompute every aggregate from the fine table in one transaction
+
+    Returns:
+        int: Number of aggregate rows written
+    """
+    paid = case((Fine.paid == True, 1), else_=0)  # noqa: E712
+    paid_amount = case((Fine.paid == True, Fine.amount), else_=0.0)  # noqa: E712
+    columns = [func.count(), func.coalesce(func.sum(Fine.amount), 0.0),
+               func.coalesce(func.sum(paid), 0), func.coalesce(func.sum(paid_amount), 0.0)]
+
+    # Keys are normalised in Python so truncation and date formatting
+    # match what the incremental path writes
+    sources = {
+        'total': (None, None),
+        'reason': (Fine.reason, None),
+        'state': (Vehicle.state, Vehicle),
+        'location': (Fine.location, None),
+        'day': (func.date(Fine.date), None)
+    }
+    deltas = new_deltas()
+    for dimension, (column, join) in sources.items():
+        query = select(*([column] if column is not None else []), *columns).select_from(Fine)
+        if join is not None:
+            query = query.join(join, Fine.vehicle_id == Vehicle.id)
+        if column is not None:
+            query = query.group_by(column)
+        for row in db.session.execute(query):
+            if column is None:
+                key = ''
+            elif dimension == 'day':
+                key = str(row[0])[:10]
+            elif dimension == 'location':
+                key = row[0].strip()[:MAX_KEY_LENGTH]
+            else:
+                key = (row[0] or 'Unknown')[:MAX_KEY_LENGTH]
+            delta = deltas[(dimension, key)]
+            for i, value in enumerate(row[-4:]):
+                delta[i] += value
+
+    db.session.execute(delete(FineAggregate))
+    db.session.add_all(FineAggregate(dimension=dimension, key=key, count=count, amount=amount,
+                                     paid_count=paid_count, paid_amount=paid_amount)
+                       for (dimension, key), (count, amount, paid_count, paid_amount) in deltas.items())
+    db.session.commit()
+    logging.info(f"Rebuilt {len(deltas)} fine aggregate rows")
+    return len(deltas)
+
+
+def get_totals():
+    """Grand totals in the fine_summary format, from a single primary-key lookup"""
+    row = db.session.get(FineAggregate, TOTAL)
+    if row is None:
+        return FineAggregate(count=0, amount=0.0, paid_count=0, paid_amount=0.0).to_dict()
+    return row.to_dict()
+
+
+def get_top(dimension, limit=10):
+    """Largest aggregate rows of a dimension by count, as (key, FineAggregate) pairs"""
+    rows = (FineAggregate.query
+            .filter_by(dimension=dimension)
+            .filter(FineAggregate.count > 0)
+            .order_by(FineAggregate.count.desc(), FineAggregate.key)
+            .limit(limit)
+            .all())
+    return [(row.key, row) for row in rows]
+
+
+def get_stats(limit=10, days=30):
+    """
+    Dashboard statistics served by /stats/fines
+
+    Args:
+        limit: Rows returned per reason/state/location breakdown
+        days: How many recent days the daily series covers
+
+    Returns:
+        dict: totals, per-dimension breakdowns and the daily series
+    """
+    since = (datetime.utcnow() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+    daily = (FineAggregate.query
+             .filter(FineAggregate.dimension == 'day', FineAggregate.key >= since)
+             .order_by(FineAggregate.key)
+             .all())
+    stats = {'totals': get_totals()}
+    for dimension in ('reason', 'state', 'location'):
+        stats[f'by_{dimension}'] = [dict(row.to_dict(), key=key) for key, row in get_top(dimension, limit)]
+    stats['by_day'] = [dict(row.to_dict(), key=row.key) for row in daily]
+    return stats
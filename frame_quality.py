@@ -0,0 +1,108 @@
+import math
+import os
+
+from lazy_imports import lazy_import, optional_import
+
+ImageFilter = lazy_import('PIL.ImageFilter')
+ImageStat = lazy_import('PIL.ImageStat')
+cv2 = optional_import('cv2')
+np = optional_import('numpy')
+
+# Frames are scored on a copy this small; focus and contrast survive the
+# downscale and scoring stays around a millisecond per frame
+QUALITY_MAX_DIMENSION = 320
+# Grey-level standard deviation beyond which more contrast does not help OCR
+CONTRAST_TARGET = 48.0
+
+# Quality gate: frames below these are not worth any OCR. The defaults only
+# catch hopeless frames (heavy motion blur, lens cap, pointing at the sun);
+# sharpness is measured at QUALITY_MAX_DIMENSION
+OCR_QUALITY_GATE = os.environ.get("OCR_QUALITY_GATE", "1") == "1"
+OCR_MIN_SHARPNESS = float(os.environ.get("OCR_MIN_SHARPNESS", "15"))
+OCR_MIN_CONTRAST = float(os.environ.get("OCR_MIN_CONTRAST", "8"))
+# Exposure: a frame is under- or overexposed when more than OCR_MAX_CLIPPED
+# of its pixels are crushed shadows (or blown highlights) and its contrast
+# is below OCR_MAX_EXPOSED_CONTRAST. A sharp black-on-white plate has most
+# pixels at the two ends of the range, but split between them and with
+# high contrast, so it passes
+OCR_MAX_CLIPPED = float(os.environ.get("OCR_MAX_CLIPPED", "0.85"))
+OCR_MAX_EXPOSED_CONTRAST = float(os.environ.get("OCR_MAX_EXPOSED_CONTRAST", "24"))
+# Grey levels counted as crushed shadows or blown highlights
+CLIP_LOW = 8
+CLIP_HIGH = 247
+
+
+def _small_gray(image):
+    gray = image.convert('L')
+    if max(gray.size) > QUALITY_MAX_DIMENSION:
+        gray = gray.copy()
+        gray.thumbnail((QUALITY_MAX_DIMENSION, QUALITY_MAX_DIMENSION))
+    return gray
+
+
+def frame_quality(image):
+    """
+    Cheap focus and contrast measurements of a frame
+
+    Sharpness is the variance of the Laplacian: motion blur and missed
+    focus remove the high frequencies it responds to. Contrast is the
+    standard deviation of the grey levels, brightness their mean, and
+    shadows and highlights the fractions of crushed and blown-out pixels.
+
+    Args:
+        image: Decoded PIL image
+
+    Returns:
+        dict: 'sharpness', 'contrast', 'brightness', 'shadows',
+              'highlights' and 'score' (higher is better; only meaningful
+              for comparing frames of the same scene)
+    """
+    gray = _small_gray(image)
+    histogram = gray.histogram()
+    pixel_count = gray.width * gray.height
+    shadows = sum(histogram[:CLIP_LOW + 1]) / pixel_count
+    highlights = sum(histogram[CLIP_HIGH:]) / pixel_count
+    if cv2 is not None:
+        pixels = np.asarray(gray)
+        sharpness = float(cv2.Laplacian(pixels, cv2.CV_32F).var())
+        contrast = float(pixels.std())
+        brightness = float(pixels.mean())
+    else:
+        sharpness = ImageStat.Stat(gray.filter(ImageFilter.FIND_EDGES)).var[0]
+        stat = ImageStat.Stat(gray)
+        contrast = stat.stddev[0]
+        brightness = stat.mean[0]
+    score = math.log1p(sharpness) * min(contrast, CONTRAST_TARGET) / CONTRAST_TARGET
+    return {
+        'sharpness': round(sharpness, 2),
+        'contrast': round(contrast, 2),
+        'brightness': round(brightness, 1),
+        'shadows': round(shadows, 3),
+        'highlights': round(highlights, 3),
+        'score': round(score, 4)
+    }
+
+
+def frame_problem(quality):
+    """
+    Why a frame is not worth OCR'ing, if it is not
+
+    Args:
+        quality: Dict returned by frame_quality
+
+    Returns:
+        str: 'blurred', 'underexposed', 'overexposed' or 'low_contrast',
+             or None if the frame passes (or OCR_QUALITY_GATE is off)
+    """
+    if not OCR_QUALITY_GATE:
+        return None
+    if quality['contrast'] < OCR_MAX_EXPOSED_CONTRAST:
+        if quality['shadows'] > OCR_MAX_CLIPPED:
+            return 'underexposed'
+        if quality['highlights'] > OCR_MAX_CLIPPED:
+            return 'overexposed'
+    if quality['contrast'] < OCR_MIN_CONTRAST:
+        return 'low_contrast'
+    if quality['sharpness'] < OCR_MIN_SHARPNESS:
+        return 'blurred'
+    return None
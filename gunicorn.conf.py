@@ -0,0 +1,45 @@
+"""
+Gunicorn settings: build the app once in the master and fork the workers.
+
+    gunicorn -c gunicorn.conf.py
+
+The master imports the app (and with GUNICORN_PRELOAD_OCR the imaging and
+OCR libraries), then freezes the garbage collector so those objects are
+never written to again; workers share their pages copy-on-write instead of
+each importing and holding a private copy. Per-process state (database
+connections, the Tesseract engine pool, OCR caches and job threads) is
+reset in each worker by the os.register_at_fork hooks of its module.
+
+Worker count and port come from WEB_CONCURRENCY and PORT, as before.
+"""
+import gc
+import os
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+wsgi_app = "main:create_app()"
+
+# Import PIL, OpenCV, NumPy and tesserocr in the master as well
+GUNICORN_PRELOAD_OCR = os.environ.get("GUNICORN_PRELOAD_OCR", "1") == "1"
+
+
+def on_starting(server):
+    # Once, in the master: the factory never resets (every worker without
+    # preload, and every flask CLI command, runs it)
+    from app import reset_development_database
+    reset_development_database()
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before any worker forks
+    if preload_app and GUNICORN_PRELOAD_OCR:
+        import ocr_utils
+        ocr_utils.preload_ocr()
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        # Move everything allocated so far out of the collector's reach:
+        # a collection touches every tracked object's header, which would
+        # copy the shared pages into each worker
+        gc.collect()
+        gc.freeze()
@@ -0,0 +1,90 @@
+import importlib
+import importlib.util
+import logging
+import threading
+
+# Every lazy module created, for preload()
+_registry = []
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is only imported on first attribute access
+
+    Keeps PIL, NumPy, OpenCV and tesserocr out of the import of main, so
+    the CLI and workers that never OCR start quickly. A gunicorn master
+    imports them up front instead (see gunicorn.conf.py).
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        module = self._module or self._load()
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name):
+    """
+    Module imported on first use
+
+    Args:
+        name: Dotted module name
+
+    Returns:
+        LazyModule: Proxy forwarding attribute access to the module
+    """
+    return LazyModule(name)
+
+
+def optional_import(name):
+    """
+    Like lazy_import, for optional dependencies
+
+    Only checks that the module is installed; a module that is installed
+    but fails to import raises ImportError at first use.
+
+    Returns:
+        LazyModule, or None if the module is not installed
+    """
+    try:
+        if importlib.util.find_spec(name) is None:
+            return None
+    except (ImportError, ValueError):
+        return None
+    return LazyModule(name)
+
+
+def preload(*modules):
+    """
+    Import lazy modules now, e.g. in a server process before it forks
+
+    Args:
+        modules: LazyModules to import; all of them if none are given
+
+    Returns:
+        list: Names of the modules imported
+    """
+    loaded = []
+    for module in modules or list(_registry):
+        if not isinstance(module, LazyModule):
+            continue
+        try:
+            module._load()
+            loaded.append(module._name)
+        except ImportError as e:
+            logging.warning(f"Could not preload {module._name}: {str(e)}")
+    return loaded
@@ -1,8 +1,8 @@
-from app import app  # noqa: F401
-import routes  # noqa: F401
+from app import create_app  # noqa: F401  (gunicorn "main:create_app()", flask --app main)
 
 if __name__ == "__main__":
     import os
+    from app import reset_development_database
     port = int(os.environ.get("PORT", 5000))
-    app.run(host="0.0.0.0", port=port)
- 
\ No newline at end of file
+    reset_development_database()
+    create_app().run(host="0.0.0.0", port=port)
@@ -0,0 +1,190 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # An unlabelled counter is exported as 0 before its first increment
+        self._values = {} if self.labelnames else {(): 0}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield self.name + '_total', _format_labels(self.labelnames, key), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._values = {}  # label values -> [bucket counts..., sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * len(self.buckets) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            counts[-1] += value
+
+    def count(self, **labels):
+        counts = self._values.get(tuple(str(labels[name]) for name in self.labelnames))
+        return sum(counts[:-1]) if counts else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(counts)) for key, counts in self._values.items())
+        for key, counts in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield (self.name + '_bucket',
+                       _format_labels(self.labelnames, key, [('le', _format_value(bound))]), cumulative)
+            yield self.name + '_sum', _format_labels(self.labelnames, key), round(counts[-1], 6)
+            yield self.name + '_count', _format_labels(self.labelnames, key), cumulative
+
+
+class Registry:
+    """
+    Process-wide collection of metrics, rendered in the Prometheus text format.
+
+    Each gunicorn worker keeps its own registry, so a scrape reports the
+    worker that answered it; aggregate across workers with sum() in queries.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Time to handle a request, by route',
+    ['endpoint', 'method', 'status'])
+OCR_STAGE_SECONDS = REGISTRY.histogram(
+    'ocr_stage_duration_seconds', 'Time spent in each stage of the OCR pipeline', ['stage'])
+TESSERACT_SECONDS = REGISTRY.histogram(
+    'ocr_tesseract_duration_seconds', 'Time per Tesseract invocation', ['psm', 'engine'])
+TESSERACT_CALLS = REGISTRY.counter(
+    'ocr_tesseract_calls', 'Tesseract invocations by outcome (text, empty, failed)', ['psm', 'outcome'])
+OCR_ACCEPTED_PSM = REGISTRY.counter(
+    'ocr_accepted_psm', 'Page segmentation mode that produced the accepted reading', ['psm', 'match'])
+OCR_FALLBACKS = REGISTRY.counter(
+    'ocr_fallback', 'Images that needed the raw-text fallback after the PSM cascade')
+OCR_RESULTS = REGISTRY.counter(
+    'ocr_results', 'Images processed, by outcome (plate, no_plate, rejected, cached, error)', ['outcome'])
+
+
+@contextmanager
+def stage_timer(stage):
+    """Record the time spent in a block under ocr_stage_duration_seconds"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        OCR_STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def observe_tesseract(psm, engine, seconds, result):
+    """Record one Tesseract invocation and what it returned"""
+    text = getattr(result, 'text', result)
+    outcome = 'failed' if result is None else ('text' if text else 'empty')
+    TESSERACT_SECONDS.observe(seconds, psm=psm, engine=engine)
+    TESSERACT_CALLS.inc(psm=psm, outcome=outcome)
+
+
+def observe_ocr_result(result, failed=False):
+    """
+    Record an analyze_image result: per-stage timings, the outcome and
+    the page segmentation mode of the plate returned
+
+    Called once per image (or burst), so ocr_accepted_psm counts only the
+    winning reading, not every cascade run on a region or frame.
+
+    Args:
+        result: Dict returned by ocr_utils.analyze_image or
+                ocr_burst.analyze_burst (timings in ms)
+        failed: The pipeline hit an error part way through
+    """
+    for stage, ms in result['timings'].items():
+        OCR_STAGE_SECONDS.observe(ms / 1000, stage=stage)
+    if failed:
+        outcome = 'error'
+    elif result['cached']:
+        outcome = 'cached'
+    elif result.get('rejected'):
+        outcome = 'rejected'
+    else:
+        outcome = 'plate' if result['plate_number'] else 'no_plate'
+    OCR_RESULTS.inc(outcome=outcome)
+    if outcome == 'plate':
+        best = result['candidates'][0]
+        if best.get('psm') is not None:
+            OCR_ACCEPTED_PSM.inc(psm=best['psm'], match=best['match'])
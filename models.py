@@ -1,4 +1,7 @@
+import json
 from datetime import datetime
+from sqlalchemy.orm import deferred
+
 from app import db
 
 
@@ -40,6 +43,8 @@ class User(db.Model):
 class Vehicle(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     plate_number = db.Column(db.String(20), unique=True, nullable=False)
+    # plate_index.normalize_plate(plate_number); what lookups and uniqueness go by
+    plate_key = db.Column(db.String(20), unique=True, index=True, nullable=True)
     state = db.Column(db.String(20), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
@@ -57,12 +62,87 @@ class Fine(db.Model):
     date = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     location = db.Column(db.String(100), nullable=False)
     paid = db.Column(db.Boolean, default=False)
-    proof_image = db.Column(db.Text, nullable=True)  # Store base64 encoded image
+    # Last time paid was toggled; lets other workers' watchlists catch up
+    payment_updated_at = db.Column(db.DateTime, nullable=True, index=True)
+    # Content address of the proof image in blob_store; the image itself lives on disk
+    proof_image_key = db.Column(db.String(80), nullable=True, index=True)
+    # Legacy inline base64 image, only read by the migrate-proof-images command
+    proof_image = deferred(db.Column(db.Text, nullable=True))
     
     # Foreign keys
     vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
+    # Indexes behind the keyset-paginated listings and their filters (see queries.py)
+    __table_args__ = (
+        db.Index('ix_fine_date_id', 'date', 'id'),
+        db.Index('ix_fine_amount_id', 'amount', 'id'),
+        db.Index('ix_fine_user_date', 'user_id', 'date', 'id'),
+        db.Index('ix_fine_paid_date', 'paid', 'date', 'id'),
+        db.Index('ix_fine_vehicle_date', 'vehicle_id', 'date'),
+    )
+    
     def __repr__(self):
         return f'<Fine {self.id} for Vehicle {self.vehicle_id}>'
+
+
+class OcrJob(db.Model):
+    """A queued /process_image request; shared by all web workers via the database"""
+    id = db.Column(db.String(32), primary_key=True)
+    status = db.Column(db.String(16), default='queued', nullable=False)  # queued, running, done, failed
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    submitted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True, index=True)
+    result = db.Column(db.Text, nullable=True)  # JSON response body once done
+    error = db.Column(db.String(500), nullable=True)
+    
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+    
+    def to_dict(self):
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'submitted_at': self.submitted_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+        if self.result:
+            data['result'] = json.loads(self.result)
+        if self.error:
+            data['error'] = self.error
+        return data
+    
+    def __repr__(self):
+        return f'<OcrJob {self.id} {self.status}>'
+
+
+class FineAggregate(db.Model):
+    """
+    Running totals of fines per dimension value, maintained by fine_stats.py.
+    
+    dimension is one of 'total', 'reason', 'state', 'location' or 'day';
+    key is the value within it ('' for the grand total, YYYY-MM-DD for days).
+    """
+    dimension = db.Column(db.String(16), primary_key=True)
+    key = db.Column(db.String(200), primary_key=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+    amount = db.Column(db.Float, default=0.0, nullable=False)
+    paid_count = db.Column(db.Integer, default=0, nullable=False)
+    paid_amount = db.Column(db.Float, default=0.0, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'amount': self.amount,
+            'paid_count': self.paid_count,
+            'paid_amount': self.paid_amount,
+            'unpaid_count': self.count - self.paid_count,
+            'unpaid_amount': self.amount - self.paid_amount
+        }
+    
+    def __repr__(self):
+        return f'<FineAggregate {self.dimension}={self.key!r} {self.count}>'
@@ -0,0 +1,163 @@
+import logging
+import os
+from collections import Counter
+
+from frame_quality import frame_problem, frame_quality
+from metrics import observe_ocr_result
+from ocr_utils import GRAMMAR_WEIGHTS, OCR_PARALLEL_PSM, load_image, read_plates, timed
+
+# Frames accepted in one burst upload
+OCR_BURST_MAX_FRAMES = int(os.environ.get("OCR_BURST_MAX_FRAMES", "8"))
+# Sharpest frames OCR'd at most; the rest are only scored
+OCR_BURST_MAX_OCR = int(os.environ.get("OCR_BURST_MAX_OCR", "3"))
+# Readings that must agree, and the weakest per-character vote share
+# accepted, before the burst stops early
+OCR_BURST_MIN_AGREEING = int(os.environ.get("OCR_BURST_MIN_AGREEING", "2"))
+OCR_BURST_AGREEMENT = float(os.environ.get("OCR_BURST_AGREEMENT", "0.65"))
+# Frames the capture page records per burst, and the gap between them (ms)
+OCR_BURST_FRAMES = int(os.environ.get("OCR_BURST_FRAMES", "5"))
+OCR_BURST_INTERVAL_MS = int(os.environ.get("OCR_BURST_INTERVAL_MS", "120"))
+
+
+def vote_plates(readings, min_agreeing=OCR_BURST_MIN_AGREEING, agreement=OCR_BURST_AGREEMENT):
+    """
+    Merge plate readings from several frames by per-character voting
+
+    The most supported plate length wins; readings of that length vote on
+    each position with their confidence as weight, so one frame misreading
+    a single character is outvoted by the others. The result's grammar fit
+    is the weakest of the voting readings' (as graded by read_plates), and
+    a vote of 'guess' readings is never stable.
+
+    Args:
+        readings: List of (plate, confidence 0-100, match); match may be
+                  left out and then counts as 'guess'
+        min_agreeing: Readings of the winning length needed for a stable result
+        agreement: Smallest per-position vote share for a stable result
+
+    Returns:
+        dict: 'plate_number', 'confidence', 'match', 'agreement' (weakest
+              position's vote share), 'support' (readings voting) and
+              'stable', or None without readings
+    """
+    if not readings:
+        return None
+    # A reading without a confidence still gets a vote
+    weighted = [(plate, max(confidence or 0, 1.0), match[0] if match else 'guess')
+                for plate, confidence, *match in readings]
+
+    lengths = Counter()
+    for plate, weight, _ in weighted:
+        lengths[len(plate)] += weight
+    length = lengths.most_common(1)[0][0]
+    aligned = [reading for reading in weighted if len(reading[0]) == length]
+
+    chars = []
+    weakest = 1.0
+    for position in range(length):
+        votes = Counter()
+        for plate, weight, _ in aligned:
+            votes[plate[position]] += weight
+        char, weight = votes.most_common(1)[0]
+        chars.append(char)
+        weakest = min(weakest, weight / sum(votes.values()))
+
+    match = min((match for _, _, match in aligned), key=lambda match: GRAMMAR_WEIGHTS.get(match, 0))
+    confidence = sum(weight for _, weight, _ in aligned) / len(aligned) * weakest
+    return {
+        'plate_number': ''.join(chars),
+        'confidence': round(confidence, 1),
+        'match': match,
+        'agreement': round(weakest, 3),
+        'support': len(aligned),
+        'stable': len(aligned) >= min_agreeing and weakest >= agreement and match != 'guess'
+    }
+
+
+def analyze_burst(frames, parallel=None, max_ocr=OCR_BURST_MAX_OCR):
+    """
+    Read a plate from a burst of frames of the same scene
+
+    Every frame is scored for sharpness and contrast; only the best frames
+    that pass the quality gate are OCR'd, sharpest first, and their
+    readings are merged by vote_plates. OCR stops as soon as the vote is
+    stable.
+
+    Args:
+        frames: List of encoded image bytes
+        parallel: Run the PSM modes concurrently; defaults to OCR_PARALLEL_PSM
+        max_ocr: Most frames to OCR
+
+    Returns:
+        dict: Same keys as ocr_utils.analyze_image, plus 'frames'
+              (per-frame quality, quality gate verdict and reading),
+              'best_frame' (index of the sharpest) and 'consensus' (from
+              vote_plates)
+
+    Raises:
+        ValueError: If there are no frames
+        ImageTooLargeError: If a frame exceeds the configured limits
+    """
+    if not frames:
+        raise ValueError("A burst needs at least one frame")
+    timings = {}
+    if parallel is None:
+        parallel = OCR_PARALLEL_PSM
+    reports = []
+    readings = []
+    candidates = {}
+    consensus = None
+
+    with timed(timings, 'total'):
+        with timed(timings, 'decode'):
+            images = [load_image(frame) for frame in frames]
+        with timed(timings, 'quality'):
+            reports = [dict(frame_quality(image), index=index) for index, image in enumerate(images)]
+            for report in reports:
+                report['rejected'] = frame_problem(report)
+        ranked = sorted(reports, key=lambda report: report['score'], reverse=True)
+
+        # Frames failing the quality gate are never OCR'd
+        for report in [report for report in ranked if not report['rejected']][:max_ocr]:
+            try:
+                found = read_plates(images[report['index']], parallel, timings)
+            except Exception as e:
+                logging.error(f"Error reading burst frame {report['index']}: {str(e)}")
+                continue
+            top = found[0] if found else None
+            report['plate_number'] = top['plate_number'] if top else None
+            report['confidence'] = top.get('confidence') if top else None
+            # Raw fallback text is not a plate reading; it gets no vote
+            if not top or top.get('match') == 'raw':
+                continue
+            readings.append((top['plate_number'], top.get('confidence'), top.get('match')))
+            candidates.setdefault(top['plate_number'], dict(top, frame=report['index']))
+            consensus = vote_plates(readings)
+            if consensus['stable']:
+                break
+
+    ocr_frames = sum('plate_number' in report for report in reports)
+    logging.info(f"Burst of {len(frames)} frames: OCR'd {ocr_frames}, consensus {consensus}")
+
+    ranked_candidates = []
+    if consensus:
+        plate = consensus['plate_number']
+        # The voted plate may combine characters from several frames
+        best = candidates.get(plate) or next(iter(candidates.values()))
+        ranked_candidates.append(dict(best, plate_number=plate, confidence=consensus['confidence'],
+                                      match=consensus['match']))
+        ranked_candidates += [candidate for other, candidate in candidates.items() if other != plate]
+
+    result = {
+        'plate_number': consensus['plate_number'] if consensus else None,
+        'candidates': ranked_candidates,
+        'cached': False,
+        # Only a burst with no usable frame at all counts as rejected
+        'rejected': ranked[0]['rejected'] if all(report['rejected'] for report in reports) else None,
+        'timings': timings,
+        'frames': reports,
+        'best_frame': ranked[0]['index'],
+        'consensus': consensus
+    }
+    observe_ocr_result(result)
+    return result
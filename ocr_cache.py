@@ -0,0 +1,203 @@
+import copy
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from lazy_imports import lazy_import
+
+Image = lazy_import('PIL.Image')
+
+# Results kept per worker process; 0 disables the cache
+OCR_CACHE_SIZE = int(os.environ.get("OCR_CACHE_SIZE", "256"))
+# Seconds a cached result stays valid
+OCR_CACHE_TTL = float(os.environ.get("OCR_CACHE_TTL", "600"))
+# Also match re-takes of the same scene by perceptual hash. Off by default:
+# a fixed camera can produce near-identical frames of different vehicles.
+OCR_CACHE_PERCEPTUAL = os.environ.get("OCR_CACHE_PERCEPTUAL", "0") == "1"
+# Maximum differing bits (of 64) for two frames to count as the same image
+OCR_CACHE_PHASH_DISTANCE = int(os.environ.get("OCR_CACHE_PHASH_DISTANCE", "4"))
+# Seconds a request waits for an identical in-flight request before computing itself
+INFLIGHT_WAIT = 30
+
+
+def image_digest(data):
+    """Content address of an encoded image: hex SHA-256 of its bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def perceptual_hash(img):
+    """
+    64-bit difference hash of an image
+
+    Robust to re-encoding, small exposure changes and rescaling, so a
+    retake of an identical frame hashes to the same or a nearby value.
+
+    Args:
+        img: Decoded PIL image
+
+    Returns:
+        int: Hash to compare by Hamming distance
+    """
+    small = img.convert('L').resize((9, 8), Image.Resampling.BILINEAR)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+class OcrResultCache:
+    """
+    Bounded LRU/TTL cache of OCR results keyed by image digest.
+
+    Concurrent lookups for an image that is already being processed wait
+    for that computation instead of starting their own (double clicks,
+    duplicate uploads).
+    """
+
+    def __init__(self, max_entries=OCR_CACHE_SIZE, ttl=OCR_CACHE_TTL,
+                 perceptual=OCR_CACHE_PERCEPTUAL, max_distance=OCR_CACHE_PHASH_DISTANCE):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.perceptual = perceptual
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # digest -> (expires_at, result)
+        self._phashes = {}  # digest -> perceptual hash
+        self._inflight = {}  # digest -> threading.Event
+        self.hits = 0
+        self.perceptual_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def _get_locked(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            self._remove_locked(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return copy.deepcopy(result)
+
+    def _remove_locked(self, key):
+        self._entries.pop(key, None)
+        self._phashes.pop(key, None)
+
+    def lookup(self, key):
+        """
+        Return a cached result, or None if the caller should compute it
+
+        When None is returned the caller must call put() or release() for
+        the key, so that requests waiting on it are woken up.
+        """
+        with self._lock:
+            result = self._get_locked(key)
+            if result is not None:
+                self.hits += 1
+                return result
+            event = self._inflight.get(key)
+            if event is None:
+                self._inflight[key] = threading.Event()
+                self.misses += 1
+                return None
+
+        # Another request is already processing this exact image
+        event.wait(INFLIGHT_WAIT)
+        with self._lock:
+            result = self._get_locked(key)
+            if result is not None:
+                self.hits += 1
+                return result
+            self.misses += 1
+            self._inflight.setdefault(key, threading.Event())
+            return None
+
+    def find_similar(self, phash):
+        """Return the cached result of a perceptually near-identical image, if any"""
+        with self._lock:
+            for key, other in list(self._phashes.items()):
+                if (phash ^ other).bit_count() <= self.max_distance:
+                    result = self._get_locked(key)
+                    if result is not None:
+                        self.perceptual_hits += 1
+                        return result
+        return None
+
+    def put(self, key, result, phash=None):
+        """Store a result and wake any requests waiting for it"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            if phash is not None:
+                self._phashes[key] = phash
+            while len(self._entries) > self.max_entries:
+                oldest, _ = self._entries.popitem(last=False)
+                self._phashes.pop(oldest, None)
+                self.evictions += 1
+        self.release(key)
+
+    def release(self, key):
+        """Wake requests waiting on a key without storing a result"""
+        with self._lock:
+            event = self._inflight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._phashes.clear()
+
+    def stats(self):
+        """Return size, configuration and hit/miss/eviction counters"""
+        with self._lock:
+            # A perceptual hit is a digest miss that still avoided OCR
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'perceptual': self.perceptual,
+                'hits': self.hits,
+                'perceptual_hits': self.perceptual_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round((self.hits + self.perceptual_hits) / lookups, 4) if lookups else None
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Return the process-wide OCR result cache, creating it on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = OcrResultCache()
+        return _cache
+
+
+def _reset_cache_after_fork():
+    # Locks held by other threads at fork time would never be released in the child
+    global _cache, _cache_lock
+    _cache = None
+    _cache_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_cache_after_fork)
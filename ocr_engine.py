@@ -0,0 +1,317 @@
+import io
+import logging
+import os
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from lazy_imports import lazy_import, optional_import
+from metrics import observe_tesseract
+
+Image = lazy_import('PIL.Image')
+# In-process bindings to libtesseract; optional, see requirements.txt
+tesserocr = optional_import('tesserocr')
+
+# Characters that can appear on an Indian registration plate
+PLATE_WHITELIST = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 '
+
+# 'pool' keeps warm engines per worker thread, 'subprocess' forks tesseract per call
+OCR_ENGINE = os.environ.get("OCR_ENGINE", "pool")
+OCR_POOL_SIZE = int(os.environ.get("OCR_POOL_SIZE", min(4, os.cpu_count() or 1)))
+OCR_TIMEOUT = float(os.environ.get("OCR_TIMEOUT", "10"))
+OCR_LANG = os.environ.get("OCR_LANG", "eng")
+TESSERACT_CMD = os.environ.get("TESSERACT_CMD", "tesseract")
+
+# How often a running tesseract process checks whether it has been cancelled
+CANCEL_POLL_INTERVAL = 0.02
+
+# Text plus Tesseract's confidences (0-100): overall, per word and per character
+OcrReading = namedtuple('OcrReading', ['text', 'confidence', 'words', 'chars'])
+
+
+def _reading(text, words, chars):
+    confidence = sum(conf for _, conf in words) / len(words) if words else None
+    return OcrReading(text, confidence, words, chars)
+
+
+def parse_tsv(output):
+    """
+    Build an OcrReading from tesseract's TSV output
+
+    TSV only reports word confidences, so each character gets the
+    confidence of its word.
+
+    Args:
+        output: Decoded stdout of tesseract run with the tsv config
+
+    Returns:
+        OcrReading: Recognised text, lines separated by newlines
+    """
+    lines = {}
+    words, chars = [], []
+    for row in output.splitlines()[1:]:
+        fields = row.split('\t')
+        # Only word rows (level 5) carry text; conf is -1 on layout rows
+        if len(fields) < 12 or fields[0] != '5':
+            continue
+        word = fields[11].strip()
+        try:
+            conf = float(fields[10])
+        except ValueError:
+            continue
+        if not word or conf < 0:
+            continue
+        lines.setdefault(tuple(fields[2:5]), []).append(word)
+        words.append((word, conf))
+        chars.extend((char, conf) for char in word)
+    text = '\n'.join(' '.join(line) for line in lines.values())
+    return _reading(text, words, chars)
+
+
+def _communicate(proc, stdin_data, timeout, cancel_event):
+    """
+    Wait for a tesseract process, killing it on timeout or cancellation
+
+    Returns:
+        tuple: (stdout, stderr) or None if the process was killed
+    """
+    deadline = time.monotonic() + timeout
+    pending_input = stdin_data
+    while True:
+        wait = deadline - time.monotonic()
+        if cancel_event is not None:
+            wait = min(wait, CANCEL_POLL_INTERVAL)
+        try:
+            return proc.communicate(pending_input, timeout=max(wait, 0))
+        except subprocess.TimeoutExpired:
+            # Input has been handed over; later calls must not resend it
+            pending_input = None
+            cancelled = cancel_event is not None and cancel_event.is_set()
+            if cancelled or time.monotonic() >= deadline:
+                proc.kill()
+                proc.wait()
+                proc.stdout.close()
+                proc.stderr.close()
+                return None
+
+
+def run_tesseract_subprocess(image, psm, whitelist=PLATE_WHITELIST, timeout=OCR_TIMEOUT,
+                             cancel_event=None, detailed=False):
+    """
+    Run OCR by forking the tesseract binary (the original code path)
+
+    Args:
+        image: PIL image or path to an image file
+        psm: Tesseract page segmentation mode
+        whitelist: Characters Tesseract may output, or None for no restriction
+        timeout: Seconds to wait before killing tesseract
+        cancel_event: Optional threading.Event; setting it kills the process
+        detailed: Return an OcrReading with confidences instead of the text
+
+    Returns:
+        str: Detected text (OcrReading if detailed) or None on failure
+    """
+    stdin_data = None
+    if isinstance(image, Image.Image):
+        # Hand the pixels over on stdin rather than via a temp file
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG', compress_level=1)
+        stdin_data = buffer.getvalue()
+        image_path = 'stdin'
+    else:
+        image_path = image
+
+    cmd = [TESSERACT_CMD, image_path, 'stdout', '--psm', str(psm), '-l', OCR_LANG]
+    if whitelist:
+        cmd += ['-c', f'tessedit_char_whitelist={whitelist}']
+    if detailed:
+        cmd.append('tsv')
+
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE)
+    output = _communicate(proc, stdin_data, timeout, cancel_event)
+    if output is None:
+        if cancel_event is not None and cancel_event.is_set():
+            logging.debug(f"Tesseract PSM {psm} cancelled")
+        else:
+            logging.warning(f"Tesseract PSM {psm} timed out after {timeout}s")
+        return None
+
+    stdout, stderr = output
+    if proc.returncode != 0:
+        logging.error(f"Tesseract error: {stderr.decode(errors='replace')}")
+        return None
+
+    output = stdout.decode(errors='replace')
+    return parse_tsv(output) if detailed else output.strip()
+
+
+def _read_confidences(api):
+    """OcrReading for the image an in-process engine has just recognised"""
+    words, chars = [], []
+    for level, found in ((tesserocr.RIL.WORD, words), (tesserocr.RIL.SYMBOL, chars)):
+        for item in tesserocr.iterate_level(api.GetIterator(), level):
+            text = item.GetUTF8Text(level)
+            if text and text.strip():
+                found.append((text.strip(), item.Confidence(level)))
+    return _reading(api.GetUTF8Text().strip(), words, chars)
+
+
+class TesseractEnginePool:
+    """
+    Bounded pool of worker threads, each owning one warm Tesseract engine.
+
+    The eng traineddata is loaded once per thread instead of once per call.
+    tesserocr releases the GIL while recognising, so threads run in parallel.
+    When tesserocr is not installed (or an engine fails to start) the worker
+    falls back to the subprocess path, so the pool still bounds concurrency.
+    """
+
+    def __init__(self, size=OCR_POOL_SIZE, timeout=OCR_TIMEOUT, lang=OCR_LANG):
+        self.size = size
+        self.timeout = timeout
+        self.lang = lang
+        self.in_process = tesserocr is not None and OCR_ENGINE != 'subprocess'
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=size,
+                                            thread_name_prefix='tesseract',
+                                            initializer=self._start_engine)
+
+    def _start_engine(self):
+        self._local.api = None
+        if not self.in_process:
+            return
+        try:
+            self._local.api = tesserocr.PyTessBaseAPI(lang=self.lang)
+        except (RuntimeError, ImportError) as e:
+            logging.error(f"Could not start Tesseract engine, using subprocess: {str(e)}")
+
+    def _recognize(self, image, psm, whitelist, timeout, cancel_event, detailed=False):
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+
+        api = getattr(self._local, 'api', None)
+        start = time.perf_counter()
+        result = self._recognize_with(api, image, psm, whitelist, timeout, cancel_event, detailed)
+        engine = 'subprocess' if api is None else 'in-process'
+        observe_tesseract(psm, engine, time.perf_counter() - start, result)
+        return result
+
+    def _recognize_with(self, api, image, psm, whitelist, timeout, cancel_event, detailed):
+        if api is None:
+            return run_tesseract_subprocess(image, psm, whitelist, timeout, cancel_event, detailed)
+
+        try:
+            api.SetPageSegMode(psm)
+            api.SetVariable('tessedit_char_whitelist', whitelist or '')
+            if isinstance(image, Image.Image):
+                api.SetImage(image)
+            else:
+                api.SetImageFile(image)
+            if not api.Recognize(int(timeout * 1000)):
+                logging.warning(f"Tesseract PSM {psm} timed out after {timeout}s")
+                return None
+            if detailed:
+                return _read_confidences(api)
+            return api.GetUTF8Text().strip()
+        except RuntimeError as e:
+            logging.error(f"Tesseract engine error, using subprocess: {str(e)}")
+            return run_tesseract_subprocess(image, psm, whitelist, timeout, cancel_event, detailed)
+        finally:
+            api.Clear()
+
+    def submit(self, image, psm, whitelist=PLATE_WHITELIST, timeout=None, cancel_event=None,
+               detailed=False):
+        """
+        Queue an OCR call on the pool
+
+        Setting cancel_event skips the call if it has not started yet and
+        kills a running tesseract subprocess. An in-process recognition
+        that is already running is left to finish.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the detected text (an
+            OcrReading if detailed) or None
+        """
+        return self._executor.submit(self._recognize, image, psm, whitelist,
+                                     timeout or self.timeout, cancel_event, detailed)
+
+    def recognize(self, image, psm, whitelist=PLATE_WHITELIST, timeout=None, detailed=False):
+        """
+        Run OCR on a pooled engine and wait for the result
+
+        Args:
+            image: PIL image or path to an image file
+            psm: Tesseract page segmentation mode
+            whitelist: Characters Tesseract may output, or None for no restriction
+            timeout: Seconds to wait, defaults to the pool timeout
+            detailed: Return an OcrReading with confidences instead of the text
+
+        Returns:
+            str: Detected text (OcrReading if detailed) or None on failure or timeout
+        """
+        timeout = timeout or self.timeout
+        future = self.submit(image, psm, whitelist, timeout, detailed=detailed)
+        try:
+            # Queueing time counts too, plus a little slack for the engine's own timeout
+            return future.result(timeout=timeout + 1)
+        except FutureTimeoutError:
+            future.cancel()
+            logging.warning(f"Gave up waiting for Tesseract PSM {psm} after {timeout}s")
+            return None
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_engine_pool():
+    """Return the process-wide engine pool, creating it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = TesseractEnginePool()
+            mode = 'in-process' if _pool.in_process else 'subprocess'
+            logging.info(f"Started Tesseract engine pool ({_pool.size} workers, {mode})")
+        return _pool
+
+
+def _reset_pool_after_fork():
+    # Worker threads do not survive fork(); each child builds its own pool
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+
+def run_tesseract(image, psm, whitelist=PLATE_WHITELIST, timeout=None, detailed=False):
+    """
+    Run Tesseract with the configured engine
+
+    Args:
+        image: PIL image or path to an image file
+        psm: Tesseract page segmentation mode
+        whitelist: Characters Tesseract may output, or None for no restriction
+        timeout: Seconds to wait for this call
+        detailed: Return an OcrReading with confidences instead of the text
+
+    Returns:
+        str: Detected text (OcrReading if detailed) or None on failure
+    """
+    if OCR_ENGINE != 'subprocess':
+        try:
+            return get_engine_pool().recognize(image, psm, whitelist, timeout, detailed)
+        except Exception as e:
+            logging.error(f"Tesseract engine pool failed, using subprocess: {str(e)}")
+
+    start = time.perf_counter()
+    result = run_tesseract_subprocess(image, psm, whitelist, timeout or OCR_TIMEOUT, detailed=detailed)
+    observe_tesseract(psm, 'subprocess', time.perf_counter() - start, result)
+    return result
@@ -0,0 +1,142 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads running queued OCR jobs in each web worker process
+OCR_JOB_WORKERS = int(os.environ.get("OCR_JOB_WORKERS", "2"))
+# Jobs allowed to wait for a thread before new submissions are refused
+OCR_JOB_MAX_DEPTH = int(os.environ.get("OCR_JOB_MAX_DEPTH", "32"))
+# Number of recent jobs the wait/processing statistics are computed over
+STATS_WINDOW = 200
+# Finished job records older than this many seconds are deleted
+OCR_JOB_RETENTION = int(os.environ.get("OCR_JOB_RETENTION", "3600"))
+# How long a server-sent-events stream follows a job, and how often it checks.
+# The stream holds a (sync) web worker the whole time, so it is kept short;
+# the capture page polls the job status URL instead
+OCR_JOB_STREAM_TIMEOUT = int(os.environ.get("OCR_JOB_STREAM_TIMEOUT", "5"))
+OCR_JOB_POLL_INTERVAL = 0.25
+# Seconds the capture page waits for a queued job before giving up
+OCR_JOB_CLIENT_TIMEOUT = int(os.environ.get("OCR_JOB_CLIENT_TIMEOUT", "60"))
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the OCR job queue is at OCR_JOB_MAX_DEPTH"""
+
+
+def _summarize(samples):
+    if not samples:
+        return {'avg': None, 'p95': None, 'max': None}
+    ordered = sorted(samples)
+    return {
+        'avg': round(sum(ordered) / len(ordered), 2),
+        'p95': round(ordered[max(0, int(len(ordered) * 0.95) - 1)], 2),
+        'max': round(ordered[-1], 2)
+    }
+
+
+class OcrJobQueue:
+    """
+    Bounded background executor for OCR jobs, with queue statistics.
+
+    The queue only runs callables; persisting job state is left to the
+    caller so that any web worker can answer a status poll.
+    """
+
+    def __init__(self, workers=OCR_JOB_WORKERS, max_depth=OCR_JOB_MAX_DEPTH):
+        self.workers = workers
+        self.max_depth = max_depth
+        self._executor = None
+        self._lock = threading.Lock()
+        self.depth = 0
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._wait_ms = deque(maxlen=STATS_WINDOW)
+        self._processing_ms = deque(maxlen=STATS_WINDOW)
+
+    def submit(self, fn, *args):
+        """
+        Queue fn(*args) on a worker thread
+
+        Returns:
+            concurrent.futures.Future: Resolves to fn's return value
+
+        Raises:
+            QueueFullError: If max_depth jobs are already waiting
+        """
+        with self._lock:
+            if self.depth >= self.max_depth:
+                self.rejected += 1
+                raise QueueFullError(f"OCR queue is full ({self.depth} jobs waiting)")
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='ocr-job')
+            self.depth += 1
+            self.submitted += 1
+
+        return self._executor.submit(self._run, time.perf_counter(), fn, args)
+
+    def _run(self, enqueued_at, fn, args):
+        started_at = time.perf_counter()
+        with self._lock:
+            self.depth -= 1
+            self.running += 1
+            self._wait_ms.append((started_at - enqueued_at) * 1000)
+
+        failed = False
+        try:
+            return fn(*args)
+        except Exception as e:
+            failed = True
+            logging.error(f"OCR job failed: {str(e)}")
+            raise
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.failed += failed
+                self._processing_ms.append((time.perf_counter() - started_at) * 1000)
+
+    def stats(self):
+        """Return queue depth, counters and wait/processing times in ms"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_depth': self.max_depth,
+                'depth': self.depth,
+                'running': self.running,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'wait_ms': _summarize(self._wait_ms),
+                'processing_ms': _summarize(self._processing_ms)
+            }
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the process-wide OCR job queue, creating it on first use"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = OcrJobQueue()
+        return _queue
+
+
+def _reset_queue_after_fork():
+    # Executor threads do not survive fork(); each child starts an empty queue
+    global _queue, _queue_lock
+    _queue = None
+    _queue_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_queue_after_fork)
@@ -0,0 +1,133 @@
+import logging
+import os
+
+from lazy_imports import lazy_import, optional_import
+
+Image = lazy_import('PIL.Image')
+ImageOps = lazy_import('PIL.ImageOps')
+cv2 = optional_import('cv2')
+np = optional_import('numpy')
+
+# Images are binarised at no more than this size (matches ocr_utils)
+PREPROCESS_MAX_DIMENSION = 1000
+# Thresholding: 'otsu' (one global level), 'adaptive' (local mean, copes
+# with shadows and uneven lighting) or 'auto' (adaptive only when the
+# background brightness varies by more than UNEVEN_LIGHTING across the image)
+OCR_THRESHOLD = os.environ.get("OCR_THRESHOLD", "auto")
+UNEVEN_LIGHTING = 60
+# Skew corrected on plate crops, in degrees; beyond this the estimate is
+# more likely wrong than the plate is tilted
+OCR_MAX_SKEW = float(os.environ.get("OCR_MAX_SKEW", "15"))
+MIN_SKEW = 0.5
+
+
+def _otsu_level(histogram):
+    """Otsu's threshold from a 256-bin histogram (fallback without OpenCV)"""
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    background = weighted = 0
+    best_level, best_variance = 127, -1.0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted += level * count
+        mean_back = weighted / background
+        mean_fore = (weighted_total - weighted) / foreground
+        variance = background * foreground * (mean_back - mean_fore) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+
+def _binarize_pil(img):
+    gray = img.convert('L')
+    if max(gray.size) > PREPROCESS_MAX_DIMENSION:
+        gray.thumbnail((PREPROCESS_MAX_DIMENSION, PREPROCESS_MAX_DIMENSION), Image.Resampling.LANCZOS)
+    level = _otsu_level(gray.histogram())
+    binary = gray.point([0] * (level + 1) + [255] * (255 - level))
+    # Dark text on a light background, the polarity Tesseract expects
+    if sum(binary.histogram()[255:]) < gray.width * gray.height / 2:
+        binary = ImageOps.invert(binary)
+    return binary
+
+
+def _uneven_lighting(gray):
+    """Whether the background brightness varies a lot across the image"""
+    # An 8x8 area average is a cheap estimate of the background level
+    background = cv2.resize(gray, (8, 8), interpolation=cv2.INTER_AREA)
+    return int(background.max()) - int(background.min()) > UNEVEN_LIGHTING
+
+
+def _skew_angle(text_mask):
+    """Rotation (degrees) that levels the text in a mask of text pixels, or 0"""
+    points = cv2.findNonZero(text_mask)
+    if points is None or len(points) < 50:
+        return 0.0
+    # The rectangle's angle depends on the OpenCV version's convention;
+    # fold it to the nearest horizontal
+    angle = (cv2.minAreaRect(points)[2] + 45) % 90 - 45
+    if abs(angle) < MIN_SKEW or abs(angle) > OCR_MAX_SKEW:
+        return 0.0
+    return angle
+
+
+def binarize(img, deskew=False, method=None):
+    """
+    Turn an image into black text on a white background for Tesseract
+
+    One pass over a NumPy array: downscale, median denoise, threshold
+    (Otsu or adaptive, see OCR_THRESHOLD) with the polarity picked from
+    the Otsu split so light-on-dark plates come out the same way round,
+    and optionally rotate the text level. Falls back to PIL with an Otsu
+    threshold when OpenCV is not installed.
+
+    Args:
+        img: Decoded PIL image
+        deskew: Level tilted text; meant for plate crops, where the text
+                dominates the image (whole frames give no usable angle)
+        method: 'otsu', 'adaptive' or 'auto'; defaults to OCR_THRESHOLD
+
+    Returns:
+        PIL.Image: Binary ('L' mode, 0 or 255) image
+    """
+    if cv2 is None:
+        return _binarize_pil(img)
+
+    gray = np.asarray(img.convert('L'))
+    height, width = gray.shape
+    scale = min(1.0, PREPROCESS_MAX_DIMENSION / max(height, width))
+    if scale < 1.0:
+        gray = cv2.resize(gray, (round(width * scale), round(height * scale)),
+                          interpolation=cv2.INTER_AREA)
+
+    # Removes JPEG speckle and sensor noise without rounding off strokes
+    gray = cv2.medianBlur(gray, 3)
+
+    level, bright = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    # Text is the minority class; when most pixels are bright it is dark
+    dark_text = cv2.countNonZero(bright) > bright.size / 2
+    text_mask = cv2.bitwise_not(bright) if dark_text else bright
+
+    method = method or OCR_THRESHOLD
+    if method == 'adaptive' or (method == 'auto' and _uneven_lighting(gray)):
+        block = max(15, (min(gray.shape) // 8) | 1)
+        source = gray if dark_text else cv2.bitwise_not(gray)
+        # Pixels darker than their neighbourhood (by more than C) are text;
+        # the box mean costs the same for any block size, a Gaussian does not
+        text_mask = cv2.adaptiveThreshold(source, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
+                                          cv2.THRESH_BINARY_INV, block, 10)
+
+    if deskew:
+        angle = _skew_angle(text_mask)
+        if angle:
+            h, w = text_mask.shape
+            rotation = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+            text_mask = cv2.warpAffine(text_mask, rotation, (w, h), flags=cv2.INTER_NEAREST,
+                                       borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+            logging.debug(f"Deskewed by {angle:.1f} degrees")
+
+    return Image.fromarray(cv2.bitwise_not(text_mask))
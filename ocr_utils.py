@@ -4,17 +4,72 @@ import re
 import os
 import base64
 import io
-import subprocess
-import tempfile
-from PIL import Image, ImageOps, ImageEnhance, ImageFilter
-import pytesseract
+import threading
+import time
+import multiprocessing
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait,
+                                TimeoutError as FutureTimeoutError)
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 
-# Explicitly set the Tesseract binary path
-pytesseract.pytesseract.tesseract_cmd = "/usr/bin/tesseract"
+from frame_quality import frame_problem, frame_quality
+from lazy_imports import lazy_import, preload
+from metrics import OCR_FALLBACKS, OCR_RESULTS, observe_ocr_result
+from ocr_cache import get_result_cache, image_digest, perceptual_hash
+from ocr_engine import get_engine_pool, run_tesseract
+from ocr_preprocess import binarize
+from plate_grammar import first_plate, is_valid_plate, state_from_code
+from plate_localization import find_plate_regions
+from state_detection import detect_state_from_plate
+
+Image = lazy_import('PIL.Image')
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO)
 
+# Per-request limits for uploaded images
+OCR_MAX_UPLOAD_BYTES = int(os.environ.get("OCR_MAX_UPLOAD_BYTES", 8 * 1024 * 1024))
+OCR_MAX_PIXELS = int(os.environ.get("OCR_MAX_PIXELS", 40_000_000))
+OCR_MAX_IMAGE_MEMORY = int(os.environ.get("OCR_MAX_IMAGE_MEMORY", 64 * 1024 * 1024))
+# Largest edge the OCR stages work at; bigger frames are downscaled
+OCR_MAX_DIMENSION = 1000
+# Size and JPEG quality (0-1) browsers downscale captures to before uploading;
+# anything larger than OCR_MAX_DIMENSION would be thrown away on arrival
+OCR_UPLOAD_MAX_DIMENSION = int(os.environ.get("OCR_UPLOAD_MAX_DIMENSION", OCR_MAX_DIMENSION))
+OCR_UPLOAD_QUALITY = float(os.environ.get("OCR_UPLOAD_QUALITY", "0.85"))
+
+# Page segmentation modes tried for each image, most plate-like first
+PSM_MODES = [7, 8, 6, 3]
+# Modes for a cropped plate region: one line, one word, or a two-row block
+REGION_PSM_MODES = [7, 8, 6]
+# Locate plate regions with OpenCV and OCR only those crops
+OCR_LOCALIZE = os.environ.get("OCR_LOCALIZE", "1") == "1"
+# Crops shorter than this are upscaled; Tesseract struggles with tiny glyphs
+OCR_MIN_CROP_HEIGHT = 64
+# Plates with an unknown state code, partial plates and loose alphanumeric
+# runs, tried only when the plate grammar finds no complete plate
+PARTIAL_PLATE_PATTERNS = [
+    re.compile(r'[A-Z]{2}\s*[0-9]{1,2}\s*[A-Z]{1,3}\s*[0-9]{1,4}'),  # XX 00 XX 0000 (unknown state code)
+    re.compile(r'[A-Z]{2}\s*[0-9]{1,2}\s*[0-9]{1,4}'),  # XX 00 0000 (missing letters)
+    re.compile(r'[A-Z]{2}\s*[0-9]{4,}'),                # XX 0000... (simplified)
+    re.compile(r'[A-Z]{2,}[0-9]+')
+]
+WHITESPACE = re.compile(r'\s+')
+NON_ALNUM = re.compile(r'[^A-Z0-9]')
+# Run the PSM modes concurrently on the engine pool instead of one by one
+OCR_PARALLEL_PSM = os.environ.get("OCR_PARALLEL_PSM", "0") == "1"
+# Processes used for batch OCR, shared by every batch a web worker runs
+OCR_BATCH_WORKERS = int(os.environ.get("OCR_BATCH_WORKERS", os.cpu_count() or 1))
+# How batch processes are started. Not fork: web workers run the Tesseract
+# and job-queue threads, and a forked child inherits their locks mid-use
+OCR_BATCH_START_METHOD = os.environ.get("OCR_BATCH_START_METHOD", "spawn")
+# Tesseract confidence (0-100) at which a complete plate ends the cascade
+OCR_CONFIDENCE_THRESHOLD = float(os.environ.get("OCR_CONFIDENCE_THRESHOLD", "80"))
+# How far a reading is trusted given how it fits the plate grammar:
+# a complete plate, a known state code with missing or extra characters,
+# plate-like text without a recognisable state code, raw OCR text
+GRAMMAR_WEIGHTS = {'complete': 1.0, 'partial': 0.6, 'guess': 0.3, 'raw': 0.1}
+
 def clean_plate_text(text):
     """
     Clean and format the detected license plate text
@@ -28,140 +83,121 @@ def clean_plate_text(text):
     if not text:
         return None
     
-    # Remove newlines, extra spaces, and other noise
-    text = re.sub(r'[\n\r\t]', ' ', text)
-    text = re.sub(r'\s+', '', text)
-    
     # Keep only alphanumeric characters
-    text = re.sub(r'[^A-Z0-9]', '', text.upper())
-    
-    # Check if the text resembles an Indian license plate pattern
-    # Common patterns: XX00XX0000 or XX00X0000
-    plate_pattern = re.compile(r'^[A-Z]{2}\d{1,2}[A-Z]{1,3}\d{1,4}$')
+    text = NON_ALNUM.sub('', WHITESPACE.sub('', text).upper())
     
-    if plate_pattern.match(text):
+    # Check if the text is a complete Indian license plate
+    if is_valid_plate(text):
         return text
     
-    # Try to identify probable state codes
-    state_codes = ['AP', 'TS', 'TN', 'KA', 'MH', 'DL', 'KL', 'UP', 'HR', 'GJ']
-    
-    # If text is too short or doesn't match the pattern, but contains digits and letters
-    if len(text) >= 4 and re.search(r'[A-Z]', text) and re.search(r'[0-9]', text):
-        # Check if first two chars could be a state code
-        potential_state = text[:2]
-        if potential_state in state_codes:
-            # Preserve what we have as a reasonable approximation
-            return text
-        else:
-            # If no recognizable state code, default to TS (Telangana)
-            # and keep the rest of the text
-            return f"TS{text}"
+    # Not a complete plate, but letters and digits: keep what was read as is.
+    # Without a recognisable state code it is ranked low ('guess' in
+    # plate_fit) rather than given a made-up one
+    if len(text) >= 4 and not text.isdigit() and not text.isalpha():
+        return text
     
     return None
 
-def enhance_image_for_ocr(image_path):
+def enhance_image_for_ocr(img, deskew=False):
     """
     Enhance the image to improve OCR accuracy
     
     Args:
-        image_path: Path to the image file
+        img: Decoded PIL image
+        deskew: Level tilted text (for plate crops)
         
     Returns:
-        str: Path to the enhanced image
+        PIL.Image: Enhanced black and white image, kept in memory
     """
     try:
-        # Open the image
-        img = Image.open(image_path)
-
-        # Auto-invert if background is light and text is dark
-        grayscale = img.convert('L')
-        brightness = grayscale.resize((1, 1)).getpixel((0, 0))
-        if brightness > 127:
-            img = ImageOps.invert(grayscale)
-        else:
-            img = grayscale
-
-        # Resize if needed
-        if img.width > 1000 or img.height > 1000:
-            img.thumbnail((1000, 1000), Image.Resampling.LANCZOS)
-
-        # Increase contrast
-        enhancer = ImageEnhance.Contrast(img)
-        img = enhancer.enhance(2.0)
+        # Denoise, adaptive threshold and deskew in one array pass
+        return binarize(img, deskew=deskew)
+    
+    except Exception as e:
+        logging.error(f"Error enhancing image: {str(e)}")
+        return img.convert('L')
 
-        # Apply sharpening
-        img = img.filter(ImageFilter.SHARPEN)
+@contextmanager
+def timed(timings, stage):
+    """
+    Add the wall time spent in a block to timings[stage], in milliseconds
+    
+    Args:
+        timings: Dict collecting stage timings, or None to skip recording
+        stage: Name of the stage being timed
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            elapsed = (time.perf_counter() - start) * 1000
+            timings[stage] = round(timings.get(stage, 0) + elapsed, 2)
 
-        # Apply thresholding to make it black and white
-        threshold = 150  
-        # We need to use a different approach for thresholding that doesn't involve comparison
-        lut = [0] * threshold + [255] * (256 - threshold)
-        img = img.point(lut)
+class ImageTooLargeError(ValueError):
+    """Raised when an uploaded image exceeds the configured size limits"""
 
-        # Save to a temporary file
-        enhanced_path = tempfile.mktemp(suffix='.png')
-        img.save(enhanced_path)
 
-        return enhanced_path
+def load_image(source):
+    """
+    Decode an image into memory, refusing payloads that are too large
     
-    except Exception as e:
-        logging.error(f"Error enhancing image: {str(e)}")
-        return image_path
+    Args:
+        source: Raw encoded image bytes, a file-like object or a path
+        
+    Returns:
+        PIL.Image: Decoded image
+        
+    Raises:
+        ImageTooLargeError: If the payload, pixel count or decoded size is over the limit
+        PIL.UnidentifiedImageError: If the data is not a supported image
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        if len(source) > OCR_MAX_UPLOAD_BYTES:
+            raise ImageTooLargeError(f"Image is {len(source)} bytes, limit is {OCR_MAX_UPLOAD_BYTES}")
+        source = io.BytesIO(source)
+    
+    # Image.open only parses the header, so the size checks run before any pixels are decoded
+    img = Image.open(source)
+    
+    # Let JPEG decode straight to grayscale at a reduced DCT scale;
+    # OCR never needs more than OCR_MAX_DIMENSION or any colour
+    img.draft('L', (OCR_MAX_DIMENSION, OCR_MAX_DIMENSION))
+    
+    width, height = img.size
+    if width * height > OCR_MAX_PIXELS:
+        raise ImageTooLargeError(f"Image is {width}x{height}, limit is {OCR_MAX_PIXELS} pixels")
+    
+    decoded_bytes = width * height * len(img.getbands())
+    if decoded_bytes > OCR_MAX_IMAGE_MEMORY:
+        raise ImageTooLargeError(f"Decoded image needs {decoded_bytes} bytes, limit is {OCR_MAX_IMAGE_MEMORY}")
+    
+    img.load()
+    return img
 
-def detect_text_with_tesseract(image_path):
+def detect_text_with_tesseract(enhanced, original=None):
     """
     Use Tesseract OCR to detect text in an image
     
     Args:
-        image_path: Path to the image file
+        enhanced: Image already passed through enhance_image_for_ocr
+        original: Unenhanced image, used when the enhanced one fails
         
     Returns:
         str: Detected text
     """
     try:
-        # Enhance the image for better OCR results
-        enhanced_image_path = enhance_image_for_ocr(image_path)
-        
-        # Run tesseract directly using subprocess
+        # Run tesseract on a warm engine
         # Configuring for license plate recognition:
         # --psm 7: Treat the image as a single line of text
         # --oem 1: Use LSTM OCR Engine
-        cmd = [
-            'tesseract',
-            enhanced_image_path,
-            'stdout',
-            '--psm', '7',
-            '-l', 'eng',
-            '-c', 'tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 '
-        ]
-        
-        # Run the command
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        # Clean up the enhanced image if it's different from the original
-        if enhanced_image_path != image_path:
-            os.unlink(enhanced_image_path)
+        text = run_tesseract(enhanced, 7)
         
         # Check for errors
-        if result.returncode != 0:
-            logging.error(f"Tesseract error: {result.stderr}")
-            
+        if text is None and original is not None:
             # Try with a different PSM mode if the first one failed
-            cmd = [
-                'tesseract',
-                image_path,
-                'stdout',
-                '--psm', '6',  # Assume a single uniform block of text
-                '-l', 'eng'
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                return None
-        
-        # Get the detected text
-        text = result.stdout.strip()
+            # PSM 6: Assume a single uniform block of text
+            text = run_tesseract(original, 6, whitelist=None)
         
         return text
         
@@ -182,122 +218,559 @@ def extract_plate_from_text(text):
     if not text:
         return None
     
-    # Regular expression patterns for license plates
-    # Format: XX-00-XX-0000 or XX-00-X-0000 (with or without hyphens)
-    patterns = [
-        r'[A-Z]{2}\s*[0-9]{1,2}\s*[A-Z]{1,3}\s*[0-9]{1,4}',  # XX 00 XX 0000
-        r'[A-Z]{2}\s*[0-9]{1,2}\s*[0-9]{1,4}',               # XX 00 0000 (missing letters)
-        r'[A-Z]{2}\s*[0-9]{4,}'                              # XX 0000... (simplified)
-    ]
-    
-    # Check each pattern
-    for pattern in patterns:
-        matches = re.findall(pattern, text.upper())
-        if matches:
-            # Clean the first match
-            cleaned = re.sub(r'[^A-Z0-9]', '', matches[0])
-            if cleaned:
-                return cleaned
-    
-    # If no valid plate pattern was found, try to extract any text that looks like it might be part of a plate
-    # Look for 2 consecutive letters followed by numbers
-    alphanum_pattern = r'[A-Z]{2,}[0-9]+'
-    matches = re.findall(alphanum_pattern, text.upper())
-    if matches:
-        return matches[0]
+    # Complete plates in any format (standard, BH-series, temporary)
+    plate = first_plate(text)
+    if plate:
+        return plate
+    
+    # If no valid plate was found, try to extract any text that looks like it might be part of a plate
+    upper = text.upper()
+    for pattern in PARTIAL_PLATE_PATTERNS:
+        match = pattern.search(upper)
+        if match:
+            return NON_ALNUM.sub('', match.group(0))
     
     # As a last resort, return any alphanumeric sequence found
-    alphanum = re.sub(r'[^A-Z0-9]', '', text.upper())
+    alphanum = NON_ALNUM.sub('', upper)
     if len(alphanum) >= 4:  # Only if it's long enough to be meaningful
         return alphanum
     
     return None
 
-def try_multiple_ocr_methods(image_path):
+def plate_fit(plate):
+    """
+    How an extracted plate fits the plate grammar
+    
+    Args:
+        plate: Plate as returned by extract_plate_from_text
+        
+    Returns:
+        str: 'complete', 'partial' (known state code, not a complete plate)
+             or 'guess' (no recognisable state code)
+    """
+    if is_valid_plate(plate):
+        return 'complete'
+    if state_from_code(plate[:2]):
+        return 'partial'
+    return 'guess'
+
+def plate_confidence(reading, plate):
+    """
+    Tesseract's confidence in the characters that make up a plate
+    
+    Args:
+        reading: OcrReading the plate was extracted from
+        plate: Plate as returned by extract_plate_from_text
+        
+    Returns:
+        float: Mean character confidence (0-100) over the plate, or the
+               reading's overall confidence if the plate cannot be aligned
+    """
+    chars = [(char, conf) for char, conf in reading.chars if char.isalnum()]
+    text = ''.join(char for char, _ in chars).upper()
+    start = text.find(plate)
+    if start >= 0 and plate:
+        confidences = [conf for _, conf in chars[start:start + len(plate)]]
+        return sum(confidences) / len(confidences)
+    return reading.confidence or 0.0
+
+def score_reading(reading, psm):
+    """
+    Turn one Tesseract reading into a scored plate candidate
+    
+    Args:
+        reading: OcrReading from run_tesseract(..., detailed=True)
+        psm: Page segmentation mode that produced it
+        
+    Returns:
+        dict: 'plate_number', 'confidence' (0-100), 'match' (see plate_fit)
+              and 'psm', or None if the reading holds no plate
+    """
+    if reading is None or not reading.text:
+        return None
+    plate = extract_plate_from_text(reading.text)
+    cleaned = clean_plate_text(plate) if plate else None
+    if not cleaned:
+        return None
+    return {
+        'plate_number': cleaned,
+        'confidence': round(plate_confidence(reading, plate), 1),
+        'match': plate_fit(plate),
+        'psm': psm
+    }
+
+def reading_score(reading):
+    """Rank of a scored reading or candidate: confidence weighted by grammar fit"""
+    return GRAMMAR_WEIGHTS.get(reading.get('match'), 0) * (reading.get('confidence') or 0)
+
+def is_confident(reading):
+    """Whether a scored reading is good enough to stop looking"""
+    return reading['match'] == 'complete' and reading['confidence'] >= OCR_CONFIDENCE_THRESHOLD
+
+def _better(best, reading):
+    return reading if best is None or reading_score(reading) > reading_score(best) else best
+
+def _log_accepted(best):
+    if best:
+        logging.info(f"Tesseract detected plate with PSM {best['psm']}: {best['plate_number']} "
+                     f"({best['match']}, confidence {best['confidence']})")
+
+def try_multiple_ocr_methods(enhanced, psm_modes=PSM_MODES, errors=None):
     """
     Try multiple OCR methods to extract text from the image
     
+    Stops at the first complete plate read with at least
+    OCR_CONFIDENCE_THRESHOLD confidence; otherwise every mode is tried and
+    the best scored reading wins.
+    
     Args:
-        image_path: Path to the image file
+        enhanced: Image already passed through enhance_image_for_ocr
+        psm_modes: Page segmentation modes to try, in order
+        errors: Optional list; a description of each engine failure
+                (Tesseract error or timeout) is appended
         
     Returns:
-        str: Detected license plate text or None
+        dict: Best reading from score_reading, or None
     """
+    best = None
     # First try with Tesseract
     try:
         # Try different PSM modes and configurations
-        psm_modes = [7, 8, 6, 3]  # Different page segmentation modes
-        
         for psm in psm_modes:
-            # Enhance the image for better OCR results
-            enhanced_image_path = enhance_image_for_ocr(image_path)
-            
-            cmd = [
-                'tesseract',
-                enhanced_image_path,
-                'stdout',
-                f'--psm', f'{psm}',
-                '-l', 'eng',
-                '-c', 'tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 '
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            # Clean up the enhanced image
-            if enhanced_image_path != image_path:
-                os.unlink(enhanced_image_path)
-            
-            if result.returncode == 0:
-                text = result.stdout.strip()
-                if text:
-                    # Extract plate from the text
-                    plate = extract_plate_from_text(text)
-                    if plate:
-                        logging.info(f"Tesseract detected plate with PSM {psm}: {plate}")
-                        return plate
+            result = run_tesseract(enhanced, psm, detailed=True)
+            if result is None and errors is not None:
+                errors.append(f"Tesseract failed on PSM {psm}")
+            reading = score_reading(result, psm)
+            if not reading:
+                continue
+            best = _better(best, reading)
+            if is_confident(reading):
+                break
     
     except Exception as e:
         logging.error(f"Error with multiple OCR methods: {str(e)}")
+        if errors is not None:
+            errors.append(str(e))
     
-    return None
+    _log_accepted(best)
+    return best
 
-def process_image(image_path):
+def try_multiple_ocr_methods_parallel(enhanced, psm_modes=PSM_MODES, errors=None):
     """
-    Process an image to extract vehicle license plate text
+    Run every PSM mode at once on the engine pool and keep the best plate
+    
+    The remaining attempts are cancelled as soon as one reading is a
+    complete plate at OCR_CONFIDENCE_THRESHOLD, so a clear frame costs
+    roughly one OCR pass instead of len(psm_modes).
     
     Args:
-        image_path: Path to the image file
+        enhanced: Image already passed through enhance_image_for_ocr
+        psm_modes: Page segmentation modes to try
+        errors: Optional list; a description of each engine failure
+                (Tesseract error or timeout) is appended
         
     Returns:
-        str: Detected license plate text or None
+        dict: Best reading from score_reading, or None
     """
+    cancel_event = threading.Event()
+    futures = {}
+    best = None
     try:
-        logging.info(f"Processing image from {image_path}")
+        pool = get_engine_pool()
+        for psm in psm_modes:
+            futures[pool.submit(enhanced, psm, cancel_event=cancel_event, detailed=True)] = psm
         
-        # Try to detect the license plate using multiple OCR methods
-        plate_number = try_multiple_ocr_methods(image_path)
+        for future in as_completed(futures, timeout=pool.timeout + 1):
+            # Nothing is cancelled before the loop ends, so None is a failure
+            result = future.result()
+            if result is None and errors is not None:
+                errors.append(f"Tesseract failed on PSM {futures[future]}")
+            reading = score_reading(result, futures[future])
+            if not reading:
+                continue
+            best = _better(best, reading)
+            if is_confident(reading):
+                break
+    
+    except FutureTimeoutError:
+        logging.warning("Parallel OCR attempts timed out")
+        if errors is not None:
+            errors.append("OCR timed out")
+    except Exception as e:
+        logging.error(f"Error with parallel OCR methods: {str(e)}")
+        if errors is not None:
+            errors.append(str(e))
+    finally:
+        # Stop whatever is still queued or running
+        cancel_event.set()
+        for future in futures:
+            future.cancel()
+    
+    _log_accepted(best)
+    return best
+
+def crop_region(img, bbox):
+    """
+    Cut a candidate plate region out of a frame, upscaling tiny crops for Tesseract
+    
+    Args:
+        img: Decoded PIL image
+        bbox: [x, y, width, height] in image pixels
         
-        if plate_number:
-            # Clean up the plate number
-            plate_number = clean_plate_text(plate_number)
-            if plate_number:
-                logging.info(f"OCR detected plate: {plate_number}")
-                return plate_number
+    Returns:
+        PIL.Image: The cropped region
+    """
+    x, y, width, height = bbox
+    crop = img.crop((x, y, x + width, y + height))
+    if crop.height < OCR_MIN_CROP_HEIGHT:
+        factor = OCR_MIN_CROP_HEIGHT / crop.height
+        crop = crop.resize((round(crop.width * factor), OCR_MIN_CROP_HEIGHT),
+                           Image.Resampling.LANCZOS)
+    return crop
+
+def _add_candidate(candidates, reading, bbox, score):
+    """Record a scored OCR reading, keeping the best entry per plate"""
+    if not reading:
+        return None
+    
+    for candidate in candidates:
+        if candidate['plate_number'] == reading['plate_number']:
+            candidate['score'] = max(candidate['score'], score)
+            if reading_score(reading) > reading_score(candidate):
+                candidate.update(confidence=reading['confidence'], match=reading['match'], psm=reading['psm'])
+            return candidate
+    
+    candidate = {'plate_number': reading['plate_number'], 'bbox': list(bbox), 'score': score,
+                 'confidence': reading['confidence'], 'match': reading['match'], 'psm': reading['psm']}
+    candidates.append(candidate)
+    return candidate
+
+def _rank_candidates(candidates):
+    # Most trustworthy reading first, then by how plate-like its region looked
+    candidates.sort(key=lambda c: (reading_score(c), c['score']), reverse=True)
+    return candidates
+
+def read_plates(original, parallel, timings, errors=None):
+    """
+    Locate and OCR the plates in a decoded frame
+    
+    Candidate plate regions are located first and only those crops are
+    OCR'd; the whole frame is used when no region yields a plate.
+    
+    Args:
+        original: Decoded PIL image
+        parallel: Run the PSM modes concurrently
+        timings: Dict collecting stage timings
+        errors: Optional list collecting OCR engine failures; a result
+                read while the engine was failing should not be cached
         
+    Returns:
+        list: Ranked candidate dicts with 'plate_number', 'bbox', 'score'
+              (region likeness), 'confidence' (0-100), 'match' and 'psm'
+              (mode that produced the reading; None for raw text)
+    """
+    candidates = []
+    cascade = try_multiple_ocr_methods_parallel if parallel else try_multiple_ocr_methods
+    frame_bbox = [0, 0, original.width, original.height]
+    
+    # Only OCR the small regions that look like plates
+    regions = []
+    if OCR_LOCALIZE:
+        with timed(timings, 'localize'):
+            regions = find_plate_regions(original)
+    
+    for region in regions:
+        crop = crop_region(original, region['bbox'])
+        with timed(timings, 'preprocess'):
+            enhanced = enhance_image_for_ocr(crop, deskew=True)
+        with timed(timings, 'ocr'):
+            reading = cascade(enhanced, REGION_PSM_MODES, errors)
+        candidate = _add_candidate(candidates, reading, region['bbox'], region['score'])
+        if candidate and is_confident(candidate):
+            break
+    
+    if not candidates:
+        # Try to detect the license plate on the whole frame
+        with timed(timings, 'preprocess'):
+            enhanced = enhance_image_for_ocr(original)
+        with timed(timings, 'ocr'):
+            reading = cascade(enhanced, errors=errors)
+        _add_candidate(candidates, reading, frame_bbox, 0.0)
+    
+    if not candidates:
         # Get actual text directly from the image to display
         # Even if it's not a perfect license plate format
-        raw_text = detect_text_with_tesseract(image_path)
+        OCR_FALLBACKS.inc()
+        with timed(timings, 'fallback'):
+            raw_text = detect_text_with_tesseract(enhanced, original)
         if raw_text:
             # Clean and filter to just alphanumerics
-            text = re.sub(r'[^A-Z0-9]', '', raw_text.upper())
+            text = NON_ALNUM.sub('', raw_text.upper())
             if len(text) >= 4:  # If we have at least a few characters
                 logging.info(f"Using raw detected text: {text}")
-                return text
+                candidates.append({'plate_number': text, 'bbox': frame_bbox, 'score': 0.0,
+                                   'confidence': None, 'match': 'raw', 'psm': None})
+    
+    return _rank_candidates(candidates)
+
+def analyze_image(source, parallel=None, use_cache=True):
+    """
+    Run the full OCR pipeline on an image and report where the time went
+    
+    Encoded images are looked up in the result cache by digest (and,
+    optionally, perceptual hash) before any OCR runs. Each image is
+    decoded once and nothing touches disk.
+    
+    Args:
+        source: Raw encoded image bytes, a file-like object or a path
+        parallel: Run the PSM modes concurrently; defaults to OCR_PARALLEL_PSM
+        use_cache: Consult and fill the OCR result cache (bytes sources only)
+        
+    Returns:
+        dict: 'plate_number' (str or None), 'candidates' (ranked dicts with
+              'plate_number', 'bbox', 'score', 'confidence', 'match' and
+              'psm'), 'cached' (bool), 'rejected' (why the quality gate
+              refused the frame, or None) and 'timings' (stage -> ms)
+        
+    Raises:
+        ImageTooLargeError: If the image exceeds the configured limits
+    """
+    timings = {}
+    if parallel is None:
+        parallel = OCR_PARALLEL_PSM
+    
+    cache = get_result_cache()
+    if not (use_cache and cache.enabled and isinstance(source, (bytes, bytearray))):
+        cache = None
+    key = phash = None
+    cached = None
+    rejected = None
+    similar = False
+    failed = False
+    candidates = None
+    engine_errors = []
+    
+    with timed(timings, 'total'):
+        try:
+            if isinstance(source, (bytes, bytearray)):
+                logging.info(f"Processing {len(source)} byte image")
+            else:
+                logging.info(f"Processing image from {source}")
+            
+            if cache is not None:
+                with timed(timings, 'cache'):
+                    key = image_digest(source)
+                    cached = cache.lookup(key)
+            
+            if cached is None:
+                with timed(timings, 'decode'):
+                    original = load_image(source)
+                
+                if cache is not None and cache.perceptual:
+                    with timed(timings, 'cache'):
+                        phash = perceptual_hash(original)
+                        cached = cache.find_similar(phash)
+                        similar = cached is not None
+            
+            if cached is None:
+                # Hopeless frames (blurred, black, blown out) skip OCR entirely
+                with timed(timings, 'quality'):
+                    rejected = frame_problem(frame_quality(original))
+                if rejected:
+                    logging.info(f"Frame rejected before OCR: {rejected}")
+                else:
+                    candidates = read_plates(original, parallel, timings, engine_errors)
         
+        except ImageTooLargeError:
+            OCR_RESULTS.inc(outcome='error')
+            raise
+        except Exception as e:
+            failed = True
+            logging.error(f"Error in image processing: {str(e)}")
+        finally:
+            if key is not None:
+                if similar:
+                    # Remember the exact bytes too, so the next retake is a direct hit
+                    cache.put(key, cached, phash)
+                elif cached is None and candidates is not None and not engine_errors:
+                    # A read made while Tesseract was failing or timing out
+                    # is retried on the next upload instead of cached
+                    cache.put(key, {'candidates': candidates}, phash)
+                else:
+                    cache.release(key)
+    
+    if cached is not None:
+        candidates = cached['candidates']
+        logging.info("OCR result served from cache")
+    candidates = candidates or []
+    
+    if candidates:
+        logging.info(f"OCR detected plate: {candidates[0]['plate_number']}")
+    else:
         # If all OCR attempts fail, return None to let the frontend display a default
         logging.warning("All OCR methods failed, returning None")
-        return None
+    
+    logging.info(f"OCR timings (ms): {timings}")
+    result = {
+        'plate_number': candidates[0]['plate_number'] if candidates else None,
+        'candidates': candidates,
+        'cached': cached is not None,
+        'rejected': rejected,
+        'timings': timings
+    }
+    observe_ocr_result(result, failed)
+    return result
+
+def preload_ocr():
+    """
+    Import the imaging and OCR libraries now instead of on first use
+    
+    Called in a gunicorn master before it forks (see gunicorn.conf.py), so
+    the workers share the loaded modules copy-on-write rather than each
+    importing its own copy on their first OCR request.
+    
+    Returns:
+        list: Names of the modules imported
+    """
+    loaded = preload()
+    # PIL imports its format plugins on the first Image.open otherwise
+    Image.init()
+    logging.info(f"Preloaded OCR modules: {', '.join(sorted(set(loaded)))}")
+    return loaded
+
+def process_image(source):
+    """
+    Process an image to extract vehicle license plate text
+    
+    Args:
+        source: Raw encoded image bytes, a file-like object or a path
         
+    Returns:
+        str: Detected license plate text or None
+    """
+    return analyze_image(source)['plate_number']
+
+def _analyze_batch_item(index, name, data):
+    """Process pool worker: OCR one image of a batch"""
+    start = time.perf_counter()
+    item = {'index': index, 'name': name}
+    try:
+        result = analyze_image(data, use_cache=False)
     except Exception as e:
-        logging.error(f"Error in image processing: {str(e)}")
-        return None
+        item['error'] = str(e)
+    else:
+        top = result['candidates'][0] if result['candidates'] else {}
+        item.update({
+            'plate_number': result['plate_number'],
+            'state': detect_state_from_plate(result['plate_number']),
+            'confidence': top.get('confidence'),
+            'candidates': result['candidates'],
+            'rejected': result['rejected'],
+            'timings': result['timings']
+        })
+    item['timing_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return item
+
+def _record_batch_item(item):
+    # Metrics recorded inside the worker processes are never exported, so
+    # each image's outcome and stage timings are recorded again here
+    if 'error' in item:
+        OCR_RESULTS.inc(outcome='error')
+    else:
+        observe_ocr_result({'timings': item['timings'], 'cached': False, 'plate_number': item['plate_number'],
+                            'candidates': item['candidates'], 'rejected': item['rejected']})
+    return item
+
+_batch_pool = None
+_batch_pool_lock = threading.Lock()
+
+def new_batch_pool(workers=None):
+    """
+    Process pool for batch OCR, started with OCR_BATCH_START_METHOD
+    
+    Args:
+        workers: Number of processes, defaults to OCR_BATCH_WORKERS
+        
+    Returns:
+        ProcessPoolExecutor: The pool; the caller shuts it down
+    """
+    context = multiprocessing.get_context(OCR_BATCH_START_METHOD)
+    return ProcessPoolExecutor(max_workers=workers or OCR_BATCH_WORKERS, mp_context=context)
+
+def get_batch_pool():
+    """Return the process-wide batch pool, creating it on first use"""
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            _batch_pool = new_batch_pool()
+            logging.info(f"Started batch OCR pool ({OCR_BATCH_WORKERS} {OCR_BATCH_START_METHOD} processes)")
+        return _batch_pool
+
+def _discard_batch_pool(pool):
+    # A process that died (e.g. killed for memory) breaks the whole pool;
+    # the next batch starts a new one
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is pool:
+            _batch_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _reset_batch_pool_after_fork():
+    # The pool's management thread does not survive fork(); each child starts its own
+    global _batch_pool, _batch_pool_lock
+    _batch_pool = None
+    _batch_pool_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_batch_pool_after_fork)
+
+def process_batch(items, workers=None):
+    """
+    OCR many images across all cores, yielding each result as soon as it is ready
+    
+    Images are spread over the shared batch pool, so concurrent batches
+    queue for the same OCR_BATCH_WORKERS processes instead of each
+    starting its own; at most two images per process are in flight per
+    batch, so a large archive is never held in memory whole.
+    
+    Args:
+        items: Iterable of (name, encoded image bytes)
+        workers: Use a pool of its own with this many processes instead
+                 (benchmarks); shut down when the batch ends
+        
+    Yields:
+        dict: 'index', 'name', 'plate_number', 'state', 'confidence',
+              'candidates', 'rejected', 'timings' and 'timing_ms', or 'error'
+    """
+    own_pool = workers is not None
+    executor = new_batch_pool(workers) if own_pool else get_batch_pool()
+    in_flight = (workers or OCR_BATCH_WORKERS) * 2
+    pending = set()
+    try:
+        for index, (name, data) in enumerate(items):
+            if len(data) > OCR_MAX_UPLOAD_BYTES:
+                OCR_RESULTS.inc(outcome='error')
+                yield {'index': index, 'name': name, 'timing_ms': 0,
+                       'error': f"Image is over {OCR_MAX_UPLOAD_BYTES} bytes"}
+                continue
+            
+            pending.add(executor.submit(_analyze_batch_item, index, name, data))
+            if len(pending) >= in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield _record_batch_item(future.result())
+        
+        for future in as_completed(pending):
+            yield _record_batch_item(future.result())
+    except BrokenProcessPool:
+        if not own_pool:
+            _discard_batch_pool(executor)
+        raise
+    finally:
+        # Also reached when the client disconnects mid-stream; other
+        # batches may be using the shared pool, so only this batch's
+        # queued images are dropped
+        for future in pending:
+            future.cancel()
+        if own_pool:
+            executor.shutdown(wait=False, cancel_futures=True)
+
@@ -0,0 +1,139 @@
+import re
+from collections import namedtuple
+
+# Registration codes of Indian states and union territories
+STATE_NAMES = {
+    'AN': 'Andaman and Nicobar Islands',
+    'AP': 'Andhra Pradesh',
+    'AR': 'Arunachal Pradesh',
+    'AS': 'Assam',
+    'BR': 'Bihar',
+    'CG': 'Chhattisgarh',
+    'CH': 'Chandigarh',
+    'DD': 'Dadra and Nagar Haveli and Daman and Diu',
+    'DL': 'Delhi',
+    'DN': 'Dadra and Nagar Haveli and Daman and Diu',
+    'GA': 'Goa',
+    'GJ': 'Gujarat',
+    'HP': 'Himachal Pradesh',
+    'HR': 'Haryana',
+    'JH': 'Jharkhand',
+    'JK': 'Jammu and Kashmir',
+    'KA': 'Karnataka',
+    'KL': 'Kerala',
+    'LA': 'Ladakh',
+    'LD': 'Lakshadweep',
+    'MH': 'Maharashtra',
+    'ML': 'Meghalaya',
+    'MN': 'Manipur',
+    'MP': 'Madhya Pradesh',
+    'MZ': 'Mizoram',
+    'NL': 'Nagaland',
+    'OD': 'Odisha',
+    'OR': 'Odisha',
+    'PB': 'Punjab',
+    'PY': 'Puducherry',
+    'RJ': 'Rajasthan',
+    'SK': 'Sikkim',
+    'TG': 'Telangana',
+    'TN': 'Tamil Nadu',
+    'TR': 'Tripura',
+    'TS': 'Telangana',
+    'UK': 'Uttarakhand',
+    'UP': 'Uttar Pradesh',
+    'WB': 'West Bengal'
+}
+
+_STATE = '|'.join(sorted(STATE_NAMES))
+# Separators allowed between the groups of a plate read from free text
+_SEP = r'[\s.\-]*'
+
+# One alternative per plate family, each with named groups:
+#   standard:  TS 09 AB 1234   state, RTO district, 1-3 series letters, 1-4 digits
+#   bh:        22 BH 1234 AA   registration year, BH, 4 digits, 1-2 series letters
+#   temporary: T 0124 KA 1234 A   T, month and year, state, 4 digits, series
+_FAMILIES = (
+    rf'(?P<state>{_STATE}){_SEP}(?P<rto>\d{{1,2}}){_SEP}(?P<series>[A-Z]{{1,3}}){_SEP}(?P<number>\d{{1,4}})',
+    rf'(?P<bh_year>\d{{2}}){_SEP}BH{_SEP}(?P<bh_number>\d{{4}}){_SEP}(?P<bh_series>[A-Z]{{1,2}})',
+    rf'T{_SEP}(?P<temp_month>\d{{4}}){_SEP}(?P<temp_state>{_STATE}){_SEP}(?P<temp_number>\d{{4}}){_SEP}(?P<temp_series>[A-Z]{{1,2}})'
+)
+
+# Whole-string grammar for normalised plates, and a scanner for OCR text
+PLATE_GRAMMAR = re.compile('|'.join(f'(?:{family})' for family in _FAMILIES).replace(_SEP, ''))
+PLATE_SCANNER = re.compile(r'(?<![A-Z0-9])(?:' + '|'.join(f'(?:{family})' for family in _FAMILIES) + r')(?![A-Z0-9])')
+
+NON_ALNUM = re.compile(r'[^A-Z0-9]')
+
+Plate = namedtuple('Plate', ['plate', 'kind', 'state_code', 'state', 'rto', 'series', 'number'])
+
+
+def _state_of(match):
+    # BH-series vehicles are registered nationally rather than to a state
+    code = match['state'] or match['temp_state']
+    return STATE_NAMES[code] if code else 'Bharat Series'
+
+
+def _from_match(match):
+    if match['state']:
+        kind, code = 'standard', match['state']
+        rto, series, number = match['rto'].zfill(2), match['series'], match['number']
+        plate = f"{code}{match['rto']}{series}{number}"
+    elif match['bh_year']:
+        kind, code = 'bh', None
+        rto, series, number = None, match['bh_series'], match['bh_number']
+        plate = f"{match['bh_year']}BH{number}{series}"
+    else:
+        kind, code = 'temporary', match['temp_state']
+        rto, series, number = None, match['temp_series'], match['temp_number']
+        plate = f"T{match['temp_month']}{code}{number}{series}"
+    return Plate(plate, kind, code, _state_of(match), rto, series, number)
+
+
+def parse_plate(text):
+    """
+    Parse and validate a plate in one pass
+
+    Args:
+        text: Plate with or without spaces and hyphens
+
+    Returns:
+        Plate: Structured fields (plate, kind, state_code, state, rto,
+               series, number), or None if the text is not a valid plate
+    """
+    if not text:
+        return None
+    match = PLATE_GRAMMAR.fullmatch(NON_ALNUM.sub('', text.upper()))
+    return _from_match(match) if match else None
+
+
+def is_valid_plate(text):
+    return bool(text) and PLATE_GRAMMAR.fullmatch(text) is not None
+
+
+def find_plates(text):
+    """
+    Find every well-formed plate in free text such as raw OCR output
+
+    Returns:
+        list: Plate tuples in order of appearance
+    """
+    if not text:
+        return []
+    return [_from_match(match) for match in PLATE_SCANNER.finditer(text.upper())]
+
+
+def first_plate(text):
+    """The first well-formed plate in free text, normalised, or None"""
+    match = PLATE_SCANNER.search(text.upper()) if text else None
+    return _from_match(match).plate if match else None
+
+
+def plate_state(text):
+    """State of a complete plate ('Bharat Series' for BH plates), or None if it does not parse"""
+    match = PLATE_GRAMMAR.fullmatch(NON_ALNUM.sub('', text.upper())) if text else None
+    return _state_of(match) if match else None
+
+
+def state_from_code(code):
+    """State for a two-letter registration code, or None"""
+    return STATE_NAMES.get(code)
@@ -0,0 +1,268 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+# Seconds between checks for vehicles registered since the index was built
+PLATE_INDEX_REFRESH_INTERVAL = float(os.environ.get("PLATE_INDEX_REFRESH_INTERVAL", "2"))
+# Vehicle ids re-read this far below the highest seen: ids are handed out at
+# insert, so a registration committing late leaves a lower id behind
+PLATE_INDEX_ID_OVERLAP = int(os.environ.get("PLATE_INDEX_ID_OVERLAP", "200"))
+# Vehicles ranked by edit distance after the trigram prefilter
+PLATE_INDEX_SHORTLIST = 200
+# Matches further than this (in weighted edits) are not returned
+PLATE_MATCH_MAX_DISTANCE = 2.0
+# Substituting characters OCR commonly confuses costs this much instead of 1
+CONFUSION_COST = 0.3
+
+# Characters tesseract confuses on number plates, mapped to one representative
+CONFUSABLE = str.maketrans({
+    'O': '0', 'D': '0', 'Q': '0',
+    'I': '1', 'L': '1',
+    'Z': '2',
+    'S': '5',
+    'G': '6',
+    'T': '7',
+    'B': '8'
+})
+
+NON_ALNUM = re.compile(r'[^A-Z0-9]')
+
+
+def normalize_plate(text):
+    """
+    Canonical form of a plate as typed or read: upper case, letters and digits only
+
+    "ts 09 ab 1234", "TS-09-AB-1234" and "TS09AB1234" all normalise to "TS09AB1234".
+    """
+    if not text:
+        return ''
+    return NON_ALNUM.sub('', text.upper())
+
+
+def shape_key(plate_key):
+    """Plate key with OCR-confusable characters folded together (O/0, I/1, B/8, ...)"""
+    return plate_key.translate(CONFUSABLE)
+
+
+def _trigrams(key):
+    padded = f"^{key}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def plate_distance(a, b, max_distance=PLATE_MATCH_MAX_DISTANCE, a_shape=None, b_shape=None):
+    """
+    Edit distance between two plate keys where OCR confusions are cheap
+
+    Args:
+        a, b: Plate keys
+        max_distance: Give up once the distance is certain to exceed this
+        a_shape, b_shape: Their shape keys, if already computed
+
+    Returns:
+        float: Weighted distance, or None if it exceeds max_distance
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    a_shape = a_shape or shape_key(a)
+    b_shape = b_shape or shape_key(b)
+    previous = [float(j) for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [float(i)]
+        char_a, shape_a = a[i - 1], a_shape[i - 1]
+        for j in range(1, len(b) + 1):
+            if char_a == b[j - 1]:
+                substitution = 0.0
+            elif shape_a == b_shape[j - 1]:
+                substitution = CONFUSION_COST
+            else:
+                substitution = 1.0
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + substitution))
+        if min(current) > max_distance:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= max_distance else None
+
+
+class PlateIndex:
+    """
+    In-memory index of registered plates for OCR-tolerant lookups.
+
+    Plates are indexed by the trigrams of their shape key; a query only
+    computes edit distances for the few plates sharing the most trigrams
+    with it, so lookups stay in the millisecond range with hundreds of
+    thousands of vehicles. Vehicles are append-only in this app, so the
+    index refreshes by loading the rows it has not seen from just below
+    the highest id it has seen.
+    """
+
+    def __init__(self, refresh_interval=PLATE_INDEX_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._plates = []  # (plate key, shape key, vehicle id, plate number, state)
+        self._by_shape = {}  # shape key -> [plate index]
+        self._trigrams = {}  # trigram -> [plate index]
+        self._max_id = 0
+        self._ids = set()
+        self._checked_at = None
+
+    def __len__(self):
+        return len(self._plates)
+
+    def add(self, vehicle_id, plate_number, state, plate_key=None):
+        with self._lock:
+            self._add_locked(vehicle_id, plate_number, state, plate_key)
+
+    def _add_locked(self, vehicle_id, plate_number, state, plate_key):
+        key = plate_key or normalize_plate(plate_number)
+        if not key or vehicle_id in self._ids:
+            return
+        position = len(self._plates)
+        shape = shape_key(key)
+        self._plates.append((key, shape, vehicle_id, plate_number, state))
+        self._by_shape.setdefault(shape, []).append(position)
+        for trigram in _trigrams(shape):
+            self._trigrams.setdefault(trigram, []).append(position)
+        self._ids.add(vehicle_id)
+        self._max_id = max(self._max_id, vehicle_id)
+
+    def refresh(self, force=False):
+        """Load vehicles registered since the last refresh"""
+        from models import Vehicle
+
+        now = time.monotonic()
+        if not force and self._checked_at is not None and now - self._checked_at < self.refresh_interval:
+            return 0
+        self._checked_at = now
+
+        rows = (Vehicle.query
+                .with_entities(Vehicle.id, Vehicle.plate_number, Vehicle.state, Vehicle.plate_key)
+                .filter(Vehicle.id > self._max_id - PLATE_INDEX_ID_OVERLAP)
+                .order_by(Vehicle.id)
+                .all())
+        with self._lock:
+            rows = [row for row in rows if row[0] not in self._ids]
+            for vehicle_id, plate_number, state, plate_key in rows:
+                self._add_locked(vehicle_id, plate_number, state, plate_key)
+        if rows:
+            logging.debug(f"Plate index loaded {len(rows)} vehicles ({len(self._plates)} total)")
+        return len(rows)
+
+    def search(self, text, limit=5, max_distance=PLATE_MATCH_MAX_DISTANCE):
+        """
+        Find registered vehicles whose plate is close to an OCR reading
+
+        Args:
+            text: Plate as read or typed
+            limit: Maximum number of matches
+            max_distance: Largest weighted edit distance returned
+
+        Returns:
+            list: Dicts with 'vehicle_id', 'plate_number', 'state' and
+                  'distance', closest first
+        """
+        key = normalize_plate(text)
+        if not key:
+            return []
+        shape = shape_key(key)
+
+        with self._lock:
+            # Identical up to OCR confusions: checked first, they are the likeliest
+            shortlist = list(self._by_shape.get(shape, ()))
+            # Each real edit breaks at most three trigrams, so a plate within
+            # max_distance edits shares at least two of the query's
+            # 3 * edits + 2 rarest trigrams; the postings of the most common
+            # ones (such as "^7S" for every TS plate) are never scanned.
+            edits = int(max_distance)
+            postings = sorted((self._trigrams.get(trigram, ()) for trigram in _trigrams(shape)), key=len)
+            overlap = Counter()
+            for posting in postings[:3 * edits + 2]:
+                overlap.update(posting)
+            minimum = min(2, len(postings))
+            shortlist += [position for position, count in overlap.most_common(PLATE_INDEX_SHORTLIST)
+                          if count >= minimum]
+            plates = [self._plates[position] for position in dict.fromkeys(shortlist)]
+
+        matches = []
+        bound = max_distance
+        for plate_key, plate_shape, vehicle_id, plate_number, state in plates:
+            distance = plate_distance(key, plate_key, bound, shape, plate_shape)
+            if distance is None:
+                continue
+            matches.append({
+                'vehicle_id': vehicle_id,
+                'plate_number': plate_number,
+                'state': state,
+                'distance': round(distance, 2)
+            })
+            if len(matches) >= limit:
+                # Only plates closer than the current worst can still make the cut
+                matches.sort(key=lambda match: match['distance'])
+                del matches[limit:]
+                bound = matches[-1]['distance']
+        matches.sort(key=lambda match: (match['distance'], match['plate_number']))
+        return matches[:limit]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_plate_index():
+    """Return the process-wide plate index, refreshed from the database"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = PlateIndex()
+        index = _index
+    index.refresh()
+    return index
+
+
+def find_vehicle_matches(text, limit=5):
+    """Closest registered vehicles to a plate reading; [] if the lookup fails"""
+    try:
+        return get_plate_index().search(text, limit=limit)
+    except Exception as e:
+        logging.error(f"Plate lookup failed: {str(e)}")
+        return []
+
+
+def _reset_index_after_fork():
+    global _index, _index_lock
+    _index = None
+    _index_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_index_after_fork)
+
+
+def backfill_plate_keys():
+    """
+    Fill Vehicle.plate_key for rows created before it existed
+
+    When several vehicles normalise to the same key (the duplicates this key
+    exists to prevent), only the oldest gets it; the others are logged.
+
+    Returns:
+        tuple: (keys set, duplicates skipped)
+    """
+    from app import db
+    from models import Vehicle
+
+    taken = {key for (key,) in Vehicle.query.with_entities(Vehicle.plate_key)
+             .filter(Vehicle.plate_key.isnot(None))}
+    updated = duplicates = 0
+    for vehicle in Vehicle.query.filter(Vehicle.plate_key.is_(None)).order_by(Vehicle.id):
+        key = normalize_plate(vehicle.plate_number)
+        if key in taken:
+            logging.warning(f"Vehicle {vehicle.id} ({vehicle.plate_number}) duplicates plate {key}")
+            duplicates += 1
+            continue
+        vehicle.plate_key = key
+        taken.add(key)
+        updated += 1
+    db.session.commit()
+    return updated, duplicates
@@ -0,0 +1,97 @@
+import logging
+import os
+
+from lazy_imports import optional_import
+
+cv2 = optional_import('cv2')
+np = optional_import('numpy')
+
+# Localisation runs on a downscaled copy; boxes are mapped back to full size
+LOCALIZE_MAX_DIMENSION = 800
+# Width / height of a standard single-row Indian plate (500mm x 120mm)
+PLATE_ASPECT = 4.2
+# Two-row motorcycle plates are close to 1.7, long rear plates reach ~6.5
+MIN_ASPECT = 1.5
+MAX_ASPECT = 7.0
+# Candidate area as a fraction of the frame
+MIN_AREA_FRACTION = 0.001
+MAX_AREA_FRACTION = 0.4
+# How many candidate regions are handed to OCR per frame
+OCR_MAX_REGIONS = int(os.environ.get("OCR_MAX_REGIONS", "3"))
+
+
+def find_plate_regions(image, max_regions=OCR_MAX_REGIONS):
+    """
+    Find rectangles in a frame that are likely to contain a number plate
+
+    Plate characters produce dense vertical strokes, so the horizontal
+    gradient is thresholded, closed into one blob per text line and the
+    blobs are filtered by aspect ratio and size. Boxes are scored by edge
+    density (from an integral image, for all boxes at once) weighted by how
+    close they are to the shape of a plate.
+
+    Args:
+        image: PIL image of the whole frame
+        max_regions: Maximum number of regions to return
+
+    Returns:
+        list: Dicts with 'bbox' ([x, y, width, height] in image pixels)
+              and 'score', best first. Empty if OpenCV is not installed.
+    """
+    if cv2 is None:
+        return []
+
+    gray = np.asarray(image.convert('L'))
+    height, width = gray.shape
+    scale = min(1.0, LOCALIZE_MAX_DIMENSION / max(height, width))
+    if scale < 1.0:
+        gray = cv2.resize(gray, (round(width * scale), round(height * scale)),
+                          interpolation=cv2.INTER_AREA)
+    h, w = gray.shape
+
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    gradient = cv2.convertScaleAbs(cv2.Sobel(blurred, cv2.CV_16S, 1, 0, ksize=3))
+    _, edges = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+
+    # Merge neighbouring characters into one blob per line of text
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, w // 40), max(3, h // 120)))
+    mask = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return []
+
+    boxes = np.array([cv2.boundingRect(contour) for contour in contours])
+    box_w, box_h = boxes[:, 2], boxes[:, 3]
+    aspect = box_w / np.maximum(box_h, 1)
+    area = box_w * box_h / float(w * h)
+    keep = ((aspect >= MIN_ASPECT) & (aspect <= MAX_ASPECT)
+            & (area >= MIN_AREA_FRACTION) & (area <= MAX_AREA_FRACTION))
+    if not keep.any():
+        return []
+    boxes, aspect = boxes[keep], aspect[keep]
+
+    # Edge pixels inside every box, looked up from one integral image
+    integral = cv2.integral(edges // 255)
+    x0, y0 = boxes[:, 0], boxes[:, 1]
+    x1, y1 = x0 + boxes[:, 2], y0 + boxes[:, 3]
+    edge_count = integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+    density = edge_count / (boxes[:, 2] * boxes[:, 3])
+
+    aspect_fit = np.exp(-np.square(np.log(aspect / PLATE_ASPECT)))
+    scores = density * aspect_fit
+
+    regions = []
+    for i in np.argsort(-scores)[:max_regions]:
+        x, y, bw, bh = (int(v) for v in boxes[i])
+        # Pad so the outer characters are not clipped, then map back to full size
+        pad_x, pad_y = bw // 12, bh // 5
+        left, top = max(0, x - pad_x), max(0, y - pad_y)
+        right, bottom = min(w, x + bw + pad_x), min(h, y + bh + pad_y)
+        bbox = [round(left / scale), round(top / scale),
+                round((right - left) / scale), round((bottom - top) / scale)]
+        regions.append({'bbox': bbox, 'score': round(float(scores[i]), 4)})
+
+    logging.debug(f"Plate localisation found {len(contours)} blobs, kept {len(regions)}")
+    return regions
@@ -0,0 +1,235 @@
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, tuple_
+from sqlalchemy.orm import joinedload, load_only
+
+from app import db
+from models import Fine, Vehicle
+from plate_index import normalize_plate
+from search import MAX_SEARCH_LENGTH, search_condition
+from state_detection import STATE_PREFIXES
+
+# Rows per page of the fines listing
+FINES_PAGE_SIZE = int(os.environ.get("FINES_PAGE_SIZE", "25"))
+# Rows shown in the "Recent Fines" tables of the dashboards
+EMPLOYEE_RECENT_FINES = 10
+USER_RECENT_FINES = 5
+
+# Violation types offered by the fine entry form
+FINE_REASONS = [
+    'Speeding', 'Red Light Jumping', 'No Parking', 'Drunk Driving', 'No Helmet',
+    'Using Mobile Phone', 'Wrong Side Driving', 'No Seatbelt', 'Other'
+]
+FINE_STATES = sorted(set(STATE_PREFIXES.values())) + ['Bharat Series', 'Unknown']
+
+# Sort key -> (column, descending). Fine.id breaks ties so the order is total.
+SORT_OPTIONS = {
+    'newest': (Fine.date, True),
+    'oldest': (Fine.date, False),
+    'amount_high': (Fine.amount, True),
+    'amount_low': (Fine.amount, False)
+}
+DEFAULT_SORT = 'newest'
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_fine_filters(args):
+    """
+    Read listing filters from request arguments, dropping invalid values
+
+    Args:
+        args: request.args (or any mapping)
+
+    Returns:
+        dict: Filters understood by filter_fines, plus 'sort'
+    """
+    filters = {
+        'date_from': _parse_date(args.get('date_from')),
+        'date_to': _parse_date(args.get('date_to')),
+        'state': args.get('state') if args.get('state') in FINE_STATES else None,
+        'paid': {'1': True, '0': False}.get(args.get('paid')),
+        'plate': normalize_plate(args.get('plate')) or None,
+        'reason': args.get('reason') or None,
+        'search': (args.get('q') or '').strip()[:MAX_SEARCH_LENGTH] or None,
+        'sort': args.get('sort') if args.get('sort') in SORT_OPTIONS else DEFAULT_SORT
+    }
+    return filters
+
+
+def filter_args(filters):
+    """Filters as query-string arguments, for building links that keep them"""
+    args = {}
+    for name in ('date_from', 'date_to'):
+        if filters.get(name):
+            args[name] = filters[name].strftime('%Y-%m-%d')
+    for name in ('state', 'plate', 'reason'):
+        if filters.get(name):
+            args[name] = filters[name]
+    if filters.get('paid') is not None:
+        args['paid'] = '1' if filters['paid'] else '0'
+    if filters.get('search'):
+        args['q'] = filters['search']
+    if filters.get('sort', DEFAULT_SORT) != DEFAULT_SORT:
+        args['sort'] = filters['sort']
+    return args
+
+
+def filter_fines(query, filters):
+    """
+    Apply listing filters to a Fine query
+
+    Args:
+        query: Fine query, typically already scoped to a user
+        filters: dict from parse_fine_filters
+
+    Returns:
+        Query: The filtered query
+    """
+    if filters.get('date_from'):
+        query = query.filter(Fine.date >= filters['date_from'])
+    if filters.get('date_to'):
+        # Inclusive of the whole end day
+        query = query.filter(Fine.date < filters['date_to'] + timedelta(days=1))
+    if filters.get('paid') is not None:
+        query = query.filter(Fine.paid == filters['paid'])
+    if filters.get('reason'):
+        query = query.filter(Fine.reason == filters['reason'])
+    if filters.get('search'):
+        condition = search_condition(filters['search'])
+        if condition is not None:
+            query = query.filter(condition)
+    if filters.get('state') or filters.get('plate'):
+        query = query.join(Vehicle, Fine.vehicle_id == Vehicle.id)
+        if filters.get('state'):
+            query = query.filter(Vehicle.state == filters['state'])
+        if filters.get('plate'):
+            # Prefix match so the unique index on plate_key can be used
+            query = query.filter(Vehicle.plate_key.like(f"{filters['plate']}%"))
+    return query
+
+
+def listing_options(query):
+    """
+    Load only what the fine tables render, with each fine's vehicle in the same SELECT
+
+    Without this every row lazy-loads its vehicle with a separate query.
+    """
+    return query.options(
+        load_only(Fine.date, Fine.reason, Fine.amount, Fine.location, Fine.paid,
+                  Fine.proof_image_key, Fine.vehicle_id, Fine.user_id),
+        joinedload(Fine.vehicle, innerjoin=True).load_only(Vehicle.plate_number, Vehicle.state)
+    )
+
+
+def _encode_cursor(fine, column):
+    value = getattr(fine, column.key)
+    value = value.isoformat() if isinstance(value, datetime) else repr(value)
+    return f"{value}_{fine.id}"
+
+
+def _decode_cursor(cursor, column):
+    try:
+        value, fine_id = cursor.rsplit('_', 1)
+        if column is Fine.date:
+            value = datetime.fromisoformat(value)
+        else:
+            value = float(value)
+        return value, int(fine_id)
+    except (AttributeError, ValueError):
+        logging.warning(f"Ignoring invalid fines cursor: {cursor!r}")
+        return None
+
+
+def paginate_fines(query, sort=DEFAULT_SORT, cursor=None, page_size=FINES_PAGE_SIZE):
+    """
+    Return one keyset-paginated page of a Fine query
+
+    Pages are addressed by the sort value and id of the last row seen, so
+    every page costs an index range scan regardless of how deep it is.
+
+    Args:
+        query: Filtered Fine query
+        sort: Key of SORT_OPTIONS
+        cursor: Cursor returned for the previous page, or None for the first
+        page_size: Rows per page
+
+    Returns:
+        tuple: (list of Fine, cursor for the next page or None)
+    """
+    column, descending = SORT_OPTIONS.get(sort, SORT_OPTIONS[DEFAULT_SORT])
+
+    position = _decode_cursor(cursor, column) if cursor else None
+    if position is not None:
+        key = tuple_(column, Fine.id)
+        query = query.filter(key < position if descending else key > position)
+
+    if descending:
+        query = query.order_by(column.desc(), Fine.id.desc())
+    else:
+        query = query.order_by(column.asc(), Fine.id.asc())
+
+    # One extra row tells us whether there is a next page
+    fines = listing_options(query).limit(page_size + 1).all()
+    next_cursor = None
+    if len(fines) > page_size:
+        fines = fines[:page_size]
+        next_cursor = _encode_cursor(fines[-1], column)
+    return fines, next_cursor
+
+
+def recent_fines(query, limit):
+    """Newest fines of a query"""
+    return listing_options(query).order_by(Fine.date.desc(), Fine.id.desc()).limit(limit).all()
+
+
+def fine_summary(query):
+    """
+    Count and total fines of a query with a single aggregate SELECT
+
+    Returns:
+        dict: count, amount, paid_count, paid_amount, unpaid_count, unpaid_amount
+    """
+    subquery = query.with_entities(Fine.amount, Fine.paid).order_by(None).subquery()
+    row = db.session.query(
+        func.count(),
+        func.coalesce(func.sum(subquery.c.amount), 0),
+        func.coalesce(func.sum(case((subquery.c.paid == True, 1), else_=0)), 0),  # noqa: E712
+        func.coalesce(func.sum(case((subquery.c.paid == True, subquery.c.amount), else_=0)), 0)  # noqa: E712
+    ).one()
+    count, amount, paid_count, paid_amount = row
+    return {
+        'count': count,
+        'amount': amount,
+        'paid_count': paid_count,
+        'paid_amount': paid_amount,
+        'unpaid_count': count - paid_count,
+        'unpaid_amount': amount - paid_amount
+    }
+
+
+def reason_counts(query):
+    """(reason, count) pairs of a query, most common first"""
+    subquery = query.with_entities(Fine.reason).order_by(None).subquery()
+    return db.session.query(subquery.c.reason, func.count()) \
+        .group_by(subquery.c.reason) \
+        .order_by(func.count().desc(), subquery.c.reason) \
+        .all()
+
+
+def vehicle_fine_counts(vehicle_ids):
+    """Number of fines per vehicle id, from one GROUP BY instead of a load per vehicle"""
+    if not vehicle_ids:
+        return {}
+    rows = db.session.query(Fine.vehicle_id, func.count()) \
+        .filter(Fine.vehicle_id.in_(vehicle_ids)) \
+        .group_by(Fine.vehicle_id) \
+        .all()
+    return dict(rows)
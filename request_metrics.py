@@ -0,0 +1,36 @@
+import hmac
+import os
+import time
+
+from flask import Response, abort, g, request
+
+from app import app
+from metrics import HTTP_REQUEST_SECONDS, REGISTRY
+
+# Bearer token Prometheus must present to /metrics; unset leaves it open
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def observe_request_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # Label by endpoint rather than path so ids in URLs do not explode the series
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                     endpoint=request.endpoint or 'unmatched',
+                                     method=request.method, status=response.status_code)
+    return response
+
+
+@app.route('/metrics')
+def metrics():
+    if METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied, METRICS_TOKEN):
+            abort(401)
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
@@ -1,16 +1,59 @@
 import os
 import logging
-from flask import render_template, redirect, url_for, request, flash, session, jsonify
+from flask import render_template, redirect, url_for, request, flash, session, jsonify, Response, stream_with_context, send_file, abort
 from werkzeug.security import check_password_hash
 from werkzeug.utils import secure_filename
-import tempfile
 import base64
+import io
+import itertools
+import json
 import re
+import time
+import uuid
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app import app, db
-from models import User, Vehicle, Fine
-from ocr_utils import process_image
+from blob_store import blob_path, ensure_thumbnail, is_valid_key, save_data_url, InvalidBlobError
+from fine_import import import_fines, read_rows, detect_format, ImportFormatError, IMPORT_FORMATS
+from fine_stats import record_new_fine, record_payment_change, get_stats, get_top, get_totals
+from metrics import stage_timer
+from models import User, Vehicle, Fine, OcrJob
+from ocr_burst import analyze_burst, OCR_BURST_MAX_FRAMES, OCR_BURST_FRAMES, OCR_BURST_INTERVAL_MS
+from ocr_cache import get_result_cache
+from ocr_jobs import (get_job_queue, QueueFullError, OCR_JOB_RETENTION, OCR_JOB_STREAM_TIMEOUT, OCR_JOB_POLL_INTERVAL,
+                      OCR_JOB_CLIENT_TIMEOUT)
+from ocr_utils import (analyze_image, process_batch, timed, ImageTooLargeError, OCR_MAX_UPLOAD_BYTES,
+                       OCR_UPLOAD_MAX_DIMENSION, OCR_UPLOAD_QUALITY)
+from plate_index import find_vehicle_matches, normalize_plate
+from queries import (parse_fine_filters, filter_args, filter_fines, paginate_fines, recent_fines,
+                     fine_summary, reason_counts, vehicle_fine_counts, FINE_REASONS, FINE_STATES,
+                     EMPLOYEE_RECENT_FINES, USER_RECENT_FINES)
 from state_detection import detect_state_from_plate
+from watchlist import add_unpaid_summary, expire_watchlist, track_new_fine, track_payment_change
+
+# Limits for /process_image/batch uploads
+OCR_BATCH_MAX_BYTES = int(os.environ.get("OCR_BATCH_MAX_BYTES", 512 * 1024 * 1024))
+OCR_BATCH_MAX_IMAGES = int(os.environ.get("OCR_BATCH_MAX_IMAGES", "2000"))
+BATCH_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff')
+
+# Largest CSV / JSON-lines file accepted by /fines/import
+FINE_IMPORT_MAX_BYTES = int(os.environ.get("FINE_IMPORT_MAX_BYTES", 256 * 1024 * 1024))
+
+# Browser cache lifetime for proof images (they are immutable)
+PROOF_IMAGE_MAX_AGE = 365 * 24 * 3600
+
+# What the fine entry page shows when the quality gate refuses a frame
+REJECTED_FRAME_MESSAGES = {
+    'blurred': 'Image too blurred - please retake',
+    'underexposed': 'Image too dark - please retake',
+    'overexposed': 'Image too bright - please retake',
+    'low_contrast': 'Image too faint - please retake'
+}
 
 # Define employee credentials
 EMPLOYEE_USERNAME = "manager"
@@ -83,20 +126,25 @@ def user_dashboard():
     user_id = session['user_id']
     user = User.query.get(user_id)
     
-    # Get all vehicles and fines for this user
+    # Get the vehicles, the fine totals and only the most recent fines
     vehicles = Vehicle.query.filter_by(user_id=user_id).all()
-    fines = Fine.query.filter_by(user_id=user_id).all()
+    fine_counts = vehicle_fine_counts([vehicle.id for vehicle in vehicles])
+    user_fines = Fine.query.filter_by(user_id=user_id)
+    summary = fine_summary(user_fines)
+    fines = recent_fines(user_fines, USER_RECENT_FINES)
     
-    return render_template('user_dashboard.html', user=user, vehicles=vehicles, fines=fines)
+    return render_template('user_dashboard.html', user=user, vehicles=vehicles, fines=fines,
+                           summary=summary, fine_counts=fine_counts)
 
 @app.route('/employee/dashboard')
 def employee_dashboard():
     if not session.get('user_id') or not session.get('is_employee'):
         return redirect(url_for('login'))
     
-    # Get all fines for the employee to manage
-    fines = Fine.query.all()
-    return render_template('employee_dashboard.html', fines=fines)
+    # Totals are read from the aggregates table; only the recent fines are loaded
+    summary = get_totals()
+    fines = recent_fines(Fine.query, EMPLOYEE_RECENT_FINES)
+    return render_template('employee_dashboard.html', fines=fines, summary=summary)
 
 @app.route('/employee/fine/new', methods=['GET', 'POST'])
 def new_fine():
@@ -110,33 +158,45 @@ def new_fine():
         location = request.form.get('location')
         proof_image = request.form.get('proof_image')  # Get the base64 image data
         
-        if not plate_number or not reason or not amount or not location:
+        # "ts 09 ab 1234" and "TS-09-AB-1234" are the same vehicle; a plate of
+        # only spaces and punctuation normalises to nothing and counts as missing
+        plate_key = normalize_plate(plate_number or '')
+        
+        if not plate_key or not reason or not amount or not location:
             flash('All fields are required', 'danger')
             return redirect(url_for('new_fine'))
         
+        # Keep the image in the blob store; the fine only references it
+        try:
+            proof_image_key = save_data_url(proof_image)
+        except InvalidBlobError:
+            flash('The proof image could not be read, please upload it again', 'danger')
+            return redirect(url_for('new_fine'))
+        
         # Detect state from plate number
         state = detect_state_from_plate(plate_number)
         
         # Check if vehicle exists, if not create it
-        vehicle = Vehicle.query.filter_by(plate_number=plate_number).first()
+        vehicle = Vehicle.query.filter_by(plate_key=plate_key).first()
         
         if not vehicle:
             # Find or create user for this vehicle
             # For simplicity, create a default user with the same name as the plate number
-            user = User.query.filter_by(username=plate_number).first()
+            user = User.query.filter_by(username=plate_key).first()
             if not user:
                 user = User()
-                user.username = plate_number
+                user.username = plate_key
                 user.is_employee = False
                 db.session.add(user)
-                db.session.commit()
+                db.session.flush()
             
             vehicle = Vehicle()
-            vehicle.plate_number = plate_number
+            vehicle.plate_number = plate_key
+            vehicle.plate_key = plate_key
             vehicle.state = state
             vehicle.user_id = user.id
             db.session.add(vehicle)
-            db.session.commit()
+            db.session.flush()
         
         # Create new fine
         fine = Fine()
@@ -146,16 +206,97 @@ def new_fine():
         fine.vehicle_id = vehicle.id
         fine.user_id = vehicle.user_id
         fine.created_by = session['user_id']
-        fine.proof_image = proof_image
+        fine.proof_image_key = proof_image_key
         
         db.session.add(fine)
+        db.session.flush()
+        record_new_fine(fine, vehicle.state)
+        # User, vehicle, fine and aggregates are committed together
         db.session.commit()
+        track_new_fine(fine)
         
         flash('Fine successfully added', 'success')
         return redirect(url_for('employee_dashboard'))
     
     return render_template('fine_entry.html')
 
+def watchlist_entry(matches):
+    """Unpaid fines of the closest registered vehicle, or None without a match"""
+    if not matches or 'unpaid_count' not in matches[0]:
+        return None
+    best = matches[0]
+    return {key: best[key] for key in ('vehicle_id', 'plate_number', 'distance', 'unpaid_count', 'unpaid_total')}
+
+def ocr_response(result):
+    """
+    Build the JSON body returned to the fine entry page for an OCR result
+    
+    Args:
+        result: Dict returned by ocr_utils.analyze_image
+        
+    Returns:
+        dict: Response payload
+    """
+    candidates = []
+    for candidate in result['candidates']:
+        # Clean up plate number - remove any non-alphanumeric characters
+        plate = re.sub(r'[^A-Za-z0-9]', '', candidate['plate_number'])
+        candidates.append({
+            'plate_number': plate,
+            'state': detect_state_from_plate(plate),
+            'bbox': candidate['bbox'],
+            'score': candidate['score'],
+            'confidence': candidate.get('confidence'),
+            'match': candidate.get('match')
+        })
+    
+    if candidates:
+        # Registered vehicles the reading could be, tolerating OCR confusions,
+        # with their unpaid fines from the in-memory watchlist
+        with timed(result['timings'], 'plate_lookup'), stage_timer('plate_lookup'):
+            matches = add_unpaid_summary(find_vehicle_matches(candidates[0]['plate_number']))
+        return {
+            'success': True, 
+            'plate_number': candidates[0]['plate_number'],
+            'state': candidates[0]['state'],
+            'confidence': candidates[0]['confidence'],
+            'candidates': candidates,
+            'matches': matches,
+            'watchlist': watchlist_entry(matches),
+            'cached': result['cached'],
+            'timings': result['timings']
+        }
+    
+    # The quality gate refused the frame before any OCR ran
+    if result.get('rejected'):
+        return {
+            'success': True,
+            'plate_number': REJECTED_FRAME_MESSAGES.get(result['rejected'], 'Image unusable - please retake'),
+            'state': 'Unknown',
+            'ocr_failed': True,
+            'rejected': result['rejected'],
+            'candidates': [],
+            'matches': [],
+            'watchlist': None,
+            'cached': result['cached'],
+            'timings': result['timings']
+        }
+    
+    # If OCR failed, extract any visible text from the image
+    # This will be an empty string or just the text found in the image
+    # Let the user edit it completely
+    return {
+        'success': True,
+        'plate_number': 'No text detected - please enter manually',
+        'state': 'Unknown',
+        'ocr_failed': True,
+        'candidates': [],
+        'matches': [],
+        'watchlist': None,
+        'cached': result['cached'],
+        'timings': result['timings']
+    }
+
 @app.route('/process_image', methods=['POST'])
 def process_image_route():
     if not session.get('user_id') or not session.get('is_employee'):
@@ -170,10 +311,13 @@ def process_image_route():
         if manual_plate:
             # Just detect state from the manually entered plate
             state = detect_state_from_plate(manual_plate)
+            matches = add_unpaid_summary(find_vehicle_matches(manual_plate))
             return jsonify({
                 'success': True, 
                 'plate_number': manual_plate,
-                'state': state
+                'state': state,
+                'matches': matches,
+                'watchlist': watchlist_entry(matches)
             })
             
         # Get the image data from the request
@@ -186,48 +330,370 @@ def process_image_route():
         if 'base64,' in image_data:
             image_data = image_data.split('base64,')[1]
         
-        # Convert base64 to image file
-        image_bytes = base64.b64decode(image_data)
+        # Refuse oversized payloads before decoding them
+        if len(image_data) * 3 // 4 > OCR_MAX_UPLOAD_BYTES:
+            return jsonify({'success': False, 'error': 'Image is too large'}), 413
+        
+        # Decode straight into memory; the OCR pipeline never touches disk
+        with stage_timer('base64_decode'):
+            image_bytes = base64.b64decode(image_data)
+        
+        return respond_with_ocr(image_bytes, bool(request.json.get('async')))
+        
+    except Exception as e:
+        logging.error(f"Error processing image: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/process_image/upload', methods=['POST'])
+def process_image_upload():
+    """
+    Binary variant of /process_image
+    
+    Takes the encoded image as a multipart 'image' file or as the raw
+    request body (Content-Type image/*), avoiding the base64/JSON overhead.
+    'async' comes from the form or the query string.
+    """
+    if not session.get('user_id') or not session.get('is_employee'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    
+    try:
+        upload = request.files.get('image')
+        stream = upload.stream if upload else request.stream
+        # One byte past the limit is enough to tell the upload is too large
+        image_bytes = stream.read(OCR_MAX_UPLOAD_BYTES + 1)
+        
+        if not image_bytes:
+            return jsonify({'success': False, 'error': 'No image data provided'}), 400
+        if len(image_bytes) > OCR_MAX_UPLOAD_BYTES:
+            return jsonify({'success': False, 'error': 'Image is too large'}), 413
+        
+        run_async = (request.form.get('async') or request.args.get('async', '')).lower() in ('1', 'true')
+        return respond_with_ocr(image_bytes, run_async)
+        
+    except Exception as e:
+        logging.error(f"Error processing image upload: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/process_image/burst', methods=['POST'])
+def process_image_burst():
+    """
+    OCR a burst of frames of the same scene in one request
+    
+    Takes several multipart 'frames' files; only the sharpest are OCR'd and
+    their readings merged by per-character voting (see ocr_burst).
+    """
+    if not session.get('user_id') or not session.get('is_employee'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    
+    try:
+        uploads = request.files.getlist('frames')
+        if not uploads:
+            return jsonify({'success': False, 'error': 'No frames provided'}), 400
+        if len(uploads) > OCR_BURST_MAX_FRAMES:
+            return jsonify({'success': False, 'error': f'At most {OCR_BURST_MAX_FRAMES} frames per burst'}), 413
         
-        # Save to a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-            temp_file.write(image_bytes)
-            temp_file_path = temp_file.name
+        frames = []
+        for upload in uploads:
+            frame = upload.stream.read(OCR_MAX_UPLOAD_BYTES + 1)
+            if len(frame) > OCR_MAX_UPLOAD_BYTES:
+                return jsonify({'success': False, 'error': 'Image is too large'}), 413
+            if frame:
+                frames.append(frame)
+        if not frames:
+            return jsonify({'success': False, 'error': 'No frames provided'}), 400
         
         try:
-            # Process the image with OCR
-            plate_number = process_image(temp_file_path)
-        finally:
-            # Always remove temporary file
-            os.unlink(temp_file_path)
+            result = analyze_burst(frames)
+        except ImageTooLargeError as e:
+            return jsonify({'success': False, 'error': str(e)}), 413
         
-        if plate_number:
-            # Clean up plate number - remove any non-alphanumeric characters
-            plate_number = re.sub(r'[^A-Za-z0-9]', '', plate_number)
-            
-            # Detect state from plate number
-            state = detect_state_from_plate(plate_number)
-            
-            return jsonify({
-                'success': True, 
-                'plate_number': plate_number,
-                'state': state
-            })
-        else:
-            # If OCR failed, extract any visible text from the image
-            # This will be an empty string or just the text found in the image
-            # Let the user edit it completely
-            return jsonify({
-                'success': True,
-                'plate_number': 'No text detected - please enter manually',
-                'state': 'Unknown',
-                'ocr_failed': True
-            })
+        response = ocr_response(result)
+        response.update({
+            'frames': result['frames'],
+            'best_frame': result['best_frame'],
+            'consensus': result['consensus']
+        })
+        return jsonify(response)
         
     except Exception as e:
-        logging.error(f"Error processing image: {str(e)}")
+        logging.error(f"Error processing image burst: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/process_image/config')
+def process_image_config():
+    """Size and encoding the capture page should use for its uploads"""
+    if not session.get('user_id') or not session.get('is_employee'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    
+    return jsonify({
+        'success': True,
+        'upload_url': url_for('process_image_upload'),
+        'burst_url': url_for('process_image_burst'),
+        'burst_frames': min(OCR_BURST_FRAMES, OCR_BURST_MAX_FRAMES),
+        'burst_interval_ms': OCR_BURST_INTERVAL_MS,
+        'max_dimension': OCR_UPLOAD_MAX_DIMENSION,
+        'quality': OCR_UPLOAD_QUALITY,
+        'mimetype': 'image/jpeg',
+        'max_bytes': OCR_MAX_UPLOAD_BYTES,
+        'job_timeout_ms': OCR_JOB_CLIENT_TIMEOUT * 1000
+    })
+
+def respond_with_ocr(image_bytes, run_async):
+    """OCR an encoded image now, or queue it and answer 202 if run_async"""
+    if run_async:
+        # Hand the image to a background worker and let the client poll
+        return submit_ocr_job(image_bytes)
+    
+    try:
+        # Process the image with OCR
+        result = analyze_image(image_bytes)
+    except ImageTooLargeError as e:
+        return jsonify({'success': False, 'error': str(e)}), 413
+    
+    return jsonify(ocr_response(result))
+
+def submit_ocr_job(image_bytes):
+    """Queue an image for OCR and answer 202 with the job's status URLs"""
+    job = OcrJob()
+    job.id = uuid.uuid4().hex
+    job.created_by = session['user_id']
+    db.session.add(job)
+    
+    # Drop finished jobs nobody is going to poll any more, and fail jobs
+    # that never finished (lost when their worker restarted) so they expire too
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=OCR_JOB_RETENTION)
+    OcrJob.query.filter(OcrJob.finished_at < cutoff).delete()
+    OcrJob.query.filter(OcrJob.status.in_(('queued', 'running')), OcrJob.submitted_at < cutoff).update(
+        {'status': 'failed', 'error': 'The job was lost before it finished', 'finished_at': now},
+        synchronize_session=False)
+    db.session.commit()
+    
+    try:
+        get_job_queue().submit(run_ocr_job, job.id, image_bytes)
+    except QueueFullError as e:
+        db.session.delete(job)
+        db.session.commit()
+        return jsonify({'success': False, 'error': str(e)}), 503
+    
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': url_for('ocr_job_status', job_id=job.id),
+        'events_url': url_for('ocr_job_events', job_id=job.id)
+    }), 202
+
+def run_ocr_job(job_id, image_bytes):
+    """Run OCR for a queued job on a worker thread and store the response"""
+    with app.app_context():
+        job = db.session.get(OcrJob, job_id)
+        if not job or job.finished:
+            # Expired while it waited in the queue
+            return
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        db.session.commit()
+        
+        try:
+            job.result = json.dumps(ocr_response(analyze_image(image_bytes)))
+            job.status = 'done'
+        except Exception as e:
+            logging.error(f"Error processing OCR job {job_id}: {str(e)}")
+            job.error = str(e)[:500]
+            job.status = 'failed'
+        
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+def own_ocr_job(job_id):
+    """The signed-in employee's OCR job, or None (other employees' jobs are unknown to them)"""
+    job = db.session.get(OcrJob, job_id)
+    if not job or job.created_by != session['user_id']:
+        return None
+    return job
+
+@app.route('/process_image/jobs/<job_id>')
+def ocr_job_status(job_id):
+    if not session.get('user_id') or not session.get('is_employee'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    
+    job = own_ocr_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    
+    return jsonify({'success': True, **job.to_dict()})
+
+@app.route('/process_image/jobs/<job_id>/events')
+def ocr_job_events(job_id):
+    """
+    Server-sent events with a job's status changes
+    
+    Each stream holds a web worker, so it ends after OCR_JOB_STREAM_TIMEOUT
+    seconds; EventSource clients reconnect, others should poll
+    ocr_job_status.
+    """
+    if not session.get('user_id') or not session.get('is_employee'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    
+    if not own_ocr_job(job_id):
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    
+    def stream():
+        deadline = time.monotonic() + OCR_JOB_STREAM_TIMEOUT
+        last_status = None
+        while True:
+            job = db.session.get(OcrJob, job_id, populate_existing=True)
+            if not job:
+                yield f"event: error\ndata: {json.dumps({'error': 'Unknown job'})}\n\n"
+                return
+            if job.status != last_status:
+                last_status = job.status
+                yield f"event: status\ndata: {json.dumps(job.to_dict())}\n\n"
+            if job.finished or time.monotonic() > deadline:
+                return
+            # End the read transaction so the next poll sees the worker's commit
+            db.session.rollback()
+            time.sleep(OCR_JOB_POLL_INTERVAL)
+    
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/process_image/stats')
+def ocr_stats():
+    if not session.get('user_id') or not session.get('is_employee'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    
+    return jsonify({
+        'success': True,
+        'queue': get_job_queue().stats(),
+        'cache': get_result_cache().stats()
+    })
+
+def iter_batch_images(uploads):
+    """
+    Yield (name, bytes) for every image in a batch upload
+    
+    Zip archives are expanded member by member. Each entry is read up to
+    one byte past the per-image limit, so oversized members are reported
+    as errors without ever being held in memory in full.
+    
+    Args:
+        uploads: List of (filename, mimetype, stream) tuples
+    """
+    for filename, mimetype, stream in uploads:
+        if filename.lower().endswith('.zip') or mimetype == 'application/zip':
+            with zipfile.ZipFile(stream) as archive:
+                for member in archive.infolist():
+                    if member.is_dir() or not member.filename.lower().endswith(BATCH_IMAGE_EXTENSIONS):
+                        continue
+                    with archive.open(member) as image_file:
+                        yield member.filename, image_file.read(OCR_MAX_UPLOAD_BYTES + 1)
+        else:
+            yield filename, stream.read(OCR_MAX_UPLOAD_BYTES + 1)
+
+@app.route('/process_image/batch', methods=['POST'])
+def process_image_batch():
+    if not session.get('user_id') or not session.get('is_employee'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    
+    # Camera dumps are far bigger than the app-wide request limit
+    request.max_content_length = OCR_BATCH_MAX_BYTES
+    uploads = []
+    for upload in request.files.getlist('images'):
+        # The request's files are closed when the view returns: stream_with_context
+        # only re-enters the request context once the response starts streaming,
+        # after Request.close() has run. Take the streams over so they stay readable
+        uploads.append((upload.filename or '', upload.mimetype, upload.stream))
+        upload.stream = io.BytesIO()
+    if not uploads:
+        return jsonify({'success': False, 'error': 'No images provided'}), 400
+    
+    def stream():
+        start = time.perf_counter()
+        images = failed = 0
+        names = []
+        done = set()
+        batch = itertools.islice(iter_batch_images(uploads), OCR_BATCH_MAX_IMAGES)
+        
+        def read_batch():
+            for name, data in batch:
+                names.append(name)
+                yield name, data
+        
+        try:
+            for item in process_batch(read_batch()):
+                images += 1
+                failed += 'error' in item
+                done.add(item['index'])
+                yield json.dumps(item) + '\n'
+        except zipfile.BadZipFile as e:
+            yield json.dumps({'error': f"Invalid archive: {str(e)}"}) + '\n'
+        except BrokenProcessPool as e:
+            logging.error(f"OCR batch pool failed: {str(e)}")
+            yield json.dumps({'error': 'An OCR worker crashed; the remaining images were not read'}) + '\n'
+            # Images in flight when the pool broke, and those never sent to it
+            try:
+                for _ in read_batch():
+                    pass
+            except zipfile.BadZipFile:
+                pass
+            for index, name in enumerate(names):
+                if index not in done:
+                    images += 1
+                    failed += 1
+                    yield json.dumps({'index': index, 'name': name, 'timing_ms': 0,
+                                      'error': 'Not read: an OCR worker crashed'}) + '\n'
+        finally:
+            for _, _, upload_stream in uploads:
+                upload_stream.close()
+        
+        elapsed = time.perf_counter() - start
+        yield json.dumps({'summary': {
+            'images': images,
+            'failed': failed,
+            'elapsed_ms': round(elapsed * 1000, 2),
+            'images_per_second': round(images / elapsed, 2) if elapsed else None
+        }}) + '\n'
+    
+    return Response(stream_with_context(stream()), mimetype='application/x-ndjson',
+                    headers={'X-Accel-Buffering': 'no'})
+
+def send_proof(key, path):
+    """Serve a stored proof file; content-addressed, so it never changes"""
+    response = send_file(path, conditional=True, etag=key, max_age=PROOF_IMAGE_MAX_AGE)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    return response
+
+def can_view_proof(key):
+    if not session.get('user_id') or not is_valid_key(key):
+        return False
+    if session.get('is_employee'):
+        return True
+    return Fine.query.filter_by(proof_image_key=key, user_id=session['user_id']).first() is not None
+
+@app.route('/proof/<key>')
+def proof_image(key):
+    if not can_view_proof(key):
+        abort(404)
+    
+    path = blob_path(key)
+    if not os.path.exists(path):
+        abort(404)
+    return send_proof(key, path)
+
+@app.route('/proof/<key>/thumb')
+def proof_thumbnail(key):
+    if not can_view_proof(key):
+        abort(404)
+    
+    path = ensure_thumbnail(key)
+    if not path:
+        abort(404)
+    return send_proof(f"{key}-thumb", path)
+
 @app.route('/view_fines')
 def view_fines():
     if not session.get('user_id'):
@@ -238,12 +704,114 @@ def view_fines():
     
     if is_employee:
         # Employees can see all fines
-        fines = Fine.query.all()
+        query = Fine.query
     else:
         # Users can only see their own fines
-        fines = Fine.query.filter_by(user_id=user_id).all()
+        query = Fine.query.filter_by(user_id=user_id)
+    
+    filters = parse_fine_filters(request.args)
+    query = filter_fines(query, filters)
+    fines, next_cursor = paginate_fines(query, filters['sort'], request.args.get('cursor'))
+    
+    if is_employee and not filter_args(filters):
+        # The whole table: read the maintained aggregates instead of scanning it
+        summary = get_totals()
+        reasons = [(reason, row.count) for reason, row in get_top('reason', limit=None)]
+    else:
+        summary = fine_summary(query)
+        reasons = reason_counts(query)
+    
+    return render_template('view_fines.html', fines=fines, is_employee=is_employee,
+                           filters=filters, filter_args=filter_args(filters),
+                           next_cursor=next_cursor, is_first_page=not request.args.get('cursor'),
+                           summary=summary, reasons=reasons,
+                           fine_reasons=FINE_REASONS, fine_states=FINE_STATES)
+
+def fine_json(fine):
+    """A row of the fines table as JSON, for results rendered in the browser"""
+    return {
+        'id': fine.id,
+        'date': fine.date.strftime('%d-%m-%Y'),
+        'plate_number': fine.vehicle.plate_number,
+        'state': fine.vehicle.state,
+        'reason': fine.reason,
+        'location': fine.location,
+        'amount': int(fine.amount),
+        'paid': fine.paid,
+        'proof_url': url_for('proof_image', key=fine.proof_image_key) if fine.proof_image_key else None,
+        'proof_thumbnail_url': url_for('proof_thumbnail', key=fine.proof_image_key) if fine.proof_image_key else None
+    }
+
+@app.route('/fines/search')
+def search_fines():
+    """
+    One page of fines matching a search string (q) and the listing filters, as JSON
+    
+    The search runs against the full-text index over plate, reason,
+    location and state; pages are keyset-paginated like view_fines.
+    """
+    if not session.get('user_id'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    
+    if session.get('is_employee'):
+        query = Fine.query
+    else:
+        query = Fine.query.filter_by(user_id=session['user_id'])
+    
+    filters = parse_fine_filters(request.args)
+    fines, next_cursor = paginate_fines(filter_fines(query, filters), filters['sort'],
+                                        request.args.get('cursor'))
+    return jsonify({
+        'success': True,
+        'fines': [fine_json(fine) for fine in fines],
+        'next_cursor': next_cursor
+    })
+
+@app.route('/fines/import', methods=['POST'])
+def import_fines_upload():
+    if not session.get('user_id') or not session.get('is_employee'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    
+    # A day of e-challans is larger than a single form post
+    request.max_content_length = FINE_IMPORT_MAX_BYTES
+    upload = request.files.get('file')
+    if upload:
+        stream = upload.stream
+        import_format = request.form.get('format') or detect_format(upload.filename)
+    else:
+        # Raw CSV or JSON-lines body
+        stream = request.stream
+        is_jsonl = request.mimetype in ('application/x-ndjson', 'application/jsonl')
+        import_format = request.args.get('format') or ('jsonl' if is_jsonl else 'csv')
+    
+    if import_format not in IMPORT_FORMATS:
+        return jsonify({'success': False, 'error': f"format must be one of {', '.join(IMPORT_FORMATS)}"}), 400
+    
+    try:
+        summary = import_fines(read_rows(stream, import_format), session['user_id'])
+    except (ImportFormatError, UnicodeDecodeError) as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Fine import failed: {str(e)}")
+        return jsonify({'success': False, 'error': 'Import failed'}), 500
+    
+    expire_watchlist()
+    return jsonify(dict(summary, success=True))
+
+@app.route('/stats/fines')
+def fine_statistics():
+    if not session.get('user_id') or not session.get('is_employee'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    
+    try:
+        limit = min(int(request.args.get('limit', 10)), 100)
+        days = min(int(request.args.get('days', 30)), 366)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit and days must be integers'}), 400
     
-    return render_template('view_fines.html', fines=fines, is_employee=is_employee)
+    return jsonify(dict(get_stats(limit=limit, days=days), success=True))
 
 @app.route('/toggle_theme', methods=['POST'])
 def toggle_theme():
@@ -265,9 +833,22 @@ def toggle_payment(fine_id):
         return jsonify({'success': False, 'error': 'Unauthorized'}), 403
     
     try:
-        # Toggle the payment status
-        fine.paid = not fine.paid
+        # Toggle the payment status only if nobody else has since: two
+        # toggles racing (or a double click) would both apply the same
+        # change to the aggregates otherwise
+        paid = not fine.paid
+        toggled = db.session.execute(
+            update(Fine).where(Fine.id == fine.id, Fine.paid == fine.paid)
+            .values(paid=paid, payment_updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False))
+        if toggled.rowcount != 1:
+            db.session.rollback()
+            return jsonify({'success': False,
+                            'error': 'The payment status was changed meanwhile, please reload'}), 409
+        set_committed_value(fine, 'paid', paid)
+        record_payment_change(fine, fine.vehicle.state)
         db.session.commit()
+        track_payment_change(fine)
         
         return jsonify({
             'success': True, 
@@ -0,0 +1,56 @@
+import logging
+
+from sqlalchemy import inspect, text
+
+from app import db
+
+
+def upgrade_schema():
+    """
+    Create missing tables, columns and indexes without touching existing data
+
+    Covers additive changes only (new tables, new nullable columns, new
+    indexes); anything else needs a hand-written migration.
+
+    Returns:
+        list: Descriptions of the changes made
+    """
+    import models  # noqa: F401  (registers the tables)
+    from search import install_search_index, rebuild_search_index
+
+    engine = db.engine
+    existing_tables = set(inspect(engine).get_table_names())
+    db.create_all()
+    changes = [f"created table {name}" for name in db.metadata.tables if name not in existing_tables]
+
+    inspector = inspect(engine)
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in columns:
+                continue
+            if not column.nullable:
+                raise RuntimeError(f"Cannot add NOT NULL column {table.name}.{column.name} automatically")
+            column_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+            changes.append(f"added column {table.name}.{column.name}")
+
+        indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(bind=engine)
+                changes.append(f"created index {index.name}")
+
+    # Databases created before the search index existed need it filled once
+    with engine.begin() as conn:
+        search_created = install_search_index(conn)
+    if search_created:
+        changes.append(f"created search index over {rebuild_search_index()} fines")
+
+    for change in changes:
+        logging.info(f"Schema upgrade: {change}")
+    return changes
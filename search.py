@@ -0,0 +1,214 @@
+import logging
+import re
+
+from sqlalchemy import and_, column, event, inspect, or_, select, text
+
+from app import db
+from models import Fine, Vehicle
+
+# Longest search string accepted; anything after it is ignored
+MAX_SEARCH_LENGTH = 100
+# Search terms used per query; the rest are dropped
+MAX_SEARCH_TERMS = 6
+
+TERM = re.compile(r'[a-z0-9]+')
+
+FINE = Fine.__tablename__
+VEHICLE = Vehicle.__tablename__
+
+# SQLite: an FTS5 table keyed by fine id with prefix indexes for 2 and 3
+# character prefixes, kept in step with fine and vehicle by triggers, so
+# bulk inserts (fine_import) are indexed without any application code.
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS fine_search USING fts5("
+    "plate, reason, location, state, tokenize='unicode61', prefix='2 3')",
+    f"""CREATE TRIGGER IF NOT EXISTS fine_search_insert AFTER INSERT ON {FINE} BEGIN
+        INSERT INTO fine_search (rowid, plate, reason, location, state)
+        SELECT NEW.id, v.plate_number || ' ' || coalesce(v.plate_key, ''), NEW.reason, NEW.location, v.state
+        FROM {VEHICLE} v WHERE v.id = NEW.vehicle_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS fine_search_update AFTER UPDATE OF reason, location, vehicle_id ON {FINE} BEGIN
+        DELETE FROM fine_search WHERE rowid = OLD.id;
+        INSERT INTO fine_search (rowid, plate, reason, location, state)
+        SELECT NEW.id, v.plate_number || ' ' || coalesce(v.plate_key, ''), NEW.reason, NEW.location, v.state
+        FROM {VEHICLE} v WHERE v.id = NEW.vehicle_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS fine_search_delete AFTER DELETE ON {FINE} BEGIN
+        DELETE FROM fine_search WHERE rowid = OLD.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS fine_search_vehicle AFTER UPDATE OF plate_number, plate_key, state ON {VEHICLE} BEGIN
+        UPDATE fine_search SET plate = NEW.plate_number || ' ' || coalesce(NEW.plate_key, ''), state = NEW.state
+        WHERE rowid IN (SELECT id FROM {FINE} WHERE vehicle_id = NEW.id);
+    END"""
+]
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS fine_search_vehicle",
+    "DROP TABLE IF EXISTS fine_search"
+]
+SQLITE_REBUILD = [
+    "DELETE FROM fine_search",
+    f"""INSERT INTO fine_search (rowid, plate, reason, location, state)
+        SELECT f.id, v.plate_number || ' ' || coalesce(v.plate_key, ''), f.reason, f.location, v.state
+        FROM {FINE} f JOIN {VEHICLE} v ON v.id = f.vehicle_id"""
+]
+
+# PostgreSQL: a tsvector per fine with a GIN index, maintained the same way
+_PG_DOCUMENT = "to_tsvector('simple', concat_ws(' ', v.plate_number, v.plate_key, {fine}.reason, {fine}.location, v.state))"
+POSTGRES_DDL = [
+    f"""CREATE TABLE IF NOT EXISTS fine_search (
+        fine_id integer PRIMARY KEY REFERENCES {FINE} (id) ON DELETE CASCADE,
+        document tsvector NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_fine_search_document ON fine_search USING gin (document)",
+    f"""CREATE OR REPLACE FUNCTION fine_search_sync() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO fine_search (fine_id, document)
+        SELECT NEW.id, {_PG_DOCUMENT.format(fine='NEW')}
+        FROM {VEHICLE} v WHERE v.id = NEW.vehicle_id
+        ON CONFLICT (fine_id) DO UPDATE SET document = EXCLUDED.document;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+    f"DROP TRIGGER IF EXISTS fine_search_sync ON {FINE}",
+    f"""CREATE TRIGGER fine_search_sync AFTER INSERT OR UPDATE OF reason, location, vehicle_id ON {FINE}
+        FOR EACH ROW EXECUTE FUNCTION fine_search_sync()""",
+    f"""CREATE OR REPLACE FUNCTION fine_search_vehicle_sync() RETURNS trigger AS $$
+    BEGIN
+        UPDATE fine_search s SET document = {_PG_DOCUMENT.format(fine='f')}
+        FROM {FINE} f JOIN {VEHICLE} v ON v.id = f.vehicle_id
+        WHERE v.id = NEW.id AND s.fine_id = f.id;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+    f"DROP TRIGGER IF EXISTS fine_search_vehicle_sync ON {VEHICLE}",
+    f"""CREATE TRIGGER fine_search_vehicle_sync AFTER UPDATE OF plate_number, plate_key, state ON {VEHICLE}
+        FOR EACH ROW EXECUTE FUNCTION fine_search_vehicle_sync()"""
+]
+POSTGRES_DROP = [
+    f"DROP TRIGGER IF EXISTS fine_search_vehicle_sync ON {VEHICLE}",
+    "DROP TABLE IF EXISTS fine_search",
+    "DROP FUNCTION IF EXISTS fine_search_sync() CASCADE",
+    "DROP FUNCTION IF EXISTS fine_search_vehicle_sync() CASCADE"
+]
+POSTGRES_REBUILD = [
+    "DELETE FROM fine_search",
+    f"""INSERT INTO fine_search (fine_id, document)
+        SELECT f.id, {_PG_DOCUMENT.format(fine='f')}
+        FROM {FINE} f JOIN {VEHICLE} v ON v.id = f.vehicle_id"""
+]
+
+STATEMENTS = {
+    'sqlite': (SQLITE_DDL, SQLITE_DROP, SQLITE_REBUILD),
+    'postgresql': (POSTGRES_DDL, POSTGRES_DROP, POSTGRES_REBUILD)
+}
+
+
+def _dialect(bind):
+    return bind.dialect.name
+
+
+def has_search_index(connection):
+    """Whether the fine_search table exists on this connection's database"""
+    if _dialect(connection) not in STATEMENTS:
+        return False
+    return 'fine_search' in inspect(connection).get_table_names()
+
+
+def install_search_index(connection):
+    """
+    Create the search table and its triggers if they are missing
+
+    Returns:
+        bool: True if the table was created (and needs rebuild_search_index)
+    """
+    if _dialect(connection) not in STATEMENTS:
+        logging.warning(f"No search index for {_dialect(connection)}; fine search will scan the table")
+        return False
+    created = not has_search_index(connection)
+    ddl, _, _ = STATEMENTS[_dialect(connection)]
+    for statement in ddl:
+        connection.execute(text(statement))
+    return created
+
+
+def drop_search_index(connection):
+    if _dialect(connection) in STATEMENTS:
+        for statement in STATEMENTS[_dialect(connection)][1]:
+            connection.execute(text(statement))
+
+
+def rebuild_search_index():
+    """
+    Re-index every fine, e.g. after creating the index on an existing database
+
+    Returns:
+        int: Fines indexed
+    """
+    with db.engine.begin() as connection:
+        if not has_search_index(connection):
+            return 0
+        for statement in STATEMENTS[_dialect(connection)][2]:
+            connection.execute(text(statement))
+    return db.session.query(Fine.id).count()
+
+
+# The search table lives and dies with the fine table, so create_all and
+# drop_all (development mode, init-db --drop) handle it too
+@event.listens_for(Fine.__table__, 'after_create')
+def _create_search_index(target, connection, **kw):
+    install_search_index(connection)
+
+
+@event.listens_for(Fine.__table__, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    drop_search_index(connection)
+
+
+def search_terms(query):
+    """Lower-case alphanumeric terms of a search string"""
+    return TERM.findall((query or '')[:MAX_SEARCH_LENGTH].lower())[:MAX_SEARCH_TERMS]
+
+
+def search_condition(query):
+    """
+    Filter condition matching fines whose plate, reason, location or state
+    contain words starting with every term of the query
+
+    Terms are prefix matches, so "ts09 speed" finds TS09AB1234 fined for
+    Speeding. Several terms are also tried joined together as a plate
+    prefix, so "TS 09 AB" finds TS09AB1234.
+
+    Args:
+        query: Search string as typed
+
+    Returns:
+        Condition on Fine, or None if the query has no searchable terms
+    """
+    terms = search_terms(query)
+    if not terms:
+        return None
+    joined = ''.join(terms)
+    dialect = db.engine.dialect.name
+
+    if dialect == 'sqlite':
+        expression = ' AND '.join(f'"{term}"*' for term in terms)
+        if len(terms) > 1:
+            expression = f'({expression}) OR plate:"{joined}"*'
+        matches = text("SELECT rowid FROM fine_search WHERE fine_search MATCH :search") \
+            .bindparams(search=expression).columns(column('rowid'))
+        return Fine.id.in_(matches)
+
+    if dialect == 'postgresql':
+        expression = ' & '.join(f'{term}:*' for term in terms)
+        if len(terms) > 1:
+            expression = f'({expression}) | {joined}:*'
+        matches = text("SELECT fine_id FROM fine_search WHERE document @@ to_tsquery('simple', :search)") \
+            .bindparams(search=expression).columns(column('fine_id'))
+        return Fine.id.in_(matches)
+
+    # No full-text support: substring matches, without an index
+    conditions = []
+    for term in terms:
+        vehicles = select(Vehicle.id).where(or_(Vehicle.plate_key.like(f"{term.upper()}%"),
+                                                Vehicle.state.ilike(f"%{term}%")))
+        conditions.append(or_(Fine.reason.ilike(f"%{term}%"), Fine.location.ilike(f"%{term}%"),
+                              Fine.vehicle_id.in_(vehicles)))
+    return and_(*conditions)
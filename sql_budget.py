@@ -0,0 +1,48 @@
+import logging
+import os
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import app
+
+# Warn when a request issues more SQL statements than this; 0 disables the check
+SQL_STATEMENT_BUDGET = int(os.environ.get("SQL_STATEMENT_BUDGET", "0"))
+
+# Statements each page may issue, independent of how many rows it shows.
+# A page over budget almost always means a relationship is lazy-loading per row.
+PAGE_SQL_BUDGETS = {
+    'employee_dashboard': 2,  # totals + recent fines with their vehicles
+    'user_dashboard': 5,  # user, vehicles, fine counts, totals, recent fines
+    'view_fines': 3,  # page of fines with their vehicles, totals, reasons
+    'search_fines': 1  # page of matching fines with their vehicles
+}
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.sql_statements = g.get('sql_statements', 0) + 1
+
+
+def statement_count():
+    """SQL statements issued so far while handling the current request"""
+    return g.get('sql_statements', 0)
+
+
+@app.before_request
+def reset_statement_count():
+    # g lives on the app context, which a CLI command or test shares across requests
+    g.sql_statements = 0
+
+
+@app.after_request
+def check_statement_budget(response):
+    if SQL_STATEMENT_BUDGET or app.debug or app.testing:
+        count = statement_count()
+        response.headers['X-SQL-Statements'] = str(count)
+        budget = PAGE_SQL_BUDGETS.get(request.endpoint, SQL_STATEMENT_BUDGET)
+        if budget and count > budget:
+            logging.warning(f"{request.endpoint} issued {count} SQL statements (budget {budget})")
+    return response
@@ -1,30 +1,7 @@
-import re
+from plate_grammar import STATE_NAMES, plate_state, state_from_code
 
 # Define state prefixes and their full names
-STATE_PREFIXES = {
-    'TS': 'Telangana',
-    'AP': 'Andhra Pradesh',
-    'KA': 'Karnataka',
-    'TN': 'Tamil Nadu',
-    'MH': 'Maharashtra',
-    'DL': 'Delhi',
-    'HR': 'Haryana',
-    'UP': 'Uttar Pradesh',
-    'RJ': 'Rajasthan',
-    'GJ': 'Gujarat',
-    'MP': 'Madhya Pradesh',
-    'KL': 'Kerala',
-    'PB': 'Punjab',
-    'WB': 'West Bengal',
-    'OR': 'Odisha',
-    'BR': 'Bihar',
-    'JH': 'Jharkhand',
-    'AS': 'Assam',
-    'HP': 'Himachal Pradesh',
-    'UK': 'Uttarakhand',
-    'GA': 'Goa',
-    'CH': 'Chandigarh'
-}
+STATE_PREFIXES = STATE_NAMES
 
 def detect_state_from_plate(plate_number):
     """
@@ -39,15 +16,11 @@ def detect_state_from_plate(plate_number):
     if not plate_number:
         return 'Unknown'
     
-    # Clean the plate number
-    plate = plate_number.strip().upper()
+    # Complete plates carry their state (or Bharat Series) in the grammar
+    state = plate_state(plate_number)
+    if state:
+        return state
     
-    # Extract the first 2 characters
     # In India, license plates typically start with 2 letters indicating the state
-    match = re.match(r'^([A-Z]{2})', plate)
-    
-    if match:
-        state_code = match.group(1)
-        return STATE_PREFIXES.get(state_code, 'Unknown')
-    
-    return 'Unknown'
+    state_code = plate_number.strip().upper()[:2]
+    return state_from_code(state_code) or 'Unknown'
@@ -5,8 +5,10 @@ document.addEventListener('DOMContentLoaded', function() {
     const imageUpload = document.getElementById('imageUpload');
     const takePhotoBtn = document.getElementById('takePhoto');
     const captureBtn = document.getElementById('captureBtn');
+    const burstBtn = document.getElementById('burstBtn');
     const cancelCaptureBtn = document.getElementById('cancelCaptureBtn');
     const recaptureBtn = document.getElementById('recaptureBtn');
+    const clearCropBtn = document.getElementById('clearCropBtn');
     const processImageBtn = document.getElementById('processImage');
     const cameraContainer = document.getElementById('cameraContainer');
     const canvasContainer = document.getElementById('canvasContainer');
@@ -20,10 +22,34 @@ document.addEventListener('DOMContentLoaded', function() {
     const detectedState = document.getElementById('detectedState');
     const useOcrResultBtn = document.getElementById('useOcrResult');
     const errorMessage = document.getElementById('errorMessage');
+    const ocrWatchlist = document.getElementById('ocrWatchlist');
+    const watchlistMessage = document.getElementById('watchlistMessage');
     
     let stream = null;
     let capturedImage = null;
     
+    // Full-resolution frame; the visible canvas shows it plus the crop box
+    const frame = document.createElement('canvas');
+    const frameCtx = frame.getContext('2d');
+    // Plate region selected by dragging on the preview, in frame pixels
+    let cropRect = null;
+    let dragStart = null;
+    
+    // How often to check on a queued OCR job (ms)
+    const OCR_POLL_INTERVAL = 500;
+    
+    // Upload size negotiated with the server; replaced by /process_image/config
+    let uploadConfig = {
+        upload_url: '/process_image/upload',
+        burst_url: '/process_image/burst',
+        burst_frames: 5,
+        burst_interval_ms: 120,
+        max_dimension: 1000,
+        quality: 0.85,
+        mimetype: 'image/jpeg',
+        job_timeout_ms: 60000
+    };
+    
     // Check if all required elements exist
     if (!video || !canvas || !imageUpload || !takePhotoBtn || !processImageBtn) {
         return; // Exit if we're not on the fine entry page
@@ -32,6 +58,115 @@ document.addEventListener('DOMContentLoaded', function() {
     // Initialize canvas context
     const ctx = canvas ? canvas.getContext('2d') : null;
     
+    fetch('/process_image/config')
+        .then(response => response.json())
+        .then(config => {
+            if (config.success) {
+                uploadConfig = config;
+            }
+        })
+        .catch(error => console.error('Error loading upload settings:', error));
+    
+    // Copy a source (video frame or image) into the frame and show it
+    function setFrame(source, width, height) {
+        frame.width = width;
+        frame.height = height;
+        frameCtx.drawImage(source, 0, 0, width, height);
+        cropRect = null;
+        drawPreview();
+    }
+    
+    // Redraw the preview canvas: the frame, with the crop box if one is set
+    function drawPreview() {
+        canvas.width = frame.width;
+        canvas.height = frame.height;
+        ctx.drawImage(frame, 0, 0);
+        if (cropRect) {
+            ctx.fillStyle = 'rgba(0, 0, 0, 0.5)';
+            ctx.fillRect(0, 0, canvas.width, canvas.height);
+            ctx.drawImage(frame, cropRect.x, cropRect.y, cropRect.width, cropRect.height,
+                          cropRect.x, cropRect.y, cropRect.width, cropRect.height);
+            ctx.strokeStyle = '#0dcaf0';
+            ctx.lineWidth = Math.max(2, canvas.width / 300);
+            ctx.strokeRect(cropRect.x, cropRect.y, cropRect.width, cropRect.height);
+        }
+        if (clearCropBtn) {
+            clearCropBtn.classList.toggle('d-none', !cropRect);
+        }
+    }
+    
+    // Pointer position in frame pixels (the preview is scaled by CSS)
+    function framePoint(event) {
+        const rect = canvas.getBoundingClientRect();
+        return {
+            x: Math.min(Math.max((event.clientX - rect.left) * canvas.width / rect.width, 0), canvas.width),
+            y: Math.min(Math.max((event.clientY - rect.top) * canvas.height / rect.height, 0), canvas.height)
+        };
+    }
+    
+    // Drag over the preview to mark the plate region
+    canvas.addEventListener('pointerdown', function(e) {
+        if (!capturedImage) {
+            return;
+        }
+        dragStart = framePoint(e);
+        canvas.setPointerCapture(e.pointerId);
+    });
+    
+    canvas.addEventListener('pointermove', function(e) {
+        if (!dragStart) {
+            return;
+        }
+        const point = framePoint(e);
+        cropRect = {
+            x: Math.round(Math.min(dragStart.x, point.x)),
+            y: Math.round(Math.min(dragStart.y, point.y)),
+            width: Math.round(Math.abs(point.x - dragStart.x)),
+            height: Math.round(Math.abs(point.y - dragStart.y))
+        };
+        drawPreview();
+    });
+    
+    canvas.addEventListener('pointerup', function() {
+        dragStart = null;
+        // A click or a tiny drag is not a crop
+        if (cropRect && (cropRect.width < 16 || cropRect.height < 8)) {
+            cropRect = null;
+            drawPreview();
+        }
+    });
+    
+    if (clearCropBtn) {
+        clearCropBtn.addEventListener('click', function() {
+            cropRect = null;
+            drawPreview();
+        });
+    }
+    
+    // Crop and downscale the frame to the negotiated size and encode it
+    function encodeUpload() {
+        return encodeCanvas(frame, cropRect || { x: 0, y: 0, width: frame.width, height: frame.height });
+    }
+    
+    // Downscale a region of a canvas to the negotiated size and encode it
+    function encodeCanvas(source, region) {
+        const scale = Math.min(1, uploadConfig.max_dimension / Math.max(region.width, region.height));
+        const output = document.createElement('canvas');
+        output.width = Math.round(region.width * scale);
+        output.height = Math.round(region.height * scale);
+        output.getContext('2d').drawImage(source, region.x, region.y, region.width, region.height,
+                                          0, 0, output.width, output.height);
+        return new Promise(function(resolve, reject) {
+            output.toBlob(function(blob) {
+                if (blob) {
+                    resolve(blob);
+                } else {
+                    reject(new Error('Could not encode image'));
+                }
+            }, uploadConfig.mimetype, uploadConfig.quality);
+        });
+    }
+    
     // Function to start camera
     function startCamera() {
         if (navigator.mediaDevices && navigator.mediaDevices.getUserMedia) {
@@ -67,15 +202,9 @@ document.addEventListener('DOMContentLoaded', function() {
     // Function to capture image from camera
     function captureImage() {
         if (video && canvas && ctx) {
-            // Set canvas dimensions to match video
-            canvas.width = video.videoWidth;
-            canvas.height = video.videoHeight;
-            
-            // Draw the current video frame on the canvas
-            ctx.drawImage(video, 0, 0, canvas.width, canvas.height);
-            
-            // Get the image data from canvas
-            capturedImage = canvas.toDataURL('image/jpeg');
+            // Keep the current video frame at full resolution until upload
+            setFrame(video, video.videoWidth, video.videoHeight);
+            capturedImage = true;
             
             // Stop the camera
             stopCamera();
@@ -88,6 +217,38 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
+    // Grab several video frames a short interval apart
+    function captureBurst() {
+        const shots = [];
+        return new Promise(function(resolve) {
+            function grab() {
+                const shot = document.createElement('canvas');
+                shot.width = video.videoWidth;
+                shot.height = video.videoHeight;
+                shot.getContext('2d').drawImage(video, 0, 0, shot.width, shot.height);
+                shots.push(shot);
+                if (shots.length < uploadConfig.burst_frames) {
+                    setTimeout(grab, uploadConfig.burst_interval_ms);
+                } else {
+                    resolve(shots);
+                }
+            }
+            grab();
+        });
+    }
+    
+    // Send a burst of frames in one request; the server OCRs only the
+    // sharpest and votes across their readings
+    function processBurst(shots) {
+        return Promise.all(shots.map(shot => encodeCanvas(shot, { x: 0, y: 0, width: shot.width, height: shot.height })))
+        .then(blobs => {
+            const formData = new FormData();
+            blobs.forEach((blob, i) => formData.append('frames', blob, 'frame' + i + '.jpg'));
+            return fetch(uploadConfig.burst_url, { method: 'POST', body: formData });
+        })
+        .then(response => response.json());
+    }
+    
     // Event listener for "Take Photo" button
     takePhotoBtn.addEventListener('click', function() {
         startCamera();
@@ -98,6 +259,35 @@ document.addEventListener('DOMContentLoaded', function() {
         captureImage();
     });
     
+    // Event listener for "Burst" button: capture and read several frames
+    if (burstBtn) {
+        burstBtn.addEventListener('click', function() {
+            burstBtn.disabled = true;
+            captureBtn.disabled = true;
+            captureBurst()
+            .then(shots => {
+                burstBtn.disabled = false;
+                captureBtn.disabled = false;
+                
+                // Preview the first frame until the server names the sharpest
+                setFrame(shots[0], shots[0].width, shots[0].height);
+                capturedImage = true;
+                stopCamera();
+                canvasContainer.classList.remove('d-none');
+                startProcessing();
+                
+                return processBurst(shots).then(data => {
+                    const best = shots[data.best_frame];
+                    if (best) {
+                        setFrame(best, best.width, best.height);
+                    }
+                    showOcrResult(data);
+                });
+            })
+            .catch(showOcrFailure);
+        });
+    }
+    
     // Event listener for "Cancel Capture" button
     cancelCaptureBtn.addEventListener('click', function() {
         stopCamera();
@@ -107,6 +297,7 @@ document.addEventListener('DOMContentLoaded', function() {
     recaptureBtn.addEventListener('click', function() {
         canvasContainer.classList.add('d-none');
         capturedImage = null;
+        cropRect = null;
         startCamera();
     });
     
@@ -114,144 +305,189 @@ document.addEventListener('DOMContentLoaded', function() {
     imageUpload.addEventListener('change', function(e) {
         if (e.target.files && e.target.files[0]) {
             const file = e.target.files[0];
-            const reader = new FileReader();
             
-            reader.onload = function(event) {
-                capturedImage = event.target.result;
-                
-                // Create an image element to get dimensions
-                const img = new Image();
-                img.onload = function() {
-                    // Set canvas dimensions to match image
-                    if (canvas && ctx) {
-                        canvas.width = img.width;
-                        canvas.height = img.height;
-                        
-                        // Draw the image on the canvas
-                        ctx.drawImage(img, 0, 0, canvas.width, canvas.height);
-                        
-                        // Show canvas container
-                        canvasContainer.classList.remove('d-none');
-                        cameraContainer.classList.add('d-none');
-                        
-                        // Enable process button
-                        processImageBtn.disabled = false;
-                    }
-                };
-                img.src = capturedImage;
+            // Decode the file directly; no base64 copy of it is ever made
+            const img = new Image();
+            const objectUrl = URL.createObjectURL(file);
+            img.onload = function() {
+                URL.revokeObjectURL(objectUrl);
+                if (canvas && ctx) {
+                    setFrame(img, img.naturalWidth, img.naturalHeight);
+                    capturedImage = true;
+                    
+                    // Show canvas container
+                    canvasContainer.classList.remove('d-none');
+                    cameraContainer.classList.add('d-none');
+                    
+                    // Enable process button
+                    processImageBtn.disabled = false;
+                }
             };
-            
-            reader.readAsDataURL(file);
+            img.src = objectUrl;
         }
     });
     
-    // Process the image with OCR
-    processImageBtn.addEventListener('click', function() {
-        if (!capturedImage) {
-            alert('Please capture or upload an image first.');
-            return;
-        }
-        
-        // Show loading state
+    // Wait for a queued OCR job to finish by polling its status URL,
+    // giving up after uploadConfig.job_timeout_ms
+    function waitForOcrJob(statusUrl) {
+        const deadline = Date.now() + uploadConfig.job_timeout_ms;
+        return new Promise(function(resolve, reject) {
+            function poll() {
+                fetch(statusUrl)
+                    .then(response => response.json())
+                    .then(job => {
+                        if (job.status === 'done') {
+                            resolve(job.result);
+                        } else if (!job.success || job.status === 'failed') {
+                            resolve({ success: false, error: job.error });
+                        } else if (Date.now() > deadline) {
+                            resolve({ success: false, error: 'The server is busy - please try again or use manual entry.' });
+                        } else {
+                            setTimeout(poll, OCR_POLL_INTERVAL);
+                        }
+                    })
+                    .catch(reject);
+            }
+            poll();
+        });
+    }
+    
+    // Show the processing state on the Process button and clear old results
+    function startProcessing() {
         processImageBtn.disabled = true;
         processImageBtn.innerHTML = '<span class="spinner-border spinner-border-sm me-2" role="status" aria-hidden="true"></span>Processing...';
         
         // Hide previous results/errors
         ocrResult.classList.add('d-none');
         ocrError.classList.add('d-none');
+    }
+    
+    function resetProcessButton() {
+        processImageBtn.disabled = false;
+        processImageBtn.innerHTML = '<i class="fas fa-cog me-2"></i>Process Image';
+    }
+    
+    // Warn when the matched vehicle has unpaid fines (the response's 'watchlist')
+    function showWatchlist(entry) {
+        if (!ocrWatchlist) {
+            return;
+        }
+        if (entry && entry.unpaid_count > 0) {
+            const fines = entry.unpaid_count === 1 ? 'unpaid fine' : 'unpaid fines';
+            watchlistMessage.textContent = `${entry.plate_number} has ${entry.unpaid_count} ${fines} ` +
+                `totalling ₹${Math.round(entry.unpaid_total)}`;
+            ocrWatchlist.classList.remove('d-none');
+        } else {
+            ocrWatchlist.classList.add('d-none');
+        }
+    }
+    
+    // Display an OCR response from /process_image/upload or /process_image/burst
+    function showOcrResult(data) {
+        resetProcessButton();
         
-        // Send the image to the server for OCR processing
-        fetch('/process_image', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({
-                image_data: capturedImage
-            })
-        })
-        .then(response => response.json())
-        .then(data => {
-            // Reset button state
-            processImageBtn.disabled = false;
-            processImageBtn.innerHTML = '<i class="fas fa-cog me-2"></i>Process Image';
+        if (data.success) {
+            // Warn about outstanding fines on the matched vehicle
+            showWatchlist(data.watchlist);
             
-            if (data.success) {
-                // Display OCR results
-                detectedPlate.textContent = data.plate_number;
-                detectedState.textContent = data.state;
-                
-                // Make plate number editable
-                detectedPlate.setAttribute('contenteditable', 'true');
-                detectedPlate.style.border = '1px dashed #ccc';
-                detectedPlate.style.padding = '5px 10px';
-                detectedPlate.style.borderRadius = '4px';
-                
-                // Add a hint about editability
-                if (!document.getElementById('edit-hint')) {
-                    const hintElement = document.createElement('small');
-                    hintElement.id = 'edit-hint';
-                    hintElement.className = 'text-muted d-block mt-1';
-                    hintElement.innerHTML = '<i class="fas fa-pencil-alt me-1"></i>Click to edit if needed';
-                    detectedPlate.parentNode.appendChild(hintElement);
-                }
-                
-                // Add event listener to update state on plate number edit
-                detectedPlate.addEventListener('input', function() {
-                    // Extract state code (first 2 letters)
-                    const plateText = detectedPlate.textContent.trim().toUpperCase();
-                    if (plateText.length >= 2) {
-                        const stateCode = plateText.substring(0, 2);
-                        
-                        // Make a simple fetch to get the state name
-                        fetch('/process_image', {
-                            method: 'POST',
-                            headers: {
-                                'Content-Type': 'application/json',
-                            },
-                            body: JSON.stringify({
-                                image_data: capturedImage,
-                                manual_plate: plateText
-                            })
+            // Display OCR results
+            detectedPlate.textContent = data.plate_number;
+            detectedState.textContent = data.state;
+            
+            // Make plate number editable
+            detectedPlate.setAttribute('contenteditable', 'true');
+            detectedPlate.style.border = '1px dashed #ccc';
+            detectedPlate.style.padding = '5px 10px';
+            detectedPlate.style.borderRadius = '4px';
+            
+            // Add a hint about editability
+            if (!document.getElementById('edit-hint')) {
+                const hintElement = document.createElement('small');
+                hintElement.id = 'edit-hint';
+                hintElement.className = 'text-muted d-block mt-1';
+                hintElement.innerHTML = '<i class="fas fa-pencil-alt me-1"></i>Click to edit if needed';
+                detectedPlate.parentNode.appendChild(hintElement);
+            }
+            
+            // Add event listener to update state on plate number edit
+            detectedPlate.addEventListener('input', function() {
+                // Extract state code (first 2 letters)
+                const plateText = detectedPlate.textContent.trim().toUpperCase();
+                if (plateText.length >= 2) {
+                    const stateCode = plateText.substring(0, 2);
+                    
+                    // Make a simple fetch to get the state name
+                    fetch('/process_image', {
+                        method: 'POST',
+                        headers: {
+                            'Content-Type': 'application/json',
+                        },
+                        body: JSON.stringify({
+                            manual_plate: plateText
                         })
-                        .then(response => response.json())
-                        .then(stateData => {
-                            if (stateData.success) {
-                                detectedState.textContent = stateData.state;
-                            }
-                        });
-                    }
-                });
-                
-                // Add state-based class to state display
-                detectedState.className = '';
-                if (data.state === 'Telangana') {
-                    detectedState.classList.add('text-info');
-                } else if (data.state === 'Andhra Pradesh') {
-                    detectedState.classList.add('text-success');
-                } else {
-                    detectedState.classList.add('text-secondary');
+                    })
+                    .then(response => response.json())
+                    .then(stateData => {
+                        if (stateData.success) {
+                            detectedState.textContent = stateData.state;
+                        }
+                    });
                 }
-                
-                // Show result container
-                ocrResult.classList.remove('d-none');
+            });
+            
+            // Add state-based class to state display
+            detectedState.className = '';
+            if (data.state === 'Telangana') {
+                detectedState.classList.add('text-info');
+            } else if (data.state === 'Andhra Pradesh') {
+                detectedState.classList.add('text-success');
             } else {
-                // Show error message
-                errorMessage.textContent = data.error || 'Failed to detect license plate. Please try again or use manual entry.';
-                ocrError.classList.remove('d-none');
+                detectedState.classList.add('text-secondary');
             }
-        })
-        .catch(error => {
-            console.error('Error processing image:', error);
-            
-            // Reset button state
-            processImageBtn.disabled = false;
-            processImageBtn.innerHTML = '<i class="fas fa-cog me-2"></i>Process Image';
             
+            // Show result container
+            ocrResult.classList.remove('d-none');
+        } else {
             // Show error message
-            errorMessage.textContent = 'An error occurred while processing the image. Please try again or use manual entry.';
+            errorMessage.textContent = data.error || 'Failed to detect license plate. Please try again or use manual entry.';
             ocrError.classList.remove('d-none');
-        });
+        }
+    }
+    
+    function showOcrFailure(error) {
+        console.error('Error processing image:', error);
+        resetProcessButton();
+        captureBtn.disabled = false;
+        if (burstBtn) {
+            burstBtn.disabled = false;
+        }
+        
+        // Show error message
+        errorMessage.textContent = 'An error occurred while processing the image. Please try again or use manual entry.';
+        ocrError.classList.remove('d-none');
+    }
+    
+    // Process the image with OCR
+    processImageBtn.addEventListener('click', function() {
+        if (!capturedImage) {
+            alert('Please capture or upload an image first.');
+            return;
+        }
+        
+        startProcessing();
+        
+        // Queue the downscaled image for OCR on the server, then poll for the result
+        encodeUpload()
+        .then(blob => {
+            const formData = new FormData();
+            formData.append('image', blob, 'plate.jpg');
+            formData.append('async', '1');
+            return fetch(uploadConfig.upload_url, { method: 'POST', body: formData });
+        })
+        .then(response => response.json())
+        .then(data => data.job_id ? waitForOcrJob(data.status_url) : data)
+        .then(showOcrResult)
+        .catch(showOcrFailure);
     });
     
     // Use OCR result in the form
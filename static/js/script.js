@@ -56,22 +56,77 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
     
-    // Enable search functionality in tables with searchable class
+    // Server-side search for tables: inputs with the table-search class query
+    // data-search-url (with the fields of their form) as the user types, and
+    // hand each page of results to the table as a 'search:results' event
+    const SEARCH_DEBOUNCE_MS = 250;
     const searchInputs = document.querySelectorAll('.table-search');
     searchInputs.forEach(input => {
-        input.addEventListener('keyup', function() {
-            const searchTerm = this.value.toLowerCase();
-            const tableId = this.getAttribute('data-table');
-            const table = document.getElementById(tableId);
+        const table = document.getElementById(input.getAttribute('data-table'));
+        const searchUrl = input.getAttribute('data-search-url');
+        const moreButton = document.getElementById(input.getAttribute('data-more-button'));
+        if (!table || !searchUrl) {
+            return;
+        }
+        
+        let timer = null;
+        let controller = null;
+        let nextCursor = null;
+        
+        function search(cursor) {
+            // Only the newest request matters; drop any still in flight
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
             
-            if (table) {
-                const rows = table.querySelectorAll('tbody tr');
-                
-                rows.forEach(row => {
-                    const text = row.textContent.toLowerCase();
-                    row.style.display = text.includes(searchTerm) ? '' : 'none';
+            const params = new URLSearchParams(input.form ? new FormData(input.form) : undefined);
+            params.set(input.name || 'q', input.value.trim());
+            if (cursor) {
+                params.set('cursor', cursor);
+            }
+            
+            fetch(`${searchUrl}?${params}`, { signal: controller.signal })
+                .then(response => response.json())
+                .then(data => {
+                    if (!data.success) {
+                        throw new Error(data.error || 'Search failed');
+                    }
+                    nextCursor = data.next_cursor;
+                    if (moreButton) {
+                        moreButton.classList.toggle('d-none', !nextCursor);
+                    }
+                    table.dispatchEvent(new CustomEvent('search:results', {
+                        detail: { fines: data.fines, append: Boolean(cursor), query: input.value.trim() }
+                    }));
+                })
+                .catch(error => {
+                    if (error.name !== 'AbortError') {
+                        console.error('Error searching:', error);
+                    }
                 });
+        }
+        
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            timer = setTimeout(() => search(null), SEARCH_DEBOUNCE_MS);
+        });
+        
+        // Enter searches immediately instead of submitting the filter form
+        input.addEventListener('keydown', function(e) {
+            if (e.key === 'Enter') {
+                e.preventDefault();
+                clearTimeout(timer);
+                search(null);
             }
         });
+        
+        if (moreButton) {
+            moreButton.addEventListener('click', function() {
+                if (nextCursor) {
+                    search(nextCursor);
+                }
+            });
+        }
     });
 });
@@ -0,0 +1,220 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app import db
+from models import Fine
+
+# Seconds between checks for fines added or paid by other workers
+WATCHLIST_REFRESH_INTERVAL = float(os.environ.get("WATCHLIST_REFRESH_INTERVAL", "2"))
+# Payment changes are re-read this far back, so one committed just after a
+# check (or stamped by a worker with a slightly slow clock) is not missed
+WATCHLIST_SYNC_OVERLAP = timedelta(seconds=30)
+# Fine ids are re-read this far below the highest seen: ids are handed out
+# at insert, so a transaction committing late leaves a lower id behind
+WATCHLIST_ID_OVERLAP = int(os.environ.get("WATCHLIST_ID_OVERLAP", "200"))
+# Vehicles recounted per query; a sync touching more reloads everything
+WATCHLIST_RECOUNT_BATCH = 500
+WATCHLIST_RELOAD_THRESHOLD = 5000
+
+
+class Watchlist:
+    """
+    In-memory unpaid fine count and total per vehicle, for roadside checks.
+
+    Loaded with one grouped query over the unpaid fines. After that the
+    worker that records a fine or a payment updates its copy directly, and
+    every WATCHLIST_REFRESH_INTERVAL seconds each worker asks the database
+    which vehicles had fines added (ids it has not seen, from just below
+    the highest it has seen) or paid (Fine.payment_updated_at) elsewhere
+    and recounts only those, so a lookup is a dict access and never scans
+    the fine table.
+    """
+
+    def __init__(self, refresh_interval=WATCHLIST_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._unpaid = {}  # vehicle id -> (unpaid count, unpaid total)
+        self._max_fine_id = None
+        self._recent_ids = set()  # fine ids seen within WATCHLIST_ID_OVERLAP of the highest
+        self._synced_at = None  # UTC time the last sync started
+        self._checked_at = None
+
+    def __len__(self):
+        return len(self._unpaid)
+
+    def _counts(self, vehicle_ids=None):
+        query = (select(Fine.vehicle_id, func.count(Fine.id), func.sum(Fine.amount))
+                 .where(Fine.paid == False)  # noqa: E712
+                 .group_by(Fine.vehicle_id))
+        if vehicle_ids is not None:
+            query = query.where(Fine.vehicle_id.in_(vehicle_ids))
+        return {vehicle_id: (count, round(total or 0.0, 2))
+                for vehicle_id, count, total in db.session.execute(query)}
+
+    def load(self):
+        """Count every vehicle's unpaid fines from scratch"""
+        started = datetime.utcnow()
+        # Fines inserted between the two queries are recounted by the next sync
+        max_fine_id = db.session.execute(select(func.max(Fine.id))).scalar() or 0
+        recent_ids = set(db.session.execute(
+            select(Fine.id).where(Fine.id > max_fine_id - WATCHLIST_ID_OVERLAP)).scalars())
+        unpaid = self._counts()
+        with self._lock:
+            self._unpaid = unpaid
+            self._max_fine_id = max_fine_id
+            self._recent_ids = recent_ids
+            self._synced_at = started
+        logging.debug(f"Watchlist loaded {len(unpaid)} vehicles with unpaid fines")
+
+    def sync(self, force=False):
+        """
+        Pick up fines added or paid since the last sync
+
+        Returns:
+            int: Vehicles recounted
+        """
+        now = time.monotonic()
+        if not force and self._checked_at is not None and now - self._checked_at < self.refresh_interval:
+            return 0
+        self._checked_at = now
+
+        if self._max_fine_id is None:
+            self.load()
+            return len(self._unpaid)
+
+        started = datetime.utcnow()
+        window = db.session.execute(
+            select(Fine.id, Fine.vehicle_id).where(Fine.id > self._max_fine_id - WATCHLIST_ID_OVERLAP)).all()
+        added = [(fine_id, vehicle_id) for fine_id, vehicle_id in window if fine_id not in self._recent_ids]
+        paid = db.session.execute(
+            select(Fine.vehicle_id).distinct()
+            .where(Fine.payment_updated_at > self._synced_at - WATCHLIST_SYNC_OVERLAP)).scalars().all()
+        vehicle_ids = {vehicle_id for _, vehicle_id in added} | set(paid)
+        if len(vehicle_ids) > WATCHLIST_RELOAD_THRESHOLD:
+            self.load()
+            return len(vehicle_ids)
+
+        # Counts are absolute, so recounting a vehicle twice is harmless
+        ordered = sorted(vehicle_ids)
+        counts = {}
+        for start in range(0, len(ordered), WATCHLIST_RECOUNT_BATCH):
+            counts.update(self._counts(ordered[start:start + WATCHLIST_RECOUNT_BATCH]))
+        with self._lock:
+            for vehicle_id in ordered:
+                if vehicle_id in counts:
+                    self._unpaid[vehicle_id] = counts[vehicle_id]
+                else:
+                    self._unpaid.pop(vehicle_id, None)
+            if added:
+                self._max_fine_id = max(self._max_fine_id, max(fine_id for fine_id, _ in added))
+                floor = self._max_fine_id - WATCHLIST_ID_OVERLAP
+                self._recent_ids = {fine_id for fine_id in self._recent_ids if fine_id > floor}
+                self._recent_ids.update(fine_id for fine_id, _ in added if fine_id > floor)
+            self._synced_at = started
+        return len(ordered)
+
+    def expire(self):
+        """Sync on the next lookup, e.g. after a bulk import"""
+        self._checked_at = None
+
+    def apply(self, vehicle_id, count, amount):
+        """Add a change made by this worker (count and amount may be negative)"""
+        with self._lock:
+            if self._max_fine_id is None:
+                return  # Not loaded yet; the load will include it
+            old_count, old_total = self._unpaid.get(vehicle_id, (0, 0.0))
+            new_count = old_count + count
+            if new_count > 0:
+                self._unpaid[vehicle_id] = (new_count, round(old_total + amount, 2))
+            else:
+                self._unpaid.pop(vehicle_id, None)
+
+    def lookup(self, vehicle_id):
+        """
+        Unpaid fines of a vehicle
+
+        Returns:
+            dict: 'unpaid_count' and 'unpaid_total'
+        """
+        count, total = self._unpaid.get(vehicle_id, (0, 0.0))
+        return {'unpaid_count': count, 'unpaid_total': total}
+
+
+_watchlist = None
+_watchlist_lock = threading.Lock()
+
+
+def get_watchlist():
+    """Return the process-wide watchlist, synced with the database"""
+    global _watchlist
+    with _watchlist_lock:
+        if _watchlist is None:
+            _watchlist = Watchlist()
+        watchlist = _watchlist
+    watchlist.sync()
+    return watchlist
+
+
+def add_unpaid_summary(matches):
+    """
+    Add 'unpaid_count' and 'unpaid_total' to vehicle matches from plate_index
+
+    Args:
+        matches: List of dicts with 'vehicle_id', updated in place
+
+    Returns:
+        list: The same matches
+    """
+    if not matches:
+        return matches
+    try:
+        watchlist = get_watchlist()
+    except Exception as e:
+        logging.error(f"Watchlist lookup failed: {str(e)}")
+        return matches
+    for match in matches:
+        match.update(watchlist.lookup(match['vehicle_id']))
+    return matches
+
+
+def _local_change(vehicle_id, count, amount):
+    # Called after the change is committed; the watchlist catches up on
+    # its next sync even if this fails
+    try:
+        if _watchlist is not None:
+            _watchlist.apply(vehicle_id, count, amount)
+    except Exception as e:
+        logging.error(f"Watchlist update failed: {str(e)}")
+
+
+def track_new_fine(fine):
+    """Count a fine just committed by this worker"""
+    if not fine.paid:
+        _local_change(fine.vehicle_id, 1, fine.amount)
+
+
+def track_payment_change(fine):
+    """Apply a fine's paid flag having just been flipped to fine.paid"""
+    if fine.paid:
+        _local_change(fine.vehicle_id, -1, -fine.amount)
+    else:
+        _local_change(fine.vehicle_id, 1, fine.amount)
+
+
+def expire_watchlist():
+    if _watchlist is not None:
+        _watchlist.expire()
+
+
+def _reset_watchlist_after_fork():
+    global _watchlist, _watchlist_lock
+    _watchlist = None
+    _watchlist_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_watchlist_after_fork)